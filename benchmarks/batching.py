@@ -0,0 +1,95 @@
+"""
+End to end throughput of single-command payloads against batched payloads:
+decode, evaluate and fold into a frame, as the MQTT thread does.
+
+    python -m benchmarks.batching
+"""
+
+import argparse
+import json
+import random
+import time
+from typing import Any, Callable, List, Tuple
+
+from src.models.delta import DeltaCoalescer
+from src.services.health_service import HealthService
+
+
+def make_commands(count: int, seed: int) -> List[Tuple[str, Any]]:
+    """Status words for every monitor plus pings and wdlm seat updates"""
+    rng = random.Random(seed)
+    health_service = HealthService()
+    cmds = list(health_service.monitors)
+    commands = []
+    for idx in range(count):
+        kind = rng.random()
+        if kind < 0.1:
+            commands.append(("ping", idx))
+        elif kind < 0.2:
+            commands.append(("wdlm", format(rng.getrandbits(16), "016b")))
+        else:
+            commands.append((rng.choice(cmds), hex(rng.getrandbits(32))))
+    return commands
+
+
+def run(payloads: List[bytes], commands: int, fmt: str) -> float:
+    """Feed payloads through decode and evaluation, returns commands/sec"""
+    health_service = HealthService()
+    codec = health_service.codec
+    coalescer = DeltaCoalescer()
+
+    start = time.perf_counter()
+    for payload in payloads:
+        batch = codec.decode(payload, fmt)
+        coalescer.add(health_service.process_batch(batch), len(batch))
+    elapsed = time.perf_counter() - start
+    return commands / elapsed
+
+
+def chunks(commands: List[Tuple[str, Any]], size: int) -> List[List[Tuple[str, Any]]]:
+    return [commands[idx : idx + size] for idx in range(0, len(commands), size)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--commands", type=int, default=50000)
+    parser.add_argument("--batch", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    commands = make_commands(args.commands, args.seed)
+    codec = HealthService().codec
+    encoders: List[Tuple[str, str, Callable[[List[Tuple[str, Any]]], bytes]]] = [
+        (
+            "json list",
+            "json",
+            lambda c: json.dumps([{"cmd": k, "value": v} for k, v in c]).encode(),
+        ),
+        ("json dict", "json", lambda c: json.dumps(dict(c)).encode()),
+        ("binary", "binary", codec.encode),
+    ]
+
+    single = [
+        json.dumps({"cmd": cmd, "value": value}).encode() for cmd, value in commands
+    ]
+    baseline = run(single, len(commands), "json")
+    print(f"{'payloads':<24}{'bytes/cmd':>10}{'cmds/s':>12}{'speedup':>9}")
+    print(
+        f"{'json per message':<24}"
+        f"{sum(map(len, single)) / len(commands):>10.1f}{baseline:>12.0f}{1:>8.1f}x"
+    )
+
+    for name, fmt, encode in encoders:
+        # a dict batch keeps one value per command, so it carries fewer commands
+        batches = [encode(chunk) for chunk in chunks(commands, args.batch)]
+        total = sum(len(codec.decode(payload, fmt)) for payload in batches)
+        rate = run(batches, total, fmt)
+        label = f"{name} x{args.batch}"
+        print(
+            f"{label:<24}{sum(map(len, batches)) / total:>10.1f}"
+            f"{rate:>12.0f}{rate / baseline:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
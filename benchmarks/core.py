@@ -0,0 +1,213 @@
+"""
+Core processing benchmark suite: Monitor.process, MonitorEntry.evaluate,
+Wdlms.process, HealthService.process_message with string and int values
+and Heartbeat.process, on config/health.json and on copies scaled to 10x
+and 100x entries. Reports messages/sec and p50/p99 latency per case.
+
+    python -m benchmarks.core --output results.json
+    python -m benchmarks.core --baseline results.json
+
+Results are written as JSON, compared against a baseline any case that
+lost more than --threshold of its throughput counts as a regression and
+the exit code is 1.
+"""
+
+import argparse
+import copy
+import itertools
+import json
+import platform
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from src.models.heartbeat import Heartbeat
+from src.models.wdlms import Wdlms
+from src.services.health_service import HealthService, load_health_config
+
+Case = Tuple[Callable[[Any], Any], Sequence[Any]]
+
+
+def scale_config(cfg: dict, factor: int) -> dict:
+    """
+    Copy of a health config with factor times the entries in every monitor
+    and factor times the wdlm seats. Monitors and heartbeats are not copied,
+    binary command ids cap a config at 255 commands.
+    """
+    cfg = copy.deepcopy(cfg)
+    for monitor in cfg["monitors"].values():
+        entries = monitor["entries"]
+        monitor["entries"] = {
+            f"{name} #{idx}" if idx else name: entry
+            for idx in range(factor)
+            for name, entry in entries.items()
+        }
+    cfg["wdlms"]["seats"] = max(cfg["wdlms"].get("seats", 0), 16) * factor
+    return cfg
+
+
+def status_words(rng: random.Random, count: int) -> List[int]:
+    """Mostly repeating status words with some random ones, like the field"""
+    common = [0, 0x80000000, 0x80800000, 0x40000000, 0xF0C00000]
+    return [
+        rng.choice(common) if rng.random() < 0.8 else rng.getrandbits(32)
+        for _ in range(count)
+    ]
+
+
+def make_cases(cfg: dict, count: int, seed: int) -> Dict[str, Case]:
+    rng = random.Random(seed)
+    health_service = HealthService(cfg=cfg)
+    monitors = list(health_service.monitors.values())
+    entries = [entry for m in monitors for entry in m.entries.values()]
+    seats = health_service.wdlms.count or cfg["wdlms"].get("seats", 16)
+
+    words = status_words(rng, count)
+    monitor_values = [(rng.choice(monitors), word) for word in words]
+    entry_values = [(rng.choice(entries), word) for word in words]
+
+    wdlms = Wdlms("bench", "white", "left", seats)
+    # bitstrings and int bitfields alternate
+    seat_values: List[Any] = [
+        rng.getrandbits(seats) if idx % 2 else format(rng.getrandbits(seats), "b")
+        for idx in range(count)
+    ]
+
+    cmds = list(health_service.monitors) + list(health_service.heartbeats)
+    pings = itertools.count()
+    int_messages = [
+        {"cmd": cmd, "value": next(pings) if cmd in health_service.heartbeats else word}
+        for cmd, word in zip((rng.choice(cmds) for _ in words), words)
+    ]
+    str_messages = [
+        {"cmd": msg["cmd"], "value": hex(msg["value"])} for msg in int_messages
+    ]
+
+    heartbeat = Heartbeat("bench", 3, 60, clock=lambda: 0.0)
+    beats = itertools.count()
+
+    return {
+        "monitor.process": (lambda item: item[0].process(item[1]), monitor_values),
+        "monitor_entry.evaluate": (
+            lambda item: item[0].evaluate(item[1]),
+            entry_values,
+        ),
+        "wdlms.process": (wdlms.process, seat_values),
+        "process_message.str": (
+            HealthService(cfg=cfg).process_message,
+            str_messages,
+        ),
+        "process_message.int": (
+            HealthService(cfg=cfg).process_message,
+            int_messages,
+        ),
+        "heartbeat.process": (
+            lambda now: heartbeat.process(next(beats), now),
+            [float(idx) for idx in range(count)],
+        ),
+    }
+
+
+def measure(case: Case, repeat: int) -> Dict[str, float]:
+    """Best throughput over repeats, latency percentiles from a timed pass"""
+    fn, items = case
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            fn(item)
+        best = min(best, time.perf_counter() - start)
+
+    # per-call timing adds the timer overhead, so it gets its own pass
+    samples = []
+    clock = time.perf_counter_ns
+    for item in items:
+        start = clock()
+        fn(item)
+        samples.append(clock() - start)
+    samples.sort()
+
+    return {
+        "msgs_per_s": len(items) / best,
+        "p50_us": samples[len(samples) // 2] / 1000,
+        "p99_us": samples[min(len(samples) - 1, len(samples) * 99 // 100)] / 1000,
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, float]], baseline: dict, threshold: float
+) -> List[str]:
+    """Print the change against a baseline, returns the regressed cases"""
+    regressions = []
+    print(f"\n{'case':<36}{'baseline':>12}{'now':>12}{'change':>9}")
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        change = result["msgs_per_s"] / base["msgs_per_s"] - 1
+        flag = ""
+        if change < -threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(
+            f"{name:<36}{base['msgs_per_s']:>12.0f}{result['msgs_per_s']:>12.0f}"
+            f"{change:>+8.1%}{flag}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against a saved results file")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    base_cfg = load_health_config()
+    results: Dict[str, Dict[str, float]] = {}
+
+    print(f"{'case':<36}{'msgs/s':>12}{'p50 us':>9}{'p99 us':>9}")
+    for scale in args.scales:
+        cfg = scale_config(base_cfg, scale) if scale > 1 else base_cfg
+        for name, case in make_cases(cfg, args.messages, args.seed).items():
+            label = f"{name}@{scale}x"
+            result = measure(case, args.repeat)
+            results[label] = result
+            print(
+                f"{label:<36}{result['msgs_per_s']:>12.0f}"
+                f"{result['p50_us']:>9.2f}{result['p99_us']:>9.2f}"
+            )
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "messages": args.messages,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Event log write throughput and range query latency over a long history.
+Simulates a controller publishing every --interval seconds for --days days
+of wall clock time, then asks for the transitions of one monitor into a
+state within a one hour window.
+
+    python -m benchmarks.event_log --days 90
+"""
+
+import argparse
+import random
+import shutil
+import tempfile
+import time
+
+from src.models.state import State
+from src.services.event_log import KIND_TRANSITION, EventLogReader, EventLogWriter
+from src.services.health_service import HealthService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=float, default=30.0)
+    parser.add_argument("--interval", type=float, default=5.0)
+    parser.add_argument("--monitor", default="hw")
+    parser.add_argument("--state", default=State.ON.value)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    health_service = HealthService()
+    monitors = list(health_service.monitors)
+    messages = int(args.days * 86400 / args.interval)
+
+    path = tempfile.mkdtemp(prefix="events-")
+    try:
+        now = [1_700_000_000.0]
+        writer = EventLogWriter(path, clock=lambda: now[0])
+        start = time.perf_counter()
+        for _ in range(messages):
+            now[0] += args.interval
+            batch = [(cmd, rng.getrandbits(32)) for cmd in monitors]
+            writer.record(batch, health_service.process_batch(batch))
+        writer.close()
+        elapsed = time.perf_counter() - start
+        print(
+            f"wrote {writer.written} records ({messages} messages) in "
+            f"{elapsed:.1f}s, {writer.written / elapsed:.0f} records/s"
+        )
+
+        reader = EventLogReader(path)
+        first = 1_700_000_000.0
+        window = first + rng.uniform(0, args.days * 86400 - 3600)
+        start = time.perf_counter()
+        events = list(
+            reader.query(
+                window,
+                window + 3600,
+                kind=KIND_TRANSITION,
+                subject=f"monitor/{args.monitor}",
+                states=[State(args.state)],
+            )
+        )
+        elapsed = time.perf_counter() - start
+        print(
+            f"{len(reader.segments())} segments, {len(events)} '{args.state}' "
+            f"transitions of {args.monitor} in one hour found in "
+            f"{elapsed * 1000:.1f} ms"
+        )
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Offscreen GUI rendering benchmark. Builds MainWindow on health.json or a
+scaled copy, drives a message stream through handle_message and renders a
+frame every --per-frame messages, like the frame timer would.
+
+Reports per-frame wall time (render plus the paint it triggers), event loop
+latency (a zero timer posted once the frame is rendered, until it runs behind
+the paint and other events the frame queued), and how many Python and Qt
+objects the stream left behind, so widget churn shows up as a number.
+Runs on a headless box, QT_QPA_PLATFORM defaults to offscreen.
+
+    python -m benchmarks.gui --scales 1 10 --output gui.json
+    python -m benchmarks.gui --baseline gui.json
+"""
+
+import os
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import argparse  # noqa: E402
+import gc  # noqa: E402
+import json  # noqa: E402
+import platform  # noqa: E402
+import random  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+from typing import Dict, List, NamedTuple  # noqa: E402
+
+from PyQt6.QtCore import QObject, QTimer  # noqa: E402
+from PyQt6.QtWidgets import QApplication  # noqa: E402
+
+from benchmarks.core import compare, scale_config, status_words  # noqa: E402
+from src.services.health_adapter import HealthAdapter  # noqa: E402
+from src.services.health_service import (  # noqa: E402
+    HealthService,
+    load_health_config,
+)
+from src.services.mqtt_service import MqttService  # noqa: E402
+from src.ui.main_window import MainWindow  # noqa: E402
+
+
+class Message(NamedTuple):
+    """Stand-in for paho's MQTTMessage, handle_message only reads these"""
+
+    topic: str
+    payload: bytes
+
+
+def make_payloads(cfg: dict, count: int, seed: int) -> List[bytes]:
+    """Monitor status words with pings and wdlm seat updates mixed in"""
+    rng = random.Random(seed)
+    health_service = HealthService(cfg=cfg)
+    monitors = list(health_service.monitors)
+    heartbeats = list(health_service.heartbeats)
+    seats = max(health_service.wdlms.count, cfg["wdlms"].get("seats", 16))
+
+    payloads = []
+    for idx, word in enumerate(status_words(rng, count)):
+        kind = rng.random()
+        if kind < 0.05:
+            msg = {"cmd": rng.choice(heartbeats), "value": idx}
+        elif kind < 0.15:
+            msg = {"cmd": "wdlm", "value": rng.getrandbits(seats)}
+        else:
+            msg = {"cmd": rng.choice(monitors), "value": hex(word)}
+        payloads.append(json.dumps(msg).encode())
+    return payloads
+
+
+def percentile(samples: List[float], q: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def run(app: QApplication, cfg: dict, args) -> Dict[str, float]:
+    health_service = HealthService(cfg=cfg)
+    health_adapter = HealthAdapter(health_service, countdown_interval=0)
+    mqtt_service = MqttService()
+    window = MainWindow(mqtt_service, health_adapter)
+    window.show()
+    app.processEvents()
+
+    topic = mqtt_service.config.subscriptions[0]
+    payloads = make_payloads(cfg, args.messages, args.seed)
+
+    # Warm up so lazily built widgets and caches are not counted as churn
+    for payload in payloads[: args.per_frame * 10]:
+        window.handle_message(None, None, Message(topic, payload))
+    window.render_frame()
+    app.processEvents()
+
+    gc.collect()
+    py_objects = len(gc.get_objects())
+    qt_objects = len(window.findChildren(QObject))
+
+    frames: List[float] = []
+    latencies: List[float] = []
+    fired: List[float] = []
+    start = time.perf_counter()
+    for idx in range(0, len(payloads), args.per_frame):
+        for payload in payloads[idx : idx + args.per_frame]:
+            window.handle_message(None, None, Message(topic, payload))
+
+        rendering = time.perf_counter()
+        window.render_frame()
+        # posted after the synchronous render, measures queueing only
+        posted = time.perf_counter()
+        QTimer.singleShot(0, lambda: fired.append(time.perf_counter()))
+        app.processEvents()
+        done = time.perf_counter()
+
+        frames.append(done - rendering)
+        if fired:
+            latencies.append(fired.pop() - posted)
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    result = {
+        "msgs_per_s": len(payloads) / elapsed,
+        "frame_p50_us": percentile(sorted(frames), 0.5) * 1e6,
+        "frame_p99_us": percentile(sorted(frames), 0.99) * 1e6,
+        "loop_latency_p50_us": percentile(sorted(latencies), 0.5) * 1e6,
+        "loop_latency_p99_us": percentile(sorted(latencies), 0.99) * 1e6,
+        "py_objects_growth": len(gc.get_objects()) - py_objects,
+        "qt_objects_growth": len(window.findChildren(QObject)) - qt_objects,
+        "qt_objects": len(window.findChildren(QObject)),
+    }
+
+    window.close()
+    window.deleteLater()
+    app.processEvents()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--per-frame", type=int, default=10)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against a saved results file")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    base_cfg = load_health_config()
+    results: Dict[str, Dict[str, float]] = {}
+
+    print(
+        f"{'case':<14}{'msgs/s':>10}{'frame p50':>11}{'frame p99':>11}"
+        f"{'loop p99':>10}{'py objs':>9}{'qt objs':>9}"
+    )
+    for scale in args.scales:
+        cfg = scale_config(base_cfg, scale) if scale > 1 else base_cfg
+        label = f"render@{scale}x"
+        result = run(app, cfg, args)
+        results[label] = result
+        print(
+            f"{label:<14}{result['msgs_per_s']:>10.0f}"
+            f"{result['frame_p50_us']:>9.0f}us{result['frame_p99_us']:>9.0f}us"
+            f"{result['loop_latency_p99_us']:>8.0f}us"
+            f"{result['py_objects_growth']:>+9d}{result['qt_objects_growth']:>+9d}"
+        )
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "qpa": os.environ["QT_QPA_PLATFORM"],
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "messages": args.messages,
+            "per_frame": args.per_frame,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        # object growth is churn, any increase over the baseline is a regression
+        for name, result in results.items():
+            base = baseline.get("results", {}).get(name)
+            if base is not None and (
+                result["qt_objects_growth"] > base["qt_objects_growth"]
+            ):
+                print(f"{name}: Qt objects grew by {result['qt_objects_growth']}")
+                regressions.append(name)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s)")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
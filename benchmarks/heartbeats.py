@@ -0,0 +1,77 @@
+"""
+Cost of keeping a fleet's heartbeats current: polling every heartbeat on a
+1 s tick, as the per-heartbeat timers did, against the shared deadline
+scheduler that is only polled when a deadline is due.
+
+    python -m benchmarks.heartbeats
+"""
+
+import argparse
+import random
+import time
+
+from src.services.fleet_service import FleetService
+
+
+def make_fleet(devices: int, clock) -> FleetService:
+    fleet = FleetService(clock=clock)
+    for idx in range(devices):
+        topic = f"ppss/d{idx}/health"
+        for key in fleet.device(f"d{idx}").heartbeats:
+            fleet.process_message(topic, {"cmd": key, "value": 0})
+    return fleet
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--devices", type=int, default=500)
+    parser.add_argument("--seconds", type=int, default=600)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    now = [0.0]
+    fleet = make_fleet(args.devices, lambda: now[0])
+    keys = [
+        (f"ppss/{device_id}/health", key)
+        for device_id, health_service in fleet.devices.items()
+        for key in health_service.heartbeats
+    ]
+    heartbeats = [
+        heartbeat
+        for health_service in fleet.devices.values()
+        for heartbeat in health_service.heartbeats.values()
+    ]
+
+    # Same ping traffic for both: every heartbeat pings about every 10 s
+    rng = random.Random(args.seed)
+    pings = [
+        [keys[idx] for idx in rng.sample(range(len(keys)), len(keys) // 10)]
+        for _ in range(args.seconds)
+    ]
+    seq = [1]
+
+    def drive(poll) -> float:
+        now[0] = 0.0
+        polled = 0.0
+        for second, batch in enumerate(pings):
+            now[0] = float(second + 1)
+            seq[0] += 1
+            for topic, key in batch:
+                fleet.process_message(topic, {"cmd": key, "value": seq[0]})
+            start = time.perf_counter()
+            poll(now[0])
+            polled += time.perf_counter() - start
+        return polled
+
+    scan = drive(lambda t: [hb for hb in heartbeats if hb.poll(t)])
+    fleet.reset_heartbeats()
+    scheduler = drive(fleet.poll)
+
+    print(f"{len(heartbeats)} heartbeats, {args.seconds} s of 1 s ticks")
+    print(f"{'poll every heartbeat':<24}{scan * 1000:>10.1f} ms")
+    print(f"{'deadline scheduler':<24}{scheduler * 1000:>10.1f} ms")
+    print(f"{'speedup':<24}{scan / scheduler:>10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
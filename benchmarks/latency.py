@@ -0,0 +1,154 @@
+"""
+Overhead of the always-on pipeline latency instrumentation. Decodes and
+evaluates a payload stream with and without the sampling and timing
+HealthAdapter.handle_payload does.
+
+A whole-pipeline A/B run varies by more than 1% between identical runs on
+a busy or virtualized box, so the check times the instrumentation on its
+own, one sample() per payload plus the timing of every sampled one, and
+divides by the cost of a payload. The A/B difference is printed as well.
+
+    python -m benchmarks.latency --max-overhead 0.01
+
+Exits 1 when the instrumentation costs more than --max-overhead.
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from typing import List
+
+from benchmarks.core import status_words
+from src.models.delta import DeltaCoalescer
+from src.services.health_service import BatchError, HealthService
+from src.utils.latency import STAGE_DECODE, STAGE_EVALUATE, LatencyTracker
+
+
+def make_payloads(health_service: HealthService, count: int, seed: int) -> List[bytes]:
+    rng = random.Random(seed)
+    monitors = list(health_service.monitors)
+    return [
+        json.dumps({"cmd": rng.choice(monitors), "value": hex(word)}).encode()
+        for word in status_words(rng, count)
+    ]
+
+
+def plain(health_service: HealthService, payloads: List[bytes]) -> None:
+    """Decode, evaluate under the engine lock and fold, like handle_payload"""
+    codec = health_service.codec
+    lock = threading.Lock()
+    coalescer = DeltaCoalescer()
+    for payload in payloads:
+        batch = codec.decode(payload)
+        with lock:
+            try:
+                delta = health_service.process_batch(batch)
+            except BatchError as e:
+                delta = e.delta
+            coalescer.add(delta, len(batch))
+
+
+def timed(
+    health_service: HealthService, payloads: List[bytes], latency: LatencyTracker
+) -> None:
+    """Same loop with the instrumentation of handle_payload"""
+    codec = health_service.codec
+    lock = threading.Lock()
+    coalescer = DeltaCoalescer()
+    for payload in payloads:
+        sampled = latency.sample()
+        if sampled:
+            start = time.perf_counter()
+        batch = codec.decode(payload)
+        if sampled:
+            decoded = time.perf_counter()
+        with lock:
+            try:
+                delta = health_service.process_batch(batch)
+            except BatchError as e:
+                delta = e.delta
+            coalescer.add(delta, len(batch))
+        if sampled:
+            evaluated = time.perf_counter() - decoded
+            latency.record(STAGE_DECODE, decoded - start)
+            latency.record(STAGE_EVALUATE, evaluated)
+            if len(batch) == 1 and isinstance(batch[0][0], str):
+                latency.record_command(batch[0][0], evaluated)
+
+
+def instrumentation(latency: LatencyTracker, count: int, cmd: str) -> None:
+    """Only the instrumentation of timed(), for count payloads"""
+    for _ in range(count):
+        if latency.sample():
+            start = time.perf_counter()
+            decoded = time.perf_counter()
+            evaluated = time.perf_counter() - decoded
+            latency.record(STAGE_DECODE, decoded - start)
+            latency.record(STAGE_EVALUATE, evaluated)
+            latency.record_command(cmd, evaluated)
+
+
+def empty(count: int) -> None:
+    for _ in range(count):
+        pass
+
+
+def best(fn, repeat: int) -> float:
+    result = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        result = min(result, time.perf_counter() - start)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=15)
+    parser.add_argument("--sample-every", type=int, default=None)
+    parser.add_argument("--max-overhead", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    health_service = HealthService()
+    payloads = make_payloads(health_service, args.messages, args.seed)
+    latency = (
+        LatencyTracker(args.sample_every) if args.sample_every else LatencyTracker()
+    )
+
+    count = len(payloads)
+    cmd = next(iter(health_service.monitors))
+    best_plain = best(lambda: plain(health_service, payloads), args.repeat)
+    best_timed = best(lambda: timed(health_service, payloads, latency), args.repeat)
+    best_added = best(lambda: instrumentation(latency, count, cmd), args.repeat)
+    best_added -= best(lambda: empty(count), args.repeat)
+
+    per_payload = best_plain / count
+    added = max(best_added, 0.0) / count
+    overhead = added / per_payload
+    print(f"1 in {latency.sample_every} payloads timed")
+    print(f"payload        {per_payload * 1e9:>8.0f}ns")
+    print(f"instrumented   {added * 1e9:>8.1f}ns  {overhead:>+7.2%}")
+    print(f"A/B            {best_timed / best_plain - 1:>+18.2%}  (noisy)")
+
+    stages = latency.snapshot()["stages"]
+    for stage in (STAGE_DECODE, STAGE_EVALUATE):
+        stats = stages[stage]
+        print(
+            f"{stage:<10} p50 {stats['p50'] * 1e6:.1f}us "
+            f"p99 {stats['p99'] * 1e6:.1f}us ({stats['count']} samples)"
+        )
+
+    if overhead > args.max_overhead:
+        print(f"overhead above {args.max_overhead:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Per-message cost of Monitor.process on the shipped health.json, compiled
+lookup tables against the original set-per-entry evaluation, and of the
+table lookup alone against a direct loop over the masks into the same
+packed codes.
+
+Most of the speedup over the original comes from not building sets and
+dicts per message. The lookup only pays off with more masks: with two it
+is within noise of the direct loop or slightly behind (0.9-1.2x on the
+shipped monitors). process() gains 1.4-3x, and the low end is within what
+a busy box can push below 1x.
+
+    python -m benchmarks.monitor_lut
+"""
+
+import argparse
+import random
+import timeit
+from typing import Callable, Dict, List, Set
+
+from src.models.monitor import Monitor
+from src.models.state import STATE_BITS, State
+from src.services.health_service import HealthService
+
+
+def legacy_process(monitor: Monitor, value: int) -> Dict[str, Set[State]]:
+    """Original evaluation, a fresh set per entry and a fresh dict per message"""
+    result = {}
+    for name, entry in monitor.entries.items():
+        active = {state for mask, state in entry.masks.items() if value & mask}
+        result[name] = active or {State.OFF}
+    return result
+
+
+def direct_evaluator(monitor: Monitor) -> Callable[[int], int]:
+    """Packed codes like MonitorTable.evaluate, testing every mask in turn"""
+    table = monitor.table
+    pairs = [
+        (mask, state.code << (idx * STATE_BITS))
+        for idx, entry in enumerate(monitor.entries.values())
+        for mask, state in entry.masks.items()
+    ]
+    ones = sum(1 << (idx * STATE_BITS) for idx in range(table.size))
+    off_code = State.OFF.code
+    nonzero_slots = table.nonzero_slots
+
+    def evaluate(value: int) -> int:
+        packed = 0
+        for mask, packed_state in pairs:
+            if value & mask:
+                packed |= packed_state
+        return packed | ((ones ^ nonzero_slots(packed)) * off_code)
+
+    return evaluate
+
+
+def make_values(count: int, seed: int) -> List[int]:
+    """Status words with a realistic mix of clear, sparse and random values"""
+    rng = random.Random(seed)
+    choices = [0, 0x80000000, 0x80800000, 0x40000000, 0xF0C00000]
+    return [
+        rng.choice(choices) if rng.random() < 0.8 else rng.getrandbits(32)
+        for _ in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    health_service = HealthService()
+    values = make_values(args.messages, args.seed)
+
+    print(
+        f"{'monitor':<10}{'masks':>6}{'lookups':>8}{'legacy':>10}{'process':>10}"
+        f"{'':>7}{'direct':>10}{'lookup':>10}"
+    )
+    for key, monitor in health_service.monitors.items():
+
+        def run_legacy():
+            for value in values:
+                legacy_process(monitor, value)
+
+        def run_table():
+            for value in values:
+                monitor.process(value)
+
+        direct_evaluate = direct_evaluator(monitor)
+
+        def run_direct():
+            for value in values:
+                direct_evaluate(value)
+
+        def run_lookup():
+            for value in values:
+                monitor.table.evaluate(value)
+
+        assert all(
+            direct_evaluate(value) == monitor.table.evaluate(value)
+            for value in values
+        )
+        legacy, table, direct, lookup = (
+            min(timeit.repeat(run, number=1, repeat=args.repeat)) / args.messages
+            for run in (run_legacy, run_table, run_direct, run_lookup)
+        )
+        masks = sum(len(entry.masks) for entry in monitor.entries.values())
+        print(
+            f"{key:<10}{masks:>6}{monitor.table.lookups:>8}"
+            f"{legacy * 1e9:>8.0f}ns{table * 1e9:>8.0f}ns{legacy / table:>6.1f}x"
+            f"{direct * 1e9:>8.0f}ns{lookup * 1e9:>8.0f}ns{direct / lookup:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
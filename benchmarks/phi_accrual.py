@@ -0,0 +1,104 @@
+"""
+Simulated time-to-detect and false alarm rate of the fixed time_limit and
+retry_limit against the phi accrual detector at several thresholds.
+
+A sender pings every --period seconds with gaussian jitter, pings travel
+with a small network delay and occasionally a long spike. After --pings
+healthy pings the sender dies and the time until the heartbeat times out
+is measured from the last ping. Runs on a virtual clock.
+
+    python -m benchmarks.phi_accrual
+"""
+
+import argparse
+import random
+from typing import List, Optional, Tuple
+
+from src.models.heartbeat import Heartbeat
+from src.models.phi_accrual import PhiAccrualDetector
+
+
+def arrivals(args, rng: random.Random) -> List[Tuple[float, int]]:
+    """(arrival time, ping number) of one healthy run, in arrival order"""
+    pings = []
+    for seq in range(1, args.pings + 1):
+        sent = seq * args.period + rng.gauss(0.0, args.jitter)
+        delay = rng.expovariate(1.0 / args.delay)
+        if rng.random() < args.spike_rate:
+            delay += rng.uniform(0.0, args.spike)
+        pings.append((sent + delay, seq))
+    return sorted(pings)
+
+
+def advance(heartbeat: Heartbeat, until: float) -> Optional[float]:
+    """Step through deadlines up to until, returns when it timed out"""
+    while heartbeat.active and heartbeat.deadline <= until:
+        deadline = heartbeat.deadline
+        if heartbeat.poll(deadline):
+            return deadline
+    return None
+
+
+def trial(args, threshold: Optional[float], seed: int) -> Tuple[int, float]:
+    """Returns false alarms during the healthy run and the time to detect"""
+    now = [0.0]
+    detector = PhiAccrualDetector(threshold) if threshold is not None else None
+    heartbeat = Heartbeat(
+        "ping", args.retry_limit, args.time_limit, lambda: now[0], detector
+    )
+
+    false_alarms = 0
+    last = 0.0
+    for arrival, seq in arrivals(args, random.Random(seed)):
+        if advance(heartbeat, arrival) is not None:
+            false_alarms += 1
+            heartbeat.reset()
+        now[0] = arrival
+        heartbeat.process(seq, arrival)
+        last = arrival
+
+    # the sender is gone, wait for the heartbeat to give up
+    detected = advance(heartbeat, float("inf"))
+    return false_alarms, detected - last
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--period", type=float, default=50.0)
+    parser.add_argument("--jitter", type=float, default=1.0)
+    parser.add_argument("--delay", type=float, default=0.05)
+    parser.add_argument("--spike", type=float, default=10.0)
+    parser.add_argument("--spike-rate", type=float, default=0.01)
+    parser.add_argument("--time-limit", type=int, default=60)
+    parser.add_argument("--retry-limit", type=int, default=3)
+    parser.add_argument("--pings", type=int, default=500)
+    parser.add_argument("--trials", type=int, default=200)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[3, 8, 12])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    hours = args.trials * args.pings * args.period / 3600
+    print(
+        f"{args.trials} trials of {args.pings} pings every {args.period:g}s, "
+        f"{hours:.0f} simulated hours"
+    )
+    print(
+        f"{'detector':<16}{'false alarms':>14}{'per 1000h':>11}"
+        f"{'mean ttd':>10}{'max ttd':>10}"
+    )
+
+    for threshold in [None, *args.thresholds]:
+        results = [
+            trial(args, threshold, args.seed + idx) for idx in range(args.trials)
+        ]
+        alarms = sum(alarms for alarms, _ in results)
+        ttd = [ttd for _, ttd in results]
+        label = "fixed" if threshold is None else f"phi {threshold:g}"
+        print(
+            f"{label:<16}{alarms:>14}{alarms / hours * 1000:>11.2f}"
+            f"{sum(ttd) / len(ttd):>9.1f}s{max(ttd):>9.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Replays a capture file through decode and evaluation as fast as possible,
+the throughput driver for recorded field traffic. Without a capture, one is
+synthesized: a controller publishing every monitor, wdlm seats and pings,
+with a gap long enough for heartbeats to time out.
+
+    python main.py --headless --record capture.wdrc
+    python -m benchmarks.replay capture.wdrc
+    python -m benchmarks.replay --synthesize 100000
+"""
+
+import argparse
+import json
+import random
+import tempfile
+from pathlib import Path
+from typing import List, Tuple
+
+from src.constants import DEFAULT_MQTT_SUBSCRIPTIONS
+from src.services.capture import CaptureWriter, Replayer
+from src.services.health_service import BatchError, HealthService
+from src.utils.clock import VirtualClock
+
+
+def synthesize(path: Path, messages: int, seed: int) -> None:
+    """Write a capture of a controller at 20 msgs/s that drops out once"""
+    rng = random.Random(seed)
+    health_service = HealthService()
+    monitors = list(health_service.monitors)
+    topic = DEFAULT_MQTT_SUBSCRIPTIONS[0]
+
+    capture = CaptureWriter(path)
+    now = 0.0
+    for idx in range(messages):
+        now += 0.05
+        if idx == messages // 2:
+            # the controller goes quiet for ten minutes
+            now += 600.0
+        kind = rng.random()
+        if kind < 0.05:
+            msg = {"cmd": rng.choice(list(health_service.heartbeats)), "value": idx}
+        elif kind < 0.1:
+            msg = {"cmd": "wdlm", "value": format(rng.getrandbits(16), "016b")}
+        else:
+            msg = {"cmd": rng.choice(monitors), "value": hex(rng.getrandbits(32))}
+        capture.write(topic, json.dumps(msg).encode(), now)
+    capture.close()
+
+
+def replay(path: Path, speed: float) -> Tuple[List[Tuple[float, str]], float]:
+    """Replay into a fresh HealthService, returns timeouts and msgs/s"""
+    clock = VirtualClock()
+    health_service = HealthService(clock)
+    codec = health_service.codec
+    timeouts: List[Tuple[float, str]] = []
+
+    def handle(topic: str, payload: bytes) -> None:
+        try:
+            health_service.process_batch(codec.decode(payload))
+        except (BatchError, ValueError):
+            pass
+
+    def poll() -> None:
+        for key in health_service.poll():
+            timeouts.append((clock(), key))
+            health_service.heartbeats[key].reset()
+
+    stats = Replayer(path, clock, speed).run(
+        handle, poll=poll, next_deadline=health_service.next_deadline
+    )
+    print(
+        f"{stats.messages} messages, {stats.payload_bytes / stats.messages:.1f} "
+        f"bytes each, {stats.recorded:.0f}s recorded in {stats.elapsed:.2f}s: "
+        f"{stats.rate:.0f} msgs/s"
+    )
+    return timeouts, stats.rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("capture", nargs="?", type=Path)
+    parser.add_argument("--synthesize", type=int, default=100000)
+    parser.add_argument("--speed", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.capture
+        if path is None:
+            path = Path(tmp) / "synthetic.wdrc"
+            synthesize(path, args.synthesize, args.seed)
+
+        first, _ = replay(path, args.speed)
+        second, _ = replay(path, args.speed)
+        print(f"{len(first)} heartbeat timeouts")
+        for at, key in first:
+            print(f"  {at:10.3f}s {key}")
+        print("timeouts reproduced" if first == second else "timeouts DIFFER")
+
+
+if __name__ == "__main__":
+    main()
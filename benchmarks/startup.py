@@ -0,0 +1,190 @@
+"""
+Time to first paint of the GUI, offscreen. Every run is a fresh interpreter
+that imports Qt and the app, builds the services and MainWindow the way
+main.py does and stops at the first paint of the window, then waits for the
+deferred docks, tabs and heartbeats to be filled in. The median of --runs is
+reported with the phases of that run, after one warm-up run that also
+refreshes the compiled health.json cache.
+
+    python -m benchmarks.startup --target 1.0
+    python -m benchmarks.startup --scale 10
+
+Exits 1 when the median time to first paint is above --target seconds.
+Runs on a headless box, QT_QPA_PLATFORM defaults to offscreen.
+"""
+
+import time
+
+STARTED = time.perf_counter()
+
+import argparse  # noqa: E402
+import json  # noqa: E402
+import os  # noqa: E402
+import subprocess  # noqa: E402
+import sys  # noqa: E402
+import tempfile  # noqa: E402
+from pathlib import Path  # noqa: E402
+from typing import Dict, List  # noqa: E402
+
+from src.constants import CACHE_DIR, HEALTH_CONFIG, PROJECT_ROOT  # noqa: E402
+from src.utils.startup import StartupProfile  # noqa: E402
+
+# a run that never paints is a failure, not a hang
+PAINT_TIMEOUT = 30.0
+
+
+def child(config: str, cache_dir: str, start: float = STARTED) -> Dict:
+    """One startup, run in a fresh interpreter by main"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    profile = StartupProfile(start=start)
+
+    from PyQt6.QtCore import QEvent, QObject
+    from PyQt6.QtWidgets import QApplication
+
+    from src.constants import HEALTH_CACHE_VERSION
+    from src.services.health_adapter import HealthAdapter
+    from src.services.health_service import HealthService, compile_health_config
+    from src.services.mqtt_service import MqttService
+    from src.ui.main_window import MainWindow
+    from src.ui.widgets.lazy_widget import LazyWidget
+    from src.utils.cache import load_compiled
+
+    profile.mark("imports")
+
+    class PaintWatcher(QObject):
+        painted = False
+
+        def eventFilter(self, obj: QObject, event: QEvent) -> bool:
+            if event.type() == QEvent.Type.Paint:
+                self.painted = True
+            return False
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    profile.mark("qt app")
+
+    cfg = load_compiled(
+        config,
+        lambda raw: compile_health_config(json.loads(raw)),
+        HEALTH_CACHE_VERSION,
+        cache_dir,
+    )
+    health_service = HealthService(cfg=cfg)
+    profile.mark("health config")
+
+    mqtt_service = MqttService()
+    health_adapter = HealthAdapter(health_service, countdown_interval=0)
+    window = MainWindow(mqtt_service, health_adapter)
+    profile.mark("main window")
+
+    watcher = PaintWatcher()
+    app.installEventFilter(watcher)
+    window.show()
+    deadline = time.perf_counter() + PAINT_TIMEOUT
+    while not watcher.painted:
+        if time.perf_counter() > deadline:
+            raise RuntimeError(f"no paint within {PAINT_TIMEOUT:.0f}s")
+        app.processEvents()
+    profile.mark("first paint")
+    first_paint = profile.total
+    app.removeEventFilter(watcher)
+
+    def pending() -> List[LazyWidget]:
+        return [
+            widget
+            for widget in window.findChildren(LazyWidget)
+            if widget.isVisible() and widget.widget is None
+        ]
+
+    while pending():
+        if time.perf_counter() > deadline:
+            raise RuntimeError(f"contents not built within {PAINT_TIMEOUT:.0f}s")
+        app.processEvents()
+    app.processEvents()
+    profile.mark("contents")
+
+    deferred = sum(
+        widget.widget is not None for widget in window.findChildren(LazyWidget)
+    )
+    window.close()
+    return {
+        "first_paint": first_paint,
+        "total": profile.total,
+        "phases": profile.phases,
+        "deferred": deferred,
+    }
+
+
+def run_child(config: str, cache_dir: str) -> Dict:
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.startup",
+            "--child",
+            "--config",
+            config,
+            "--cache-dir",
+            cache_dir,
+        ],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        raise SystemExit(f"startup run failed with exit code {result.returncode}")
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--target", type=float, default=1.0)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--config", default=str(HEALTH_CONFIG), help=argparse.SUPPRESS)
+    parser.add_argument("--cache-dir", default=str(CACHE_DIR), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.config, args.cache_dir)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config, cache_dir = str(HEALTH_CONFIG), str(CACHE_DIR)
+        if args.scale > 1:
+            from benchmarks.core import scale_config
+            from src.services.health_service import load_health_config
+
+            config = str(Path(tmp) / "health.json")
+            cache_dir = str(Path(tmp) / "cache")
+            with open(config, "w") as f:
+                json.dump(scale_config(load_health_config(), args.scale), f)
+
+        run_child(config, cache_dir)
+        runs = sorted(
+            (run_child(config, cache_dir) for _ in range(args.runs)),
+            key=lambda run: run["first_paint"],
+        )
+
+    median = runs[len(runs) // 2]
+    for phase, seconds in median["phases"]:
+        print(f"{phase:<16} {seconds * 1e3:>8.1f}ms")
+    print(
+        f"first paint {median['first_paint'] * 1e3:.0f}ms "
+        f"(min {runs[0]['first_paint'] * 1e3:.0f}ms, "
+        f"max {runs[-1]['first_paint'] * 1e3:.0f}ms), "
+        f"contents {median['total'] * 1e3:.0f}ms, "
+        f"{median['deferred']} deferred widget(s) built"
+    )
+
+    if median["first_paint"] > args.target:
+        print(f"first paint above {args.target * 1e3:.0f}ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,181 @@
+import argparse
+import logging
 import signal
 import sys
+import threading
+import time
+from typing import Optional
 
-from PyQt6.QtCore import QTimer
+from src.utils.startup import StartupProfile
 
-from src.app import App
-from src.services.health_service import HealthService
-from src.services.mqtt_service import MqttService
-from src.ui.main_window import MainWindow
+logger = logging.getLogger(__name__)
 
+_STARTED = time.perf_counter()
 
-def main():
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Monitor the health of a WDRC")
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="run the health engine as a daemon without the GUI",
+    )
+    parser.add_argument(
+        "--fleet",
+        action="store_true",
+        help="with --headless, monitor every device on the fleet wildcard topic",
+    )
+    parser.add_argument(
+        "--record",
+        metavar="PATH",
+        help="record every received mqtt message to a capture file",
+    )
+    parser.add_argument(
+        "--replay",
+        metavar="PATH",
+        help="feed a capture file in instead of mqtt, on its recorded clock",
+    )
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="replay speed, 1 is real time and 0 is as fast as possible",
+    )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="print how long each startup phase took",
+    )
+    args, _ = parser.parse_known_args(argv[1:])
+    return args
+
+
+def run_gui(
+    record: Optional[str] = None,
+    replay: Optional[str] = None,
+    speed: float = 1.0,
+    profile: Optional[StartupProfile] = None,
+) -> int:
+    if profile is None:
+        profile = StartupProfile(enabled=False)
+
+    from PyQt6.QtCore import QTimer
+
+    from src.app import App
+    from src.services.health_adapter import HealthAdapter
+    from src.services.health_service import HealthService
+    from src.services.mqtt_service import MqttService
+    from src.ui.main_window import MainWindow
+
+    profile.mark("imports")
     app = App(sys.argv)
+    profile.mark("qt app")
 
     signal.signal(signal.SIGINT, signal.SIG_DFL)
     timer = QTimer()
     timer.start(100)
     timer.timeout.connect(lambda: None)
 
+    event_log = None
+    if app.config.event_log:
+        from src.services.event_log import EventLogWriter
+
+        event_log = EventLogWriter()
+        app.aboutToQuit.connect(event_log.close)
+
+    # a replay drives heartbeats from the recorded receive times
+    clock = time.monotonic
+    if replay is not None:
+        from src.utils.clock import VirtualClock
+
+        clock = VirtualClock()
+
     mqtt_service = MqttService()
-    monitor_service = HealthService()
+    if record is not None:
+        from src.services.capture import CaptureWriter
+
+        capture = CaptureWriter(record)
+        mqtt_service.set_capture(capture)
+        app.aboutToQuit.connect(capture.close)
+    profile.mark("mqtt service")
+
+    health_service = HealthService(clock)
+    profile.mark("health config")
+    health_adapter = HealthAdapter(
+        health_service,
+        mqtt_service.config.payload_formats,
+        countdown_interval=app.config.countdown_interval,
+        event_log=event_log,
+    )
 
-    main_window = MainWindow(mqtt_service, monitor_service)
+    main_window = MainWindow(
+        mqtt_service, health_adapter, refresh_rate=app.config.refresh_rate
+    )
     main_window.show()
+    profile.mark("main window")
+    # runs once the loop has handled the show and paint events queued above
+    QTimer.singleShot(0, lambda: (profile.mark("first paint"), profile.report()))
+
+    if app.config.metrics_port is not None:
+        from src.services.metrics import MetricsExporter
+
+        try:
+            exporter = MetricsExporter(
+                app.config.metrics_port,
+                [mqtt_service.collect_metrics, health_adapter.collect_metrics],
+            )
+        except OSError as e:
+            logger.warning(f"metrics disabled, unable to serve: {str(e)}")
+        else:
+            app.aboutToQuit.connect(exporter.close)
+
+    if replay is not None:
+        from src.services.capture import Replayer
+
+        stop = threading.Event()
+        app.aboutToQuit.connect(stop.set)
+        threading.Thread(
+            target=Replayer(replay, clock, speed).run,
+            args=(mqtt_service.router.route,),
+            kwargs={
+                "poll": health_adapter.poll_heartbeats,
+                "next_deadline": health_adapter.next_deadline,
+                "stop": stop,
+            },
+            name="replay",
+            daemon=True,
+        ).start()
+
+    return app.exec()
+
+
+def main():
+    args = parse_args(sys.argv)
+    profile = StartupProfile(enabled=args.profile_startup, start=_STARTED)
+
+    from src.utils.log import setup_logging
+
+    setup_logging()
+    profile.mark("logging")
+
+    if args.headless:
+        from src.headless import run_headless
+
+        sys.exit(
+            run_headless(
+                fleet=args.fleet,
+                record=args.record,
+                replay=args.replay,
+                speed=args.speed,
+                profile=profile,
+            )
+        )
 
-    sys.exit(app.exec())
-    mqtt_service._cancel()
+    sys.exit(
+        run_gui(
+            record=args.record, replay=args.replay, speed=args.speed, profile=profile
+        )
+    )
 
 
 if __name__ == "__main__":
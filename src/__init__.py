@@ -1,4 +1,3 @@
-from .app import App
 from .config import AppConfig, MqttConfig
 
 __all__ = [
@@ -6,3 +5,12 @@ __all__ = [
     "AppConfig",
     "MqttConfig",
 ]
+
+
+def __getattr__(name: str):
+    # App is a QApplication, import on demand so headless mode never loads Qt
+    if name == "App":
+        from .app import App
+
+        return App
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,15 +3,8 @@ import logging
 from PyQt6.QtWidgets import QApplication
 
 from src.config import AppConfig
-from src.constants import APP_LOG
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
 logger = logging.getLogger(__name__)
-fh = logging.FileHandler(APP_LOG)
-logger.addHandler(fh)
 
 
 class App(QApplication):
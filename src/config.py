@@ -1,33 +1,34 @@
 import json
 import logging
-from typing import Any, List
+from typing import Any, Dict, List, Optional
 
 from src.constants import (
     APP_CONFIG,
-    APP_LOG,
     DARK_STYLESHEET,
     DEFAULT_APP_NAME,
     DEFAULT_APP_THEME,
     DEFAULT_APP_VERSION,
+    DEFAULT_COUNTDOWN_INTERVAL,
+    DEFAULT_EVENT_LOG_ENABLED,
+    DEFAULT_FLEET_ENABLED,
+    DEFAULT_FLEET_SUBSCRIPTION,
+    DEFAULT_METRICS_PORT,
     DEFAULT_MQTT_HOST,
     DEFAULT_MQTT_PASSWORD,
+    DEFAULT_MQTT_PAYLOAD_FORMAT,
     DEFAULT_MQTT_PORT,
     DEFAULT_MQTT_SUBSCRIPTIONS,
     DEFAULT_MQTT_USERNAME,
     DEFAULT_ORGANIZATION_NAME,
+    DEFAULT_REFRESH_RATE,
     DEFAULT_RETRIES_LIMIT,
     LIGHT_STYLESHEET,
     MQTT_CONFIG,
     STYLES_DIR,
 )
+from src.utils.topics import topic_matches
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
 logger = logging.getLogger(__name__)
-fh = logging.FileHandler(APP_LOG)
-logger.addHandler(fh)
 
 
 class Config:
@@ -93,6 +94,26 @@ class AppConfig(Config):
         """Set the theme in the dictionary"""
         self._data["theme"] = value
 
+    @property
+    def refresh_rate(self) -> int:
+        """UI refreshes per second specified in filepath or default refresh rate"""
+        return self._data.get("refresh_rate", DEFAULT_REFRESH_RATE)
+
+    @property
+    def countdown_interval(self) -> int:
+        """Milliseconds between heartbeat countdown updates, 0 turns them off"""
+        return self._data.get("countdown_interval", DEFAULT_COUNTDOWN_INTERVAL)
+
+    @property
+    def event_log(self) -> bool:
+        """Whether messages and state changes go to the binary event log"""
+        return self._data.get("event_log", DEFAULT_EVENT_LOG_ENABLED)
+
+    @property
+    def metrics_port(self) -> Optional[int]:
+        """Localhost port serving /metrics, None to turn the endpoint off"""
+        return self._data.get("metrics_port", DEFAULT_METRICS_PORT)
+
     @property
     def stylesheets(self) -> dict[str, str]:
         """Gets filepaths for stylesheets"""
@@ -139,8 +160,45 @@ class MqttConfig(Config):
 
     @property
     def subscriptions(self) -> List[str]:
-        return self._data.get("subscriptions", DEFAULT_MQTT_SUBSCRIPTIONS)
+        subscriptions = self._data.get("subscriptions", DEFAULT_MQTT_SUBSCRIPTIONS)
+        return [
+            sub["topic"] if isinstance(sub, dict) else sub for sub in subscriptions
+        ]
+
+    @property
+    def payload_formats(self) -> Dict[str, str]:
+        """Subscription pattern to payload format ("auto", "json" or "binary")"""
+        formats = {}
+        for sub in self._data.get("subscriptions", DEFAULT_MQTT_SUBSCRIPTIONS):
+            if isinstance(sub, dict):
+                formats[sub["topic"]] = sub.get("format", DEFAULT_MQTT_PAYLOAD_FORMAT)
+            else:
+                formats[sub] = DEFAULT_MQTT_PAYLOAD_FORMAT
+
+        fleet = self._data.get("fleet", {})
+        formats.setdefault(
+            self.fleet_subscription,
+            fleet.get("format", DEFAULT_MQTT_PAYLOAD_FORMAT),
+        )
+        return formats
+
+    def payload_format(self, topic: str) -> str:
+        """Payload format negotiated for the first subscription matching topic"""
+        for pattern, fmt in self.payload_formats.items():
+            if topic_matches(pattern, topic):
+                return fmt
+        return DEFAULT_MQTT_PAYLOAD_FORMAT
 
     @property
     def retry_limit(self) -> int:
         return self._data.get("retry_limit", DEFAULT_RETRIES_LIMIT)
+
+    @property
+    def fleet_enabled(self) -> bool:
+        return self._data.get("fleet", {}).get("enabled", DEFAULT_FLEET_ENABLED)
+
+    @property
+    def fleet_subscription(self) -> str:
+        return self._data.get("fleet", {}).get(
+            "subscription", DEFAULT_FLEET_SUBSCRIPTION
+        )
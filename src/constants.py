@@ -6,6 +6,7 @@ SRC_DIR = PROJECT_ROOT / "src"
 ASSETS_DIR = PROJECT_ROOT / "assets"
 CONFIG_DIR = PROJECT_ROOT / "config"
 LOGS_DIR = PROJECT_ROOT / "logs"
+CACHE_DIR = PROJECT_ROOT / "cache"
 
 # Asset paths
 ICONS_DIR = ASSETS_DIR / "icons"
@@ -18,6 +19,14 @@ DARK_STYLESHEET = STYLES_DIR / "dark.css"
 APP_CONFIG = CONFIG_DIR / "app.json"
 APP_LOG = LOGS_DIR / "app.log"
 
+# Logging
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 5
+MESSAGE_LOG_INTERVAL = 10.0
+# How often the GUI checks for a due summary while no messages arrive
+MESSAGE_LOG_POLL = 1.0
+
 # Application constants
 DEFAULT_APP_NAME = "My Application"
 DEFAULT_APP_THEME = "dark"
@@ -28,6 +37,8 @@ DEFAULT_ORGANIZATION_NAME = "Your Company"
 DEFAULT_WINDOW_MIN_WIDTH = 800
 DEFAULT_WINDOW_MIN_HEIGHT = 600
 DEFAULT_FONT_SIZE = 12
+DEFAULT_REFRESH_RATE = 20
+DEFAULT_COUNTDOWN_INTERVAL = 1000
 
 # MQTT files
 MQTT_CONFIG = CONFIG_DIR / "mqtt.json"
@@ -39,8 +50,35 @@ DEFAULT_MQTT_PORT = 1883
 DEFAULT_MQTT_USERNAME = ""
 DEFAULT_MQTT_PASSWORD = ""
 DEFAULT_MQTT_SUBSCRIPTIONS = ["ppss/health"]
+DEFAULT_MQTT_PAYLOAD_FORMAT = "auto"
 DEFAULT_RETRIES_LIMIT = 3
+DEFAULT_FLEET_ENABLED = False
+DEFAULT_FLEET_SUBSCRIPTION = "ppss/+/health"
+# Distinct topics counted individually, fleet topics grow with the devices
+TOPICS_TRACKED = 256
 
 # Health Monitor files
 HEALTH_CONFIG = CONFIG_DIR / "health.json"
 HEALTH_LOG = LOGS_DIR / "health.log"
+# Bump when the compiled health config changes shape
+HEALTH_CACHE_VERSION = 3
+WDLM_COMMAND = "wdlm"
+# Most seats a payload may address unless health.json configures more
+MAX_WDLM_SEATS = 4096
+DEFAULT_HISTORY_CAPACITY = 256
+
+# Event log
+EVENTS_DIR = LOGS_DIR / "events"
+EVENT_LOG_SEGMENT_RECORDS = 1 << 20
+DEFAULT_EVENT_LOG_ENABLED = False
+
+# Diagnostics
+DEFAULT_LATENCY_SAMPLE_EVERY = 128
+LATENCY_WINDOW = 60.0
+DEFAULT_METRICS_PORT = None
+DEFAULT_METRICS_HOST = "127.0.0.1"
+METRICS_INTERVAL = 5.0
+
+# Headless constants
+HEADLESS_MAX_SLEEP = 1.0
+FLEET_OVERVIEW_INTERVAL = 10.0
@@ -0,0 +1,365 @@
+import logging
+import signal
+import threading
+import time
+from functools import partial
+from typing import List, Optional, Set
+
+import paho.mqtt.client as mqtt
+
+from src.config import AppConfig, MqttConfig
+from src.constants import (
+    DEFAULT_MQTT_PAYLOAD_FORMAT,
+    FLEET_OVERVIEW_INTERVAL,
+    HEADLESS_MAX_SLEEP,
+)
+from src.models.heartbeat import Heartbeat
+from src.services.capture import CaptureWriter, Replayer
+from src.services.event_log import EventLogWriter
+from src.services.fleet_service import FleetService
+from src.services.health_service import HealthService, load_compiled_health_config
+from src.services.ingest import MessageIntake, PayloadProcessor
+from src.services.metrics import (
+    MetricsBuilder,
+    MetricsExporter,
+    collect_counts,
+    collect_health,
+    collect_latency,
+    snapshot_health,
+)
+from src.utils.clock import VirtualClock
+from src.utils.latency import LatencyTracker
+from src.utils.startup import StartupProfile
+from src.utils.topics import TopicRouter
+
+logger = logging.getLogger(__name__)
+
+
+class HeadlessMonitor:
+    """Runs the health engine against the broker without a GUI"""
+
+    def __init__(
+        self,
+        health_service: Optional[HealthService] = None,
+        config: Optional[MqttConfig] = None,
+        fleet: Optional[FleetService] = None,
+        event_log: Optional[EventLogWriter] = None,
+        capture: Optional[CaptureWriter] = None,
+    ) -> None:
+        self.config = config or MqttConfig()
+        self.health_service = health_service or HealthService(rearm_heartbeats=True)
+
+        # fleet mode, every device on the wildcard topic gets its own health
+        self.fleet = fleet
+        self.event_log = event_log
+        self.latency = LatencyTracker()
+        self._connects = 0
+        self._degraded: List[str] = []
+        self._next_overview = 0.0
+
+        # topic router built once from config, format bound per subscription
+        formats = self.config.payload_formats
+        router = TopicRouter()
+        for topic in self.config.subscriptions:
+            router.add(topic, partial(self._handle_health, formats[topic]))
+        if self.fleet is not None:
+            router.add(
+                self.fleet.subscription,
+                partial(
+                    self._handle_fleet,
+                    formats.get(self.fleet.subscription, DEFAULT_MQTT_PAYLOAD_FORMAT),
+                ),
+            )
+
+        self._intake = MessageIntake(router, logger, self.latency, capture)
+
+        # engine is shared between the paho network thread and the poll loop
+        self._lock = threading.Lock()
+        self._processor = PayloadProcessor(
+            self._lock, self._engine, self.latency, event_log
+        )
+        self._stop = threading.Event()
+
+        self.client = mqtt.Client()
+        self.client.on_connect = self._on_connect
+        self.client.on_message = self._on_message
+        self.client.on_disconnect = self._on_disconnect
+
+    def run(self) -> int:
+        """Connect and poll heartbeats until stopped, returns an exit code"""
+        self.client.username_pw_set(self.config.username, self.config.password)
+        self.client.reconnect_delay_set(min_delay=1, max_delay=30)
+        try:
+            self.client.connect_async(self.config.host, self.config.port)
+            self.client.loop_start()
+        except Exception as e:
+            logger.error(f"failed to start mqtt loop: {str(e)}")
+            return 1
+
+        try:
+            while not self._stop.is_set():
+                self._stop.wait(self._poll())
+        finally:
+            self._intake.flush_log()
+            self.client.loop_stop()
+            self.client.disconnect()
+        return 0
+
+    def replay(self, replayer: Replayer) -> int:
+        """Replay a capture instead of connecting, returns an exit code"""
+        stats = replayer.run(
+            self._intake.router.route,
+            poll=self._poll,
+            next_deadline=self._next_deadline,
+            stop=self._stop,
+        )
+        logger.info(
+            f"replayed {stats.messages} messages covering {stats.recorded:.1f}s "
+            f"in {stats.elapsed:.1f}s, {stats.rate:.0f} msgs/s"
+        )
+        return 0
+
+    def _next_deadline(self) -> Optional[float]:
+        with self._lock:
+            deadlines = [self.health_service.next_deadline()]
+            if self.fleet is not None:
+                deadlines.append(self.fleet.next_deadline())
+        return min((d for d in deadlines if d is not None), default=None)
+
+    def collect_metrics(self, builder: MetricsBuilder) -> None:
+        """Engine, fleet, message and latency metrics, any thread"""
+        # copy under the lock, format outside it
+        with self._lock:
+            snapshots = [({}, snapshot_health(self.health_service))]
+            if self.fleet is not None:
+                snapshots.extend(
+                    ({"device": device_id}, snapshot_health(health_service))
+                    for device_id, health_service in self.fleet.devices.items()
+                )
+        for labels, snapshot in snapshots:
+            collect_health(builder, snapshot, labels)
+
+        collect_counts(
+            builder,
+            "messages_received_total",
+            "Messages received by topic",
+            "topic",
+            self._intake.topic_counts,
+        )
+        builder.add(
+            "decode_errors_total",
+            "counter",
+            "Payloads dropped because they could not be decoded",
+            self._processor.decode_errors,
+        )
+        builder.add(
+            "process_errors_total",
+            "counter",
+            "Commands rejected by the engine",
+            self._processor.process_errors,
+        )
+        builder.add(
+            "mqtt_reconnects_total",
+            "counter",
+            "Connections made after the first",
+            max(self._connects - 1, 0),
+        )
+        collect_latency(builder, self.latency)
+
+    def stop(self) -> None:
+        """Stop the poll loop, safe to call from a signal handler"""
+        self._stop.set()
+
+    def _poll(self) -> float:
+        """Advance heartbeats, log timeouts, returns seconds until next deadline"""
+        # summaries are due even when no message arrives to trigger them
+        self._intake.update_log()
+        clock = self.health_service.clock
+        with self._lock:
+            now = clock()
+            for key in self.health_service.poll(now):
+                heartbeat = self.health_service.heartbeats[key]
+                reason = _timeout_reason(heartbeat)
+                logger.error(f"heartbeat '{heartbeat.name}' {reason}")
+                if self.event_log is not None:
+                    self.event_log.record_timeout(key)
+            deadline = self.health_service.next_deadline()
+
+            if self.fleet is not None:
+                deadline = self._poll_fleet(now, deadline)
+
+        if deadline is None:
+            return HEADLESS_MAX_SLEEP
+        return min(max(deadline - clock(), 0.0), HEADLESS_MAX_SLEEP)
+
+    def _poll_fleet(self, now: float, deadline: Optional[float]) -> Optional[float]:
+        """
+        Advance fleet heartbeats and log the degraded overview when due.
+        Timed out heartbeats stay timed out, and the device degraded, until
+        the next ping re-arms them.
+        """
+        for device_id, key in self.fleet.poll(now):
+            heartbeat = self.fleet.devices[device_id].heartbeats[key]
+            logger.error(
+                f"{device_id}: heartbeat '{heartbeat.name}' "
+                f"{_timeout_reason(heartbeat)}"
+            )
+            if self.event_log is not None:
+                self.event_log.record_timeout(key, device_id)
+
+        if now >= self._next_overview:
+            self._next_overview = now + FLEET_OVERVIEW_INTERVAL
+            self._log_overview()
+
+        deadlines = [deadline, self.fleet.next_deadline()]
+        return min((d for d in deadlines if d is not None), default=None)
+
+    def _log_overview(self) -> None:
+        """Log the degraded devices whenever the set changes"""
+        degraded = self.fleet.degraded()
+        if degraded == self._degraded:
+            return
+        self._degraded = degraded
+
+        total = len(self.fleet.devices)
+        if degraded:
+            logger.warning(
+                f"fleet: {len(degraded)}/{total} degraded: {', '.join(degraded)}"
+            )
+        else:
+            logger.info(f"fleet: all {total} devices healthy")
+
+    # ========================
+    # MQTT CALLBACKS
+    # ========================
+
+    def _on_connect(
+        self,
+        client: mqtt.Client,
+        userdata: Set,
+        flags: mqtt.ConnectFlags,
+        rc: int,
+    ):
+        self._connects += 1
+        for topic in self.config.subscriptions:
+            client.subscribe(topic)
+        if self.fleet is not None:
+            client.subscribe(self.fleet.subscription)
+        logger.info(f"connected to {self.config.host}:{self.config.port}: {rc}")
+
+    def _on_disconnect(
+        self,
+        client: mqtt.Client,
+        userdata: Set,
+        rc: int,
+    ):
+        logger.info(f"disconnected from {self.config.host}:{self.config.port} rc={rc}")
+        with self._lock:
+            self.health_service.reset_heartbeats()
+            if self.fleet is not None:
+                self.fleet.reset_heartbeats()
+
+    def _on_message(
+        self,
+        client: mqtt.Client,
+        userdata: Set,
+        mqtt_msg: mqtt.MQTTMessage,
+    ):
+        # unrouted topics are dropped before any decoding
+        self._intake.receive(mqtt_msg.topic, mqtt_msg.payload, mqtt_msg.timestamp)
+
+    def _handle_health(self, fmt: str, topic: str, payload: bytes) -> None:
+        """Decode and evaluate a payload for the single health service"""
+        self._processor.process(self.health_service.codec, fmt, topic, payload)
+
+    def _handle_fleet(self, fmt: str, topic: str, payload: bytes) -> None:
+        """Decode and evaluate a payload for the device named in the topic"""
+        device_id = self.fleet.device_id(topic)
+        if device_id is not None:
+            self._processor.process(self.fleet.codec, fmt, topic, payload, device_id)
+
+    def _engine(self, device_id: Optional[str]) -> HealthService:
+        """Health of a fleet device, created on first sight, or the single one"""
+        if device_id is None:
+            return self.health_service
+        return self.fleet.device(device_id)
+
+
+def _timeout_reason(heartbeat: Heartbeat) -> str:
+    if heartbeat.suspected:
+        return f"is overdue, phi above {heartbeat.detector.threshold}"
+    return "has timed out"
+
+
+def run_headless(
+    fleet: bool = False,
+    record: Optional[str] = None,
+    replay: Optional[str] = None,
+    speed: float = 1.0,
+    profile: Optional[StartupProfile] = None,
+) -> int:
+    """
+    Entry point for --headless, runs until SIGINT or SIGTERM.
+    With replay the capture is fed in on its recorded clock instead of MQTT.
+    """
+    if profile is None:
+        profile = StartupProfile(enabled=False)
+    profile.mark("imports")
+
+    config = MqttConfig()
+    clock = VirtualClock() if replay is not None else time.monotonic
+    health_cfg = load_compiled_health_config()
+    profile.mark("health config")
+
+    fleet_service = None
+    if fleet or config.fleet_enabled:
+        fleet_service = FleetService(
+            config.fleet_subscription, clock, health_cfg, rearm_heartbeats=True
+        )
+        logger.info(f"fleet mode on {fleet_service.subscription}")
+
+    app_config = AppConfig()
+    event_log = None
+    if app_config.event_log:
+        event_log = EventLogWriter(commands=health_cfg.commands)
+        logger.info(f"event log in {event_log.path}")
+
+    capture = None
+    if record is not None:
+        capture = CaptureWriter(record)
+        logger.info(f"recording mqtt traffic to {capture.path}")
+
+    monitor = HeadlessMonitor(
+        health_service=HealthService(clock, health_cfg, rearm_heartbeats=True),
+        config=config,
+        fleet=fleet_service,
+        event_log=event_log,
+        capture=capture,
+    )
+    exporter = None
+    if app_config.metrics_port is not None:
+        try:
+            exporter = MetricsExporter(
+                app_config.metrics_port, [monitor.collect_metrics]
+            )
+        except OSError as e:
+            logger.warning(f"metrics disabled, unable to serve: {str(e)}")
+        else:
+            host, port = exporter.address
+            logger.info(f"metrics on http://{host}:{port}/metrics")
+    profile.mark("monitor")
+    profile.report()
+
+    signal.signal(signal.SIGINT, lambda *_: monitor.stop())
+    signal.signal(signal.SIGTERM, lambda *_: monitor.stop())
+    try:
+        if replay is not None:
+            return monitor.replay(Replayer(replay, clock, speed))
+        return monitor.run()
+    finally:
+        if exporter is not None:
+            exporter.close()
+        if capture is not None:
+            capture.close()
+        if event_log is not None:
+            event_log.close()
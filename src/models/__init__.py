@@ -1,7 +1,9 @@
+from .delta import HealthDelta
 from .monitor import Monitor, MonitorEntry
 from .state import State
 
 __all__ = [
+    "HealthDelta",
     "MonitorEntry",
     "Monitor",
     "State",
@@ -0,0 +1,80 @@
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Set, Tuple
+
+from src.models.state import State
+
+
+@dataclass(frozen=True)
+class HealthDelta:
+    """State changes produced by processing messages, never mutated once built"""
+
+    # monitor key -> entry key -> new states
+    monitors: Dict[str, Dict[str, FrozenSet[State]]] = field(default_factory=dict)
+    # wdlm row -> new state
+    wdlms: Dict[int, State] = field(default_factory=dict)
+    # heartbeats that accepted a ping
+    heartbeats: FrozenSet[str] = frozenset()
+
+    def __bool__(self) -> bool:
+        return bool(self.monitors or self.wdlms or self.heartbeats)
+
+    def merge(self, other: "HealthDelta") -> "HealthDelta":
+        """Combine with a later delta, later states win"""
+        if not other:
+            return self
+        if not self:
+            return other
+
+        monitors = dict(self.monitors)
+        for key, changes in other.monitors.items():
+            monitors[key] = {**monitors.get(key, {}), **changes}
+
+        return HealthDelta(
+            monitors,
+            {**self.wdlms, **other.wdlms},
+            self.heartbeats | other.heartbeats,
+        )
+
+
+EMPTY_DELTA = HealthDelta()
+
+
+class DeltaCoalescer:
+    """Folds deltas between frames, the last state of each entry wins"""
+
+    def __init__(self) -> None:
+        self._monitors: Dict[str, Dict[str, FrozenSet[State]]] = {}
+        self._wdlms: Dict[int, State] = {}
+        self._heartbeats: Set[str] = set()
+        self._messages = 0
+
+    @property
+    def messages(self) -> int:
+        """Messages folded since the last take"""
+        return self._messages
+
+    def add(self, delta: HealthDelta, messages: int = 1) -> None:
+        """Fold in the delta of one or more processed messages"""
+        self._messages += messages
+        if not delta:
+            return
+
+        for key, changes in delta.monitors.items():
+            pending = self._monitors.get(key)
+            if pending is None:
+                self._monitors[key] = dict(changes)
+            else:
+                pending.update(changes)
+        self._wdlms.update(delta.wdlms)
+        self._heartbeats.update(delta.heartbeats)
+
+    def take(self) -> Tuple[HealthDelta, int]:
+        """Returns the folded delta and message count, then starts a new frame"""
+        delta = HealthDelta(self._monitors, self._wdlms, frozenset(self._heartbeats))
+        messages = self._messages
+
+        self._monitors = {}
+        self._wdlms = {}
+        self._heartbeats = set()
+        self._messages = 0
+        return delta, messages
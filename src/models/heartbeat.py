@@ -1,12 +1,112 @@
-from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+import time
+from typing import Callable, Dict, Optional
 
+from src.models.phi_accrual import PhiAccrualDetector
+from src.utils.histogram import Histogram
 
-class Heartbeat(QObject):
-    timeout_signal = pyqtSignal()
-    tick_signal = pyqtSignal(int)
+# Weight of the newest interval in the moving average
+STATS_EWMA_ALPHA = 0.2
+# Inter-arrival times tracked by the histogram, in seconds
+STATS_LOWEST = 0.001
+STATS_HIGHEST = 3600.0
 
-    def __init__(self, name: str, retries_max: int, time_max: int) -> None:
-        super().__init__()
+
+class HeartbeatStats:
+    """
+    Streaming inter-arrival statistics of accepted pings, fixed memory.
+    Sequence numbers skipped between two pings count as missed, pings that
+    are not newer than the last accepted one count as out of order.
+    """
+
+    def __init__(self) -> None:
+        self._histogram = Histogram(STATS_LOWEST, STATS_HIGHEST)
+        self._last_arrival: Optional[float] = None
+        self._last_ping: Optional[int] = None
+        self._ewma: Optional[float] = None
+        self._min: Optional[float] = None
+        self._max: Optional[float] = None
+        self._missed = 0
+        self._out_of_order = 0
+
+    @property
+    def count(self) -> int:
+        """Inter-arrival times recorded"""
+        return self._histogram.total
+
+    @property
+    def ewma(self) -> Optional[float]:
+        return self._ewma
+
+    @property
+    def min(self) -> Optional[float]:
+        return self._min
+
+    @property
+    def max(self) -> Optional[float]:
+        return self._max
+
+    @property
+    def missed(self) -> int:
+        return self._missed
+
+    @property
+    def out_of_order(self) -> int:
+        return self._out_of_order
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate inter-arrival time at quantile q, within 5%"""
+        return self._histogram.quantile(q)
+
+    def accepted(self, ping: int, now: float, first: bool) -> None:
+        """Record a ping the heartbeat accepted, first after a start or reset"""
+        if not first and self._last_ping is not None and ping > self._last_ping + 1:
+            self._missed += ping - self._last_ping - 1
+        self._last_ping = ping
+
+        # the gap before the first ping after a start or reset is an outage,
+        # not an inter-arrival time
+        if not first and self._last_arrival is not None:
+            interval = now - self._last_arrival
+            self._histogram.record(interval)
+            if self._ewma is None:
+                self._ewma = self._min = self._max = interval
+            else:
+                self._ewma += STATS_EWMA_ALPHA * (interval - self._ewma)
+                self._min = min(self._min, interval)
+                self._max = max(self._max, interval)
+        self._last_arrival = now
+
+    def rejected(self) -> None:
+        """Record a ping that was not newer than the last accepted one"""
+        self._out_of_order += 1
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        """Plain values for display and export"""
+        p50, p95, p99 = self._histogram.quantiles((0.5, 0.95, 0.99))
+        return {
+            "count": self.count,
+            "ewma": self._ewma,
+            "min": self._min,
+            "max": self._max,
+            "p50": p50,
+            "p95": p95,
+            "p99": p99,
+            "missed": self._missed,
+            "out_of_order": self._out_of_order,
+        }
+
+
+class Heartbeat:
+    def __init__(
+        self,
+        name: str,
+        retries_max: int,
+        time_max: int,
+        clock: Callable[[], float] = time.monotonic,
+        detector: Optional[PhiAccrualDetector] = None,
+    ) -> None:
+        if time_max <= 0:
+            raise ValueError(f"{__name__}: time_max must be positive, got {time_max}")
 
         # Name of heartbeat
         self._name: str = name
@@ -15,70 +115,189 @@ class Heartbeat(QObject):
         self._retry_attempt: int = 0
         self._retry_limit: int = retries_max
 
-        # Time and Timers
-        self._time: int = 0
+        # Time and deadlines, deadline is None while the heartbeat is stopped
         self._time_max: int = time_max
-
-        self._timer = QTimer()
-        self._timer.setInterval(1000)
-        self._timer.timeout.connect(self._update_timer)
+        self._clock = clock
+        self._started: float = 0.0
+        self._deadline: Optional[float] = None
 
         self._ping = -1
+        self._last_ping: Optional[float] = None
+        self._timed_out = False
+        self._stats = HeartbeatStats()
+
+        # Optional adaptive detection, suspected once the gap is abnormal
+        self._detector = detector
+        self._arrival: Optional[float] = None
+        self._suspect_at: Optional[float] = None
+        self._suspected = False
 
     @property
     def name(self) -> str:
         return self._name
 
-    def _update_timer(self):
+    @property
+    def retry_attempt(self) -> int:
+        return self._retry_attempt
+
+    @property
+    def retry_limit(self) -> int:
+        return self._retry_limit
+
+    @property
+    def time_limit(self) -> int:
+        return self._time_max
+
+    @property
+    def ping(self) -> int:
+        return self._ping
+
+    @property
+    def last_ping(self) -> Optional[float]:
+        """Time the last ping was accepted, None before the first, kept on reset"""
+        return self._last_ping
+
+    @property
+    def stats(self) -> HeartbeatStats:
+        """Inter-arrival statistics, kept across resets"""
+        return self._stats
+
+    @property
+    def deadline(self) -> Optional[float]:
+        """Monotonic time the current interval expires, None when stopped"""
+        return self._deadline
+
+    @property
+    def active(self) -> bool:
+        return self._deadline is not None
+
+    @property
+    def timed_out(self) -> bool:
+        return self._timed_out
+
+    @property
+    def detector(self) -> Optional[PhiAccrualDetector]:
+        return self._detector
+
+    @property
+    def suspected(self) -> bool:
+        """True if the timeout came from the adaptive detector"""
+        return self._suspected
+
+    def phi(self, now: Optional[float] = None) -> float:
+        """Current suspicion level, 0 without a trained detector"""
+        if self._detector is None or self._arrival is None or not self.active:
+            return 0.0
+        if now is None:
+            now = self._clock()
+        return self._detector.phi(now - self._arrival)
+
+    def elapsed(self, now: Optional[float] = None) -> float:
+        """Seconds elapsed in the current interval"""
+        if self._deadline is None:
+            return 0.0
+        if now is None:
+            now = self._clock()
+        return max(0.0, now - self._started)
+
+    def age(self, now: Optional[float] = None) -> Optional[float]:
+        """Seconds since the last accepted ping, unlike elapsed not reset by retries"""
+        if self._last_ping is None:
+            return None
+        if now is None:
+            now = self._clock()
+        return max(0.0, now - self._last_ping)
+
+    def poll(self, now: Optional[float] = None) -> bool:
         """
-        Update the timer, check if we've gone over time_max.
-        If over time, heartbeat has expired and increment retries.
-        Try again if retries are left.
+        Advance the heartbeat to now, check if we've gone over time_max.
+        Every expired interval increments retries.
+        Returns True if the heartbeat timed out during this poll.
         """
-        # Update time and emit the new value
-        self._time += 1
-        self.tick_signal.emit(self._time)
+        if self._deadline is None:
+            return False
+        if now is None:
+            now = self._clock()
+
+        while now >= self._deadline:
+            # The gap is abnormal for this sender, no need to wait out retries
+            if self._suspect_at is not None and self._deadline >= self._suspect_at:
+                self.stop()
+                self._timed_out = True
+                self._suspected = True
+                return True
 
-        # Check if the timer has gone out of bounds
-        if self._time >= self._time_max:
             self._retry_attempt += 1
-            self._time = 0
+            self._started = self._deadline
+            self._deadline += self._time_max
+
+            # Check if we've timed out
+            if self._is_timeout():
+                self.stop()
+                self._timed_out = True
+                return True
 
-        # Check if we've timed out
-        if self._is_timeout():
-            self.stop()
-            self.timeout_signal.emit()
+            if self._suspect_at is not None:
+                self._deadline = min(self._deadline, self._suspect_at)
 
-    def _update_ping(self, ping: int):
+        return False
+
+    def _update_ping(self, ping: int, now: float) -> bool:
         """Update the ping number, expecting a high number every time"""
         if ping > self._ping:
+            self._stats.accepted(ping, now, self._ping < 0)
+            self._deadline = now + self._time_max
+            if self._detector is not None:
+                self._update_detector(now)
             self._ping = ping
-            self._time = 0
-            self.stop()
-            self.start()
+            self._started = now
+            self._last_ping = now
+            return True
+        self._stats.rejected()
+        return False
+
+    def _update_detector(self, now: float) -> None:
+        """Learn the interval since the last ping and move the suspect deadline"""
+        # the gap before the first ping after a reset is an outage, not a sample
+        if self._arrival is not None and self._ping >= 0:
+            self._detector.record(now - self._arrival)
+        self._arrival = now
+
+        suspect_after = self._detector.suspect_after
+        if suspect_after is None:
+            self._suspect_at = None
+        else:
+            self._suspect_at = now + suspect_after
+            self._deadline = min(self._deadline, self._suspect_at)
 
     def _is_timeout(self):
         return self._retry_attempt > self._retry_limit
 
-    def start(self):
-        """Start the time to count 1 second, on expiration go to update_timer"""
-        if not self._timer.isActive():
-            self._timer.start()
+    def start(self, now: Optional[float] = None):
+        """Start counting down the current interval"""
+        if self._deadline is None:
+            if now is None:
+                now = self._clock()
+            self._started = now
+            self._deadline = now + self._time_max
 
     def stop(self):
-        """Stop the timer"""
-        if self._timer.isActive():
-            self._timer.stop()
+        """Stop counting down"""
+        self._deadline = None
+        self._suspect_at = None
 
     def reset(self):
         """Reset the heartbeat, clearing time and retries"""
         self._retry_attempt = 0
-        self._time = 0
         self._ping = -1
+        self._timed_out = False
+        self._suspected = False
         self.stop()
 
-    def process(self, value: int):
-        """Process a ping value"""
-        if self._is_timeout():
-            return
-        self._update_ping(value)
+    def process(self, value: int, now: Optional[float] = None) -> bool:
+        """Process a ping value, returns True if the ping was accepted"""
+        if self._timed_out:
+            return False
+        if now is None:
+            now = self._clock()
+        return self._update_ping(value, now)
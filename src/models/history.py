@@ -0,0 +1,87 @@
+from array import array
+from typing import FrozenSet, List, Optional, Tuple
+
+from src.constants import DEFAULT_HISTORY_CAPACITY
+from src.models.state import State
+
+
+class StateHistory:
+    """
+    Last state transitions of one entry in a fixed-capacity ring buffer.
+    Times and state codes live in two flat arrays, 9 bytes per transition,
+    that grow up to capacity and then overwrite the oldest transition, so
+    quiet entries stay small and no entry exceeds the bound. Times come from
+    the monotonic clock so they never decrease, which keeps the ring sorted
+    and lets range queries binary search it.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_HISTORY_CAPACITY) -> None:
+        if capacity <= 0:
+            raise ValueError(f"{__name__}: capacity must be positive")
+        self._capacity = capacity
+        self._times = array("d")
+        self._codes = array("B")
+        self._start = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def record(self, time: float, code: int) -> None:
+        """Append a transition to the state code at time"""
+        if self._count < self._capacity:
+            # still growing, the ring starts at 0 until it is full
+            if self._count and time < self._times[-1]:
+                time = self._times[-1]
+            self._times.append(time)
+            self._codes.append(code)
+            self._count += 1
+            return
+
+        # never go back in time, the ring must stay sorted
+        time = max(time, self._times[self._start - 1])
+        self._times[self._start] = time
+        self._codes[self._start] = code
+        self._start = (self._start + 1) % self._capacity
+
+    def _time(self, pos: int) -> float:
+        return self._times[(self._start + pos) % len(self._codes)]
+
+    def _bisect(self, time: float) -> int:
+        """Position of the first transition after time"""
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._time(mid) <= time:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _entry(self, pos: int) -> Tuple[float, FrozenSet[State]]:
+        idx = (self._start + pos) % len(self._codes)
+        return self._times[idx], State.decode(self._codes[idx])
+
+    def between(
+        self, start: float, end: float
+    ) -> List[Tuple[float, FrozenSet[State]]]:
+        """Transitions with start < time <= end, oldest first"""
+        first = self._bisect(start)
+        last = self._bisect(end)
+        return [self._entry(pos) for pos in range(first, last)]
+
+    def at(self, time: float) -> Optional[FrozenSet[State]]:
+        """States in effect at time, None if it is older than the history"""
+        pos = self._bisect(time)
+        if pos == 0:
+            return None
+        return self._entry(pos - 1)[1]
+
+    def last(self, count: int) -> List[Tuple[float, FrozenSet[State]]]:
+        """Most recent transitions, oldest first"""
+        first = max(0, self._count - count)
+        return [self._entry(pos) for pos in range(first, self._count)]
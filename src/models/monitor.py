@@ -1,39 +1,159 @@
 from dataclasses import dataclass, field
-from typing import Dict, Set
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Tuple
 
-from PyQt6.QtCore import QObject
+from src.models.history import StateHistory
+from src.models.state import STATE_BITS, State
 
-from src.models.state import State
+_SLOT_MASK = (1 << STATE_BITS) - 1
+
+Masks = Tuple[Tuple[int, State], ...]
+EntryMasks = Tuple[Tuple[str, Masks], ...]
+# name, color, dock, alarm, hidden, entry masks in slot order
+CompiledMonitor = Tuple[str, str, str, bool, bool, EntryMasks]
 
 
 @dataclass
 class MonitorEntry:
     name: str
     masks: Dict[int, State] = field(default_factory=dict)
-    states: Set[State] = field(default_factory=lambda: {State.UNKNOWN})
+    code: int = State.UNKNOWN.code
+    history: StateHistory = field(
+        default_factory=StateHistory, repr=False, compare=False
+    )
+
+    @property
+    def states(self) -> FrozenSet[State]:
+        """States currently active on the entry"""
+        return State.decode(self.code)
 
-    def evaluate(self, value: int) -> Set[State]:
+    def evaluate(self, value: int) -> FrozenSet[State]:
         """Evaluate a value with the masks stored"""
-        active = {state for mask, state in self.masks.items() if value & mask}
+        code = 0
+        for mask, state in self.masks.items():
+            if value & mask:
+                code |= state.code
 
         # No matches are found
-        if not active:
-            active = {State.OFF}
+        self.code = code or State.OFF.code
+        return self.states
+
+
+class MonitorTable:
+    """
+    Entry masks compiled into byte-wise lookup tables.
+    Every entry owns an 8 bit slot of a packed int holding its state codes,
+    one table lookup per byte of the value resolves all entries at once.
+    """
+
+    def __init__(self, masks: Tuple[Masks, ...]) -> None:
+        self._size = len(masks)
+        self._ones = sum(1 << (idx * STATE_BITS) for idx in range(self._size))
+        self._off_code = State.OFF.code
+
+        # Byte position -> contribution of every single bit in that byte
+        contrib: Dict[int, List[int]] = {}
+        for idx, entry_masks in enumerate(masks):
+            for mask, state in entry_masks:
+                packed_state = state.code << (idx * STATE_BITS)
+                for bit in range(mask.bit_length()):
+                    if (mask >> bit) & 1:
+                        byte_contrib = contrib.setdefault(bit // 8, [0] * 8)
+                        byte_contrib[bit % 8] |= packed_state
+
+        # Expand single bits into all 256 values, only bytes holding mask bits
+        self._luts: Tuple[Tuple[int, Tuple[int, ...]], ...] = tuple(
+            (pos * 8, self._expand(contrib[pos])) for pos in sorted(contrib)
+        )
+
+    @staticmethod
+    def _expand(bits: List[int]) -> Tuple[int, ...]:
+        """Build a 256 entry table where each value ORs its bits' contributions"""
+        lut = [0] * 256
+        for value in range(1, 256):
+            low = value & -value
+            lut[value] = lut[value ^ low] | bits[low.bit_length() - 1]
+        return tuple(lut)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def lookups(self) -> int:
+        """Number of table lookups needed per value"""
+        return len(self._luts)
+
+    def nonzero_slots(self, packed: int) -> int:
+        """Collapse each 8 bit slot to its lowest bit, set if the slot is nonzero"""
+        packed |= packed >> 4
+        packed |= packed >> 2
+        packed |= packed >> 1
+        return packed & self._ones
+
+    def evaluate(self, value: int) -> int:
+        """Resolve every entry for a value, returns the packed state codes"""
+        packed = 0
+        for shift, lut in self._luts:
+            packed |= lut[(value >> shift) & 0xFF]
+
+        # Entries without a matching mask are off
+        return packed | ((self._ones ^ self.nonzero_slots(packed)) * self._off_code)
+
+    @staticmethod
+    def slot(packed: int, idx: int) -> int:
+        """State code of a single entry in a packed int"""
+        return (packed >> (idx * STATE_BITS)) & _SLOT_MASK
 
-        self.states = active
-        return active
 
+@lru_cache(maxsize=None)
+def compile_table(masks: Tuple[Masks, ...]) -> MonitorTable:
+    """Compile masks once, monitors with identical masks share the table"""
+    return MonitorTable(masks)
 
-class Monitor(QObject):
-    def __init__(self, key: str, cfg: Dict) -> None:
-        super().__init__()
 
+class Monitor:
+    def __init__(self, key: str, cfg: Optional[Dict] = None) -> None:
         self._name = key
         self._color: str = ""
         self._dock: str = ""
+        self._alarm: bool = False
+        self._hidden: bool = False
         self._entries: Dict[str, MonitorEntry] = {}
 
-        self._load(cfg)
+        # Entries in slot order and their compiled masks
+        self._slots: List[MonitorEntry] = []
+        self._table: MonitorTable = compile_table(())
+        self._packed: int = 0
+
+        if cfg is not None:
+            self._load(cfg)
+
+    @classmethod
+    def from_compiled(cls, compiled: CompiledMonitor) -> "Monitor":
+        """Rebuild a monitor from compiled(), without validating or parsing"""
+        name, color, dock, alarm, hidden, entries = compiled
+        monitor = cls(name)
+        monitor._color = color
+        monitor._dock = dock
+        monitor._alarm = alarm
+        monitor._hidden = hidden
+        monitor._entries = {
+            key: MonitorEntry(key, dict(masks)) for key, masks in entries
+        }
+        monitor._compile()
+        return monitor
+
+    def compiled(self) -> CompiledMonitor:
+        """Validated config as plain, picklable values, tables are rebuilt"""
+        return (
+            self._name,
+            self._color,
+            self._dock,
+            self._alarm,
+            self._hidden,
+            tuple((entry.name, tuple(entry.masks.items())) for entry in self._slots),
+        )
 
     def _load(self, cfg: dict) -> None:
         """Load in values from a config dictionary"""
@@ -42,7 +162,10 @@ class Monitor(QObject):
         # Load specifiy values
         self._color = cfg.get("color", "white")
         self._dock = cfg.get("dock", "center")
+        self._alarm = cfg.get("alarm", False)
+        self._hidden = cfg.get("hidden", False)
         self._load_entries(cfg.get("entries", {}))
+        self._compile()
 
     def _validate_config_structure(self, cfg: dict) -> None:
         """Validate the config dictionary has all necessary parameters"""
@@ -55,6 +178,12 @@ class Monitor(QObject):
         if "dock" not in cfg or not isinstance(cfg["dock"], str):
             raise TypeError(f"{__name__}: 'dock' must be a str")
 
+        if not isinstance(cfg.get("alarm", False), bool):
+            raise TypeError(f"{__name__}: 'alarm' must be a bool")
+
+        if not isinstance(cfg.get("hidden", False), bool):
+            raise TypeError(f"{__name__}: 'hidden' must be a bool")
+
         if "entries" not in cfg or not isinstance(cfg["entries"], dict):
             raise TypeError(f"{__name__}: 'entries' must be a dict")
 
@@ -78,11 +207,47 @@ class Monitor(QObject):
                     f"{__name__}: cfg 'masks' must be a dict, got {type(raw_masks)}"
                 )
             masks = {int(k, 0): State(v) for k, v in raw_masks.items()}
+            if any(mask < 0 for mask in masks):
+                raise ValueError(f"{__name__}: entry '{key}' masks must be positive")
             entry.masks = masks
 
-    def process(self, value: int) -> Dict[str, Set[State]]:
-        """evaluate all entries from the value provided, presumes correlation in masks"""
-        return {name: entry.evaluate(value) for name, entry in self._entries.items()}
+    def _compile(self) -> None:
+        """Compile entry masks into lookup tables"""
+        self._slots = list(self._entries.values())
+        self._table = compile_table(
+            tuple(tuple(entry.masks.items()) for entry in self._slots)
+        )
+        self._packed = sum(
+            entry.code << (idx * STATE_BITS) for idx, entry in enumerate(self._slots)
+        )
+
+    def process(
+        self, value: int, now: Optional[float] = None
+    ) -> Dict[str, FrozenSet[State]]:
+        """
+        evaluate all entries from the value provided, presumes correlation in masks.
+        Returns only the entries whose states changed, recorded in their
+        history at now when given.
+        """
+        packed = self._table.evaluate(value)
+        if packed == self._packed:
+            return {}
+
+        changed = self._table.nonzero_slots(packed ^ self._packed)
+        self._packed = packed
+
+        changes: Dict[str, FrozenSet[State]] = {}
+        while changed:
+            low = changed & -changed
+            idx = (low.bit_length() - 1) // STATE_BITS
+            entry = self._slots[idx]
+            entry.code = MonitorTable.slot(packed, idx)
+            changes[entry.name] = entry.states
+            if now is not None:
+                entry.history.record(now, entry.code)
+            changed ^= low
+
+        return changes
 
     @property
     def name(self) -> str:
@@ -96,6 +261,25 @@ class Monitor(QObject):
     def dock(self) -> str:
         return self._dock
 
+    @property
+    def alarm(self) -> bool:
+        return self._alarm
+
+    @property
+    def hidden(self) -> bool:
+        """Hidden on startup, the GUI builds its widget when first shown"""
+        return self._hidden
+
+    @property
+    def table(self) -> MonitorTable:
+        """Compiled lookup tables for the entry masks"""
+        return self._table
+
+    @property
+    def packed(self) -> int:
+        """State codes of every entry, 8 bits per entry in load order"""
+        return self._packed
+
     @property
     def entries(self) -> Dict[str, MonitorEntry]:
         return self._entries
@@ -0,0 +1,90 @@
+import math
+from array import array
+from statistics import NormalDist
+from typing import Optional, Tuple
+
+# Inter-arrival times the distribution is learned from
+PHI_WINDOW = 100
+# Intervals needed before the detector is trusted over the fixed time limit
+PHI_MIN_SAMPLES = 5
+# Floor of the standard deviation, absolute seconds and relative to the mean,
+# so a perfectly regular sender is not suspected on the slightest delay
+PHI_MIN_STD = 0.1
+PHI_MIN_STD_RATIO = 0.05
+
+
+class PhiAccrualDetector:
+    """
+    Phi accrual failure detector, Hayashibara et al.
+    Learns the normal distribution of inter-arrival times over a sliding
+    window, phi is -log10 of the probability that the next ping is still
+    coming after the current gap. Crossing the threshold means suspect.
+    Since phi only grows with the gap, the gap at which it crosses is
+    computed once per ping and turned into a deadline.
+    """
+
+    def __init__(self, threshold: float, window: int = PHI_WINDOW) -> None:
+        if not 0 < threshold <= 300:
+            raise ValueError(f"{__name__}: threshold must be in (0, 300]")
+        if window < PHI_MIN_SAMPLES:
+            raise ValueError(f"{__name__}: window must be at least {PHI_MIN_SAMPLES}")
+
+        self._threshold = threshold
+        # standard score the gap must exceed, P(X > mean + z * std) = 10^-phi
+        self._z = -NormalDist().inv_cdf(10.0**-threshold)
+
+        self._intervals = array("d", bytes(8 * window))
+        self._next = 0
+        self._count = 0
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._suspect_after: Optional[float] = None
+
+    @property
+    def threshold(self) -> float:
+        return self._threshold
+
+    @property
+    def samples(self) -> int:
+        """Intervals currently in the window"""
+        return self._count
+
+    @property
+    def suspect_after(self) -> Optional[float]:
+        """Gap in seconds after which phi crosses the threshold, None until trained"""
+        return self._suspect_after
+
+    def _mean_std(self) -> Tuple[float, float]:
+        mean = self._sum / self._count
+        variance = max(self._sum_sq / self._count - mean * mean, 0.0)
+        std = max(math.sqrt(variance), PHI_MIN_STD, PHI_MIN_STD_RATIO * mean)
+        return mean, std
+
+    def record(self, interval: float) -> None:
+        """Learn one inter-arrival time"""
+        window = len(self._intervals)
+        if self._count == window:
+            old = self._intervals[self._next]
+            self._sum -= old
+            self._sum_sq -= old * old
+        else:
+            self._count += 1
+
+        self._intervals[self._next] = interval
+        self._next = (self._next + 1) % window
+        self._sum += interval
+        self._sum_sq += interval * interval
+
+        if self._count >= PHI_MIN_SAMPLES:
+            mean, std = self._mean_std()
+            self._suspect_after = mean + self._z * std
+
+    def phi(self, gap: float) -> float:
+        """Suspicion level for the time since the last ping, 0 until trained"""
+        if self._count < PHI_MIN_SAMPLES:
+            return 0.0
+        mean, std = self._mean_std()
+        p_later = 1.0 - NormalDist(mean, std).cdf(gap)
+        if p_later <= 0.0:
+            return math.inf
+        return -math.log10(p_later)
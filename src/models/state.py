@@ -1,4 +1,5 @@
 from enum import Enum
+from typing import FrozenSet, Tuple
 
 
 class State(Enum):
@@ -13,6 +14,16 @@ class State(Enum):
     def __str__(self):
         return self.value
 
+    @property
+    def code(self) -> int:
+        """Bit flag of the state, several states pack into one int"""
+        return _STATE_CODES[self]
+
+    @staticmethod
+    def decode(code: int) -> FrozenSet["State"]:
+        """Shared set of states packed in a code"""
+        return _DECODED_STATES[code]
+
     def color(self) -> str:
         if self == State.UNKNOWN:
             return "gray"
@@ -30,3 +41,13 @@ class State(Enum):
             return "green"
         else:
             return "gray"
+
+
+# State codes fit in one byte, so entries can be packed 8 bits apiece
+STATE_BITS = 8
+
+_STATE_CODES = {state: 1 << idx for idx, state in enumerate(State)}
+_DECODED_STATES: Tuple[FrozenSet[State], ...] = tuple(
+    frozenset(state for state, bit in _STATE_CODES.items() if code & bit)
+    for code in range(1 << len(State))
+)
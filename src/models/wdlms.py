@@ -1,10 +1,14 @@
 from dataclasses import dataclass, field
-from typing import Dict
-
-from PyQt6.QtCore import QObject
+from typing import Dict, List, Optional, Tuple, Union
 
+from src.constants import MAX_WDLM_SEATS
+from src.models.history import StateHistory
 from src.models.state import State
 
+# int() also takes signs, whitespace and underscores, payloads only digits
+_BINARY_DIGITS = frozenset("01")
+_HEX_DIGITS = frozenset("0123456789abcdefABCDEF")
+
 
 @dataclass
 class WdlmEntry:
@@ -12,13 +16,20 @@ class WdlmEntry:
     state: State = field(default=State.UNKNOWN)
 
 
-class Wdlms(QObject):
-    def __init__(self, name: str, color: str, dock: str):
-        super().__init__()
+class Wdlms:
+    def __init__(self, name: str, color: str, dock: str, seats: int = 0):
         self._name = name
         self._color = color
         self._dock = dock
-        self._entries: Dict[str, WdlmEntry] = {}
+
+        # Seat status as one bitfield, bit n is row n, names are built once
+        self._bits: int = 0
+        self._count: int = 0
+        self._names: List[str] = []
+        self._history: List[StateHistory] = []
+        self._seats = seats
+        # Rows a payload may address, a bad payload must not add rows forever
+        self._max_rows = max(seats, MAX_WDLM_SEATS)
 
     @property
     def name(self) -> str:
@@ -32,17 +43,108 @@ class Wdlms(QObject):
     def dock(self) -> str:
         return self._dock
 
+    @property
+    def bits(self) -> int:
+        """Seat status bitfield, a set bit is talking"""
+        return self._bits
+
+    @property
+    def count(self) -> int:
+        """Number of rows seen so far"""
+        return self._count
+
     @property
     def entries(self) -> Dict[str, WdlmEntry]:
-        return self._entries
+        """Snapshot of every row as entries"""
+        return {
+            f"wdlm_{row}": WdlmEntry(self._names[row], self.state(row))
+            for row in range(self._count)
+        }
+
+    def row_name(self, row: int) -> str:
+        return self._names[row]
+
+    def history(self, row: int) -> StateHistory:
+        """State transitions of a row"""
+        return self._history[row]
 
-    def process(self, value: str):
-        row_index = 0
+    def state(self, row: int) -> State:
+        if row >= self._count:
+            return State.UNKNOWN
+        return State.TALKING if (self._bits >> row) & 1 else State.NOT_TALKING
 
-        for char in reversed(value):
-            self._entries[f"wdlm_{row_index}"] = WdlmEntry(
-                f"WDLM {(row_index // 2) + 1} {'A-D' if row_index % 2 == 0 else 'E-H'}",
-                State.TALKING if char == "1" else State.NOT_TALKING,
+    def _grow(self, count: int) -> None:
+        """Generate names for new rows"""
+        for row in range(len(self._names), count):
+            self._names.append(
+                f"WDLM {(row // 2) + 1} {'A-D' if row % 2 == 0 else 'E-H'}"
             )
+            self._history.append(StateHistory())
+        self._count = count
+
+    def parse(self, value: Union[int, str]) -> Tuple[int, int]:
+        """
+        Parse a payload into (bits, rows) covered by the payload.
+        Accepts a "0101" bitstring, a "0x" hex string, or a positive int.
+        Strings hold digits only, no sign, whitespace or underscores.
+        An int covers every known row, strings only cover their own length.
+        Values addressing more than the configured or MAX_WDLM_SEATS seats
+        are rejected.
+        """
+        if isinstance(value, int):
+            if value < 0:
+                raise ValueError(f"{__name__}: wdlm value must be positive")
+            # Seats come in pairs, round up to a whole WDLM
+            rows = value.bit_length() + value.bit_length() % 2
+            self._check_rows(rows)
+            return value, max(rows, self._count, self._seats)
+        if value[:2].lower() == "0x":
+            digits, base, rows = value[2:], 16, (len(value) - 2) * 4
+            allowed = _HEX_DIGITS
+        else:
+            digits, base, rows = value, 2, len(value)
+            allowed = _BINARY_DIGITS
+        if not digits or not allowed.issuperset(digits):
+            raise ValueError(f"{__name__}: invalid wdlm value '{value[:32]}'")
+        self._check_rows(rows)
+        return int(digits, base), rows
+
+    def _check_rows(self, rows: int) -> None:
+        if rows > self._max_rows:
+            raise ValueError(
+                f"{__name__}: wdlm value covers {rows} seats, "
+                f"at most {self._max_rows} allowed"
+            )
+
+    def process(
+        self, value: Union[int, str], now: Optional[float] = None
+    ) -> Dict[int, State]:
+        """
+        Update seats from a payload, returns the rows that changed state.
+        Changes are recorded in each row's history at now when given.
+        """
+        bits, rows = self.parse(value)
+
+        # Rows beyond the payload keep their previous state
+        bits |= self._bits & ~((1 << rows) - 1)
+
+        previous = self._count
+        if rows > previous:
+            self._grow(rows)
+
+        # XOR against the previous field, new rows always count as changed
+        known = (1 << previous) - 1
+        changed = ((bits ^ self._bits) & known) | (((1 << self._count) - 1) ^ known)
+        self._bits = bits
+
+        changes: Dict[int, State] = {}
+        while changed:
+            low = changed & -changed
+            row = low.bit_length() - 1
+            state = State.TALKING if bits & low else State.NOT_TALKING
+            changes[row] = state
+            if now is not None:
+                self._history[row].record(now, state.code)
+            changed ^= low
 
-            row_index += 1
+        return changes
@@ -1,7 +1,21 @@
 from .health_service import HealthService
-from .mqtt_service import MqttService
 
 __all__ = [
+    "HealthAdapter",
     "HealthService",
     "MqttService",
 ]
+
+
+def __getattr__(name: str):
+    # Qt and paho backed services are imported on demand so the health engine
+    # can run headless without either installed
+    if name == "HealthAdapter":
+        from .health_adapter import HealthAdapter
+
+        return HealthAdapter
+    if name == "MqttService":
+        from .mqtt_service import MqttService
+
+        return MqttService
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
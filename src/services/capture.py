@@ -0,0 +1,182 @@
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterator, NamedTuple, Optional, Union
+
+from src.utils.clock import VirtualClock
+
+# File header: magic, version and the wall clock time recording started
+CAPTURE_MAGIC = b"WDRCCAP"
+CAPTURE_VERSION = 1
+_HEADER = struct.Struct("<7sBd")
+# Record header: receive time, topic length, payload length
+_RECORD = struct.Struct("<dHI")
+
+
+class CaptureWriter:
+    """
+    Records raw MQTT traffic as received, safe to call from the paho thread.
+    Receive times are monotonic seconds, replay only uses their differences.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._path = Path(path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._count = 0
+
+        self._file: Optional[BinaryIO] = open(self._path, "wb")
+        self._file.write(_HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION, time.time()))
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @property
+    def count(self) -> int:
+        """Messages recorded so far"""
+        return self._count
+
+    def write(self, topic: str, payload: bytes, now: Optional[float] = None) -> None:
+        if now is None:
+            now = self._clock()
+        raw_topic = topic.encode("utf-8")
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(_RECORD.pack(now, len(raw_topic), len(payload)))
+            self._file.write(raw_topic)
+            self._file.write(payload)
+            self._count += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class CaptureRecord(NamedTuple):
+    time: float
+    topic: str
+    payload: bytes
+
+
+def read_capture(path: Union[str, Path]) -> Iterator[CaptureRecord]:
+    """Records of a capture file in the order they were received"""
+    with open(path, "rb") as f:
+        magic, version, _ = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != CAPTURE_MAGIC or version != CAPTURE_VERSION:
+            raise ValueError(f"{__name__}: '{path}' is not a capture file")
+
+        while True:
+            header = f.read(_RECORD.size)
+            if len(header) < _RECORD.size:
+                # end of file, or a record cut short when recording stopped
+                return
+            now, topic_len, payload_len = _RECORD.unpack(header)
+            topic = f.read(topic_len)
+            payload = f.read(payload_len)
+            if len(topic) < topic_len or len(payload) < payload_len:
+                return
+            yield CaptureRecord(now, topic.decode("utf-8"), payload)
+
+
+class ReplayStats(NamedTuple):
+    messages: int
+    payload_bytes: int
+    # seconds of recorded time covered and wall clock seconds it took
+    recorded: float
+    elapsed: float
+
+    @property
+    def rate(self) -> float:
+        """Messages per wall clock second"""
+        return self.messages / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class Replayer:
+    """
+    Feeds a capture file to a handler on a VirtualClock that follows the
+    recorded receive times. Heartbeat deadlines that fall between two
+    messages are polled at exactly their recorded time before the next
+    message is delivered, so timeouts reproduce at any speed.
+
+    speed 1 replays in real time, N replays N times faster and 0 replays as
+    fast as possible.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        clock: VirtualClock,
+        speed: float = 1.0,
+    ) -> None:
+        if speed < 0:
+            raise ValueError(f"{__name__}: speed must not be negative, got {speed}")
+        self._path = Path(path)
+        self._clock = clock
+        self._speed = speed
+
+    @property
+    def clock(self) -> VirtualClock:
+        return self._clock
+
+    def run(
+        self,
+        handler: Callable[[str, bytes], object],
+        poll: Optional[Callable[[], object]] = None,
+        next_deadline: Optional[Callable[[], Optional[float]]] = None,
+        stop: Optional[threading.Event] = None,
+    ) -> ReplayStats:
+        """
+        Replay every record into handler(topic, payload). poll is called
+        with the clock set to each heartbeat deadline that next_deadline
+        reports before the message that follows it.
+        """
+        messages = 0
+        payload_bytes = 0
+        first: Optional[float] = None
+        # recorded time of the first message maps to the virtual clock's now
+        offset = 0.0
+        started = time.perf_counter()
+
+        for record in read_capture(self._path):
+            if stop is not None and stop.is_set():
+                break
+            if first is None:
+                first = record.time
+                offset = self._clock() - first
+            now = record.time + offset
+
+            if poll is not None and next_deadline is not None:
+                while (deadline := next_deadline()) is not None and deadline <= now:
+                    self._pace(deadline - offset - first, started)
+                    self._clock.set(deadline)
+                    poll()
+
+            self._pace(record.time - first, started)
+            self._clock.set(now)
+            handler(record.topic, record.payload)
+            messages += 1
+            payload_bytes += len(record.payload)
+
+        recorded = 0.0 if first is None else self._clock() - offset - first
+        return ReplayStats(
+            messages, payload_bytes, recorded, time.perf_counter() - started
+        )
+
+    def _pace(self, recorded: float, started: float) -> None:
+        """Sleep until recorded seconds into the capture are due at speed"""
+        if self._speed == 0:
+            return
+        delay = started + recorded / self._speed - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
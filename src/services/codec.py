@@ -0,0 +1,137 @@
+import json
+import struct
+from typing import Any, Dict, Iterable, List, Tuple, Union
+
+from src.constants import WDLM_COMMAND
+
+# First byte of a binary frame, never the start of a JSON document
+BINARY_MAGIC = 0xB5
+
+FORMAT_AUTO = "auto"
+FORMAT_JSON = "json"
+FORMAT_BINARY = "binary"
+FORMATS = (FORMAT_AUTO, FORMAT_JSON, FORMAT_BINARY)
+
+# Record header, command id and number of value bytes
+_RECORD = struct.Struct(">BH")
+
+
+def unpack_batch(msg: Union[Dict, List[Dict]]) -> List[Tuple[str, Any]]:
+    """Flatten a message, list of messages or cmd -> value dict into pairs."""
+    if isinstance(msg, list):
+        pairs = []
+        for item in msg:
+            if not isinstance(item, dict):
+                raise TypeError(f"batch items must be dicts, got {type(item)}")
+            pairs.append((item["cmd"], item["value"]))
+        return pairs
+
+    if isinstance(msg, dict):
+        if "cmd" in msg:
+            return [(msg["cmd"], msg["value"])]
+        return list(msg.items())
+
+    raise TypeError(f"unable to parse message, must be dict or list, got {type(msg)}")
+
+
+class HealthCodec:
+    """
+    Decodes health payloads in either JSON or the compact binary framing.
+    JSON payloads may be a single message, a list of messages or a batch
+    dict of cmd -> value, binary frames may carry several records.
+
+    A binary frame is the magic byte followed by one or more records, each a
+    command id (u8), a value length (u16) and the big-endian unsigned value.
+    Command ids are derived from health.json: every heartbeat, monitor and
+    the wdlm command numbered from 1 in the order they appear in the file.
+    """
+
+    def __init__(self, cfg: dict) -> None:
+        commands: List[str] = []
+        for section, entries in cfg.items():
+            if section in ("heartbeats", "monitors"):
+                commands.extend(entries)
+            elif section == "wdlms":
+                commands.append(WDLM_COMMAND)
+        self._number(commands)
+
+    @classmethod
+    def from_commands(cls, commands: Iterable[str]) -> "HealthCodec":
+        """Codec numbering commands from 1 in the order given, as in ids"""
+        codec = cls.__new__(cls)
+        codec._number(commands)
+        return codec
+
+    def _number(self, commands: Iterable[str]) -> None:
+        self._ids: Dict[str, int] = {}
+        for cmd in commands:
+            self._ids.setdefault(cmd, len(self._ids) + 1)
+
+        if len(self._ids) > 0xFF:
+            raise ValueError(f"{__name__}: too many commands for binary framing")
+
+        self._cmds: Dict[int, str] = {idx: cmd for cmd, idx in self._ids.items()}
+
+    @property
+    def ids(self) -> Dict[str, int]:
+        """Command to binary command id"""
+        return self._ids
+
+    @staticmethod
+    def is_binary(payload: bytes) -> bool:
+        return len(payload) > 0 and payload[0] == BINARY_MAGIC
+
+    def decode(self, payload: bytes, fmt: str = FORMAT_AUTO) -> List[Tuple[str, Any]]:
+        """Decode a payload into (cmd, value) pairs, raises ValueError if malformed"""
+        binary = self.is_binary(payload)
+        if fmt == FORMAT_JSON and binary:
+            raise ValueError("binary payload on a json topic")
+        if fmt == FORMAT_BINARY and not binary:
+            raise ValueError("json payload on a binary topic")
+
+        if binary:
+            return self._decode_binary(payload)
+
+        try:
+            return unpack_batch(json.loads(payload.decode("utf-8")))
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"malformed message: {str(e)}")
+
+    def _decode_binary(self, payload: bytes) -> List[Tuple[str, Any]]:
+        msgs = []
+        offset = 1
+        end = len(payload)
+        while offset < end:
+            if offset + _RECORD.size > end:
+                raise ValueError("truncated binary record header")
+            cmd_id, length = _RECORD.unpack_from(payload, offset)
+            offset += _RECORD.size
+
+            if offset + length > end:
+                raise ValueError("truncated binary record value")
+            cmd = self._cmds.get(cmd_id)
+            if cmd is None:
+                raise ValueError(f"unknown binary command id {cmd_id}")
+
+            value = int.from_bytes(payload[offset : offset + length], "big")
+            offset += length
+            msgs.append((cmd, value))
+
+        return msgs
+
+    def encode(self, msgs: Iterable[Tuple[str, Union[int, str]]]) -> bytes:
+        """Encode (cmd, value) pairs into one binary frame"""
+        frame = bytearray((BINARY_MAGIC,))
+        for cmd, value in msgs:
+            if cmd not in self._ids:
+                raise KeyError(f"unknown command: '{cmd}'")
+            if isinstance(value, str):
+                # wdlm bitstrings are base 2, everything else follows int()
+                base = 2 if cmd == WDLM_COMMAND and value[:2].lower() != "0x" else 0
+                value = int(value, base)
+
+            data = value.to_bytes(max(1, (value.bit_length() + 7) // 8), "big")
+            frame += _RECORD.pack(self._ids[cmd], len(data))
+            frame += data
+
+        return bytes(frame)
@@ -0,0 +1,444 @@
+import bisect
+import itertools
+import logging
+import mmap
+import queue
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from src.constants import EVENT_LOG_SEGMENT_RECORDS, EVENTS_DIR, WDLM_COMMAND
+from src.models.delta import HealthDelta
+from src.models.state import State
+
+logger = logging.getLogger(__name__)
+
+# Record kinds
+KIND_MESSAGE = 1
+KIND_TRANSITION = 2
+KIND_TIMEOUT = 3
+
+# time, value, subject id, device id, kind, state code, flags, 32 bytes each
+_RECORD = struct.Struct("<dQIIBBB5x")
+_TIME = struct.Struct("<d")
+_VALUE_MASK = (1 << 64) - 1
+
+# Record flags
+# the value did not fit 64 bits and holds its low bits only, for wdlm fields
+# wider than 64 seats the per-seat transition records are complete
+FLAG_TRUNCATED = 1
+
+NAMES_FILE = "names.txt"
+SEGMENT_SUFFIX = ".events"
+
+
+def _segment_name(start: float, seq: int = 0) -> str:
+    """
+    Segments are named by their first timestamp in microseconds, followed
+    by a sequence number when earlier segments filled up in that microsecond.
+    """
+    name = f"{int(start * 1_000_000):020d}"
+    if seq:
+        # '_' sorts after the '.' of the suffix, so names stay in write order
+        name += f"_{seq:06d}"
+    return name + SEGMENT_SUFFIX
+
+
+def _segment_start(path: Path) -> float:
+    return int(path.stem.split("_", 1)[0]) / 1_000_000
+
+
+class Event(NamedTuple):
+    time: float
+    kind: int
+    subject: str
+    device: Optional[str]
+    code: int
+    value: int
+    truncated: bool = False
+
+    @property
+    def states(self) -> FrozenSet[State]:
+        """States a transition moved to"""
+        return State.decode(self.code)
+
+
+class EventLogWriter:
+    """
+    Appends raw messages, state transitions and heartbeat timeouts to a
+    binary log from a background thread, producers only enqueue.
+
+    The log is a directory of segment files of fixed-size records in time
+    order, rolled over every EVENT_LOG_SEGMENT_RECORDS records. Subjects and
+    devices are interned to ids in a names file next to the segments.
+    Times are wall clock seconds, clamped so they never decrease.
+    Raw messages are logged for the configured commands only, by default
+    those of health.json, so names from the network never reach the file.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path] = EVENTS_DIR,
+        segment_records: int = EVENT_LOG_SEGMENT_RECORDS,
+        clock: Callable[[], float] = time.time,
+        commands: Optional[Iterable[str]] = None,
+    ) -> None:
+        if commands is None:
+            from src.services.health_service import load_compiled_health_config
+
+            commands = load_compiled_health_config().commands
+        self._commands: FrozenSet[str] = frozenset(commands)
+        self._path = Path(path)
+        self._path.mkdir(parents=True, exist_ok=True)
+        self._segment_records = segment_records
+        self._clock = clock
+
+        # Writer thread state
+        self._names: Dict[str, int] = {}
+        self._subjects: Dict[Tuple, int] = {}
+        self._names_file = open(self._path / NAMES_FILE, "a+", encoding="utf-8")
+        self._load_names()
+        self._segment: Optional[BinaryIO] = None
+        self._segment_count = 0
+        self._last_time = self._read_last_time()
+        self._written = 0
+
+        self._queue: "queue.SimpleQueue[Optional[Tuple]]" = queue.SimpleQueue()
+        self._thread = threading.Thread(
+            target=self._run, name="event-log-writer", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @property
+    def written(self) -> int:
+        """Records written so far"""
+        return self._written
+
+    # ==================================================
+    # Producers, any thread
+    # ==================================================
+
+    def record(
+        self,
+        batch: Iterable[Tuple[str, Any]],
+        delta: HealthDelta,
+        device: Optional[str] = None,
+    ) -> None:
+        """Log a processed batch and the transitions it caused"""
+        self._queue.put(("batch", self._clock(), device, batch, delta))
+
+    def record_timeout(self, key: str, device: Optional[str] = None) -> None:
+        """Log a heartbeat timeout"""
+        self._queue.put(("timeout", self._clock(), device, key))
+
+    def close(self) -> None:
+        """Write everything queued and stop the writer"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    # ==================================================
+    # Writer thread
+    # ==================================================
+
+    def _load_names(self) -> None:
+        self._names_file.seek(0)
+        for idx, line in enumerate(self._names_file, start=1):
+            self._names[_unescape(line.rstrip("\n"))] = idx
+
+    def _read_last_time(self) -> float:
+        """Last timestamp already on disk, new records never go before it"""
+        segments = sorted(self._path.glob(f"*{SEGMENT_SUFFIX}"))
+        for segment in reversed(segments):
+            size = segment.stat().st_size
+            size -= size % _RECORD.size
+            if size:
+                with open(segment, "rb") as f:
+                    f.seek(size - _RECORD.size)
+                    return _TIME.unpack(f.read(_TIME.size))[0]
+        return 0.0
+
+    def _intern(self, subject: Tuple) -> int:
+        """Id of a subject such as ("monitor", key, entry), added on first use"""
+        idx = self._subjects.get(subject)
+        if idx is None:
+            name = "/".join(map(str, subject))
+            idx = self._names.get(name)
+            if idx is None:
+                idx = len(self._names) + 1
+                self._names[name] = idx
+                # names must be on disk before any record using them
+                self._names_file.write(_escape(name) + "\n")
+                self._names_file.flush()
+            self._subjects[subject] = idx
+        return idx
+
+    def _run(self) -> None:
+        running = True
+        while running:
+            items = [self._queue.get()]
+            # drain what piled up so it goes out in one write
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            records: List[Tuple] = []
+            for item in items:
+                if item is None:
+                    running = False
+                    continue
+                try:
+                    self._pack(item, records)
+                except Exception as e:
+                    logger.warning(f"failed logging event: {str(e)}")
+            try:
+                self._write(records)
+            except OSError as e:
+                logger.error(f"failed writing event log: {str(e)}")
+
+        if self._segment is not None:
+            self._segment.close()
+        self._names_file.close()
+
+    def _pack(self, item: Tuple, records: List[Tuple]) -> None:
+        """Expand a queued item into record fields"""
+        kind, now, device, *rest = item
+        now = max(now, self._last_time)
+        self._last_time = now
+        device_id = self._intern(("device", device)) if device is not None else 0
+
+        if kind == "timeout":
+            subject = self._intern(("heartbeat", rest[0]))
+            records.append((now, 0, subject, device_id, KIND_TIMEOUT, 0, 0))
+            return
+
+        batch, delta = rest
+        for cmd, value in batch:
+            if cmd not in self._commands:
+                # wdlm is dispatched case-insensitively, anything else unknown
+                # was dropped by the engine and is not logged
+                if not isinstance(cmd, str) or cmd.lower() != WDLM_COMMAND:
+                    continue
+                cmd = WDLM_COMMAND
+            value = _message_value(cmd, value)
+            if value is not None:
+                subject = self._intern(("cmd", cmd))
+                flags = FLAG_TRUNCATED if value > _VALUE_MASK else 0
+                records.append(
+                    (
+                        now,
+                        value & _VALUE_MASK,
+                        subject,
+                        device_id,
+                        KIND_MESSAGE,
+                        0,
+                        flags,
+                    )
+                )
+
+        for key, changes in delta.monitors.items():
+            for entry, states in changes.items():
+                subject = self._intern(("monitor", key, entry))
+                code = sum(state.code for state in states)
+                records.append((now, 0, subject, device_id, KIND_TRANSITION, code, 0))
+
+        for row, state in delta.wdlms.items():
+            subject = self._intern(("wdlm", row))
+            records.append(
+                (now, 0, subject, device_id, KIND_TRANSITION, state.code, 0)
+            )
+
+    def _write(self, records: List[Tuple]) -> None:
+        pos = 0
+        while pos < len(records):
+            if self._segment is None or self._segment_count >= self._segment_records:
+                self._roll(records[pos][0])
+
+            count = min(len(records) - pos, self._segment_records - self._segment_count)
+            self._segment.write(
+                b"".join(_RECORD.pack(*fields) for fields in records[pos : pos + count])
+            )
+            self._segment_count += count
+            pos += count
+
+        if self._segment is not None:
+            self._segment.flush()
+        self._written += len(records)
+
+    def _roll(self, start: float) -> None:
+        """Start a new segment named by its first record"""
+        if self._segment is not None:
+            self._segment.close()
+        # a restart within the same microsecond appends to the last segment,
+        # dropping a record torn by a crash so records stay aligned, full
+        # segments of that microsecond are followed by a numbered one
+        for seq in itertools.count():
+            path = self._path / _segment_name(start, seq)
+            if not path.exists():
+                break
+            if path.stat().st_size // _RECORD.size < self._segment_records:
+                break
+        self._segment = open(path, "ab")
+        size = self._segment.tell()
+        if size % _RECORD.size:
+            self._segment.truncate(size - size % _RECORD.size)
+            self._segment.seek(0, 2)
+        self._segment_count = self._segment.tell() // _RECORD.size
+
+
+def _escape(name: str) -> str:
+    """Names are stored one per line, newlines in a name are escaped"""
+    return name.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _unescape(line: str) -> str:
+    return "\\".join(part.replace("\\n", "\n") for part in line.split("\\\\"))
+
+
+def _message_value(cmd: Any, value: Any) -> Optional[int]:
+    """Raw command value as an int, None for values the engine rejects"""
+    if isinstance(value, int):
+        return value if value >= 0 else None
+    if not isinstance(value, str):
+        return None
+    try:
+        if cmd == WDLM_COMMAND and value[:2].lower() != "0x":
+            parsed = int(value, 2)
+        else:
+            parsed = int(value, 0)
+    except ValueError:
+        return None
+    return parsed if parsed >= 0 else None
+
+
+class EventLogReader:
+    """
+    Range queries over an event log directory without loading it.
+    Segment names give each segment's first timestamp, so only segments
+    overlapping a query are opened. Records within a segment are fixed
+    size and time ordered, the memory-mapped file is binary searched for
+    the start of the range and only the matching span is scanned.
+    """
+
+    def __init__(self, path: Union[str, Path] = EVENTS_DIR) -> None:
+        self._path = Path(path)
+        self._names: List[str] = []
+
+    def segments(self) -> List[Path]:
+        return sorted(self._path.glob(f"*{SEGMENT_SUFFIX}"))
+
+    def _load_names(self) -> None:
+        names_path = self._path / NAMES_FILE
+        if names_path.exists():
+            with open(names_path, "r", encoding="utf-8") as f:
+                self._names = [_unescape(line.rstrip("\n")) for line in f]
+
+    def name(self, idx: int) -> Optional[str]:
+        """Subject or device name of an id, 0 is no name"""
+        if idx == 0:
+            return None
+        if idx > len(self._names):
+            self._load_names()
+        return self._names[idx - 1]
+
+    def _ids(self, prefix: str) -> Set[int]:
+        self._load_names()
+        return {
+            idx
+            for idx, name in enumerate(self._names, start=1)
+            if name == prefix or name.startswith(prefix + "/")
+        }
+
+    def query(
+        self,
+        start: float = 0.0,
+        end: float = float("inf"),
+        kind: Optional[int] = None,
+        subject: Optional[str] = None,
+        states: Optional[Iterable[State]] = None,
+        device: Optional[str] = None,
+    ) -> Iterator[Event]:
+        """
+        Events with start <= time <= end, oldest first. subject matches a
+        name or everything under it, "monitor/hw" is every entry of hw.
+        states keeps transitions into any of the given states.
+        """
+        subjects = self._ids(subject) if subject is not None else None
+        devices = self._ids(f"device/{device}") if device is not None else None
+        code_mask = sum(state.code for state in states) if states else 0
+
+        segments = self.segments()
+        starts = [_segment_start(segment) for segment in segments]
+        # the last segment starting before start may still reach it
+        first = max(bisect.bisect_left(starts, start) - 1, 0)
+
+        for segment, segment_start in zip(segments[first:], starts[first:]):
+            if segment_start > end:
+                break
+            for fields in self._scan(segment, start, end):
+                time_, value, subject_id, device_id, kind_, code, flags = fields
+                if kind is not None and kind_ != kind:
+                    continue
+                if subjects is not None and subject_id not in subjects:
+                    continue
+                if devices is not None and device_id not in devices:
+                    continue
+                if code_mask and not code & code_mask:
+                    continue
+                device_name = self.name(device_id)
+                yield Event(
+                    time_,
+                    kind_,
+                    self.name(subject_id),
+                    device_name[len("device/") :] if device_name else None,
+                    code,
+                    value,
+                    bool(flags & FLAG_TRUNCATED),
+                )
+
+    def _scan(self, segment: Path, start: float, end: float) -> Iterator[Tuple]:
+        """Record fields of one segment within the time range"""
+        with open(segment, "rb") as f:
+            size = f.seek(0, 2)
+            count = size // _RECORD.size
+            if count == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                lo, hi = 0, count
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    if _TIME.unpack_from(mm, mid * _RECORD.size)[0] < start:
+                        lo = mid + 1
+                    else:
+                        hi = mid
+
+                view = memoryview(mm)[lo * _RECORD.size : count * _RECORD.size]
+                try:
+                    for fields in _RECORD.iter_unpack(view):
+                        if fields[0] > end:
+                            break
+                        yield fields
+                finally:
+                    view.release()
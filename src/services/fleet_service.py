@@ -0,0 +1,132 @@
+import time
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from src.constants import DEFAULT_FLEET_SUBSCRIPTION
+from src.services.codec import HealthCodec
+from src.services.health_service import (
+    CompiledHealthConfig,
+    HealthService,
+    compile_health_config,
+    load_compiled_health_config,
+)
+from src.utils.scheduler import DeadlineScheduler
+from src.utils.topics import TOPIC_CACHE_SIZE, topic_matches
+
+
+class FleetService:
+    """Tracks a separate HealthService per device seen on a wildcard topic"""
+
+    def __init__(
+        self,
+        subscription: str = DEFAULT_FLEET_SUBSCRIPTION,
+        clock: Callable[[], float] = time.monotonic,
+        cfg: Optional[Union[dict, CompiledHealthConfig]] = None,
+        rearm_heartbeats: bool = False,
+    ) -> None:
+        self._subscription = subscription
+        levels = subscription.split("/")
+        if "+" not in levels:
+            raise ValueError(
+                f"{__name__}: subscription '{subscription}' needs a '+' device level"
+            )
+        self._device_level = levels.index("+")
+
+        # Every device is built from the same health.json template, compiled once
+        self._clock = clock
+        if cfg is None:
+            cfg = load_compiled_health_config()
+        elif not isinstance(cfg, CompiledHealthConfig):
+            cfg = compile_health_config(cfg)
+        self._cfg: CompiledHealthConfig = cfg
+        self._codec = HealthCodec.from_commands(cfg.commands)
+        self._rearm_heartbeats = rearm_heartbeats
+
+        self._devices: Dict[str, HealthService] = {}
+        # One scheduler for every device, polling does not scale with the fleet
+        self._scheduler = DeadlineScheduler()
+        self._device_ids: Dict[HealthService, str] = {}
+        # topic -> device id, None for topics that do not match the subscription,
+        # cleared when full like the TopicRouter cache
+        self._topics: Dict[str, Optional[str]] = {}
+
+    @property
+    def subscription(self) -> str:
+        return self._subscription
+
+    @property
+    def clock(self) -> Callable[[], float]:
+        return self._clock
+
+    @property
+    def codec(self) -> HealthCodec:
+        return self._codec
+
+    @property
+    def devices(self) -> Dict[str, HealthService]:
+        """Get every device seen so far."""
+        return self._devices
+
+    def device_id(self, topic: str) -> Optional[str]:
+        """Device id embedded in a topic, None if the topic is not a fleet topic."""
+        try:
+            return self._topics[topic]
+        except KeyError:
+            device_id = None
+            if topic_matches(self._subscription, topic):
+                device_id = topic.split("/")[self._device_level] or None
+            if len(self._topics) >= TOPIC_CACHE_SIZE:
+                self._topics.clear()
+            self._topics[topic] = device_id
+            return device_id
+
+    def device(self, device_id: str) -> HealthService:
+        """Get the health of a device, creating it on first sight."""
+        health_service = self._devices.get(device_id)
+        if health_service is None:
+            health_service = HealthService(
+                self._clock, self._cfg, self._scheduler, self._rearm_heartbeats
+            )
+            self._devices[device_id] = health_service
+            self._device_ids[health_service] = device_id
+        return health_service
+
+    def process_message(self, topic: str, msg: Dict) -> Optional[str]:
+        """Process a decoded message, returns the device id it was routed to."""
+        device_id = self.device_id(topic)
+        if device_id is None:
+            return None
+        self.device(device_id).process_message(msg)
+        return device_id
+
+    def poll(self, now: Optional[float] = None) -> List[Tuple[str, str]]:
+        """Advance heartbeats that are due, returns (device id, key) timeouts."""
+        if now is None:
+            now = self._clock()
+        return [
+            (self._device_ids[health_service], key)
+            for health_service, key in self._scheduler.poll(now)
+        ]
+
+    def next_deadline(self) -> Optional[float]:
+        """Earliest heartbeat deadline across the fleet."""
+        return self._scheduler.next_deadline()
+
+    def heartbeat_stats(self) -> Dict[str, Dict[str, Dict[str, Optional[float]]]]:
+        """Inter-arrival statistics of every heartbeat by device id."""
+        return {
+            device_id: health_service.heartbeat_stats()
+            for device_id, health_service in self._devices.items()
+        }
+
+    def reset_heartbeats(self) -> None:
+        """Reset every heartbeat of every device."""
+        for health_service in self._devices.values():
+            health_service.reset_heartbeats()
+
+    def degraded(self) -> List[str]:
+        """Overview of the fleet, only the devices whose state is degraded."""
+        return sorted(
+            device_id
+            for device_id, health_service in self._devices.items()
+            if health_service.degraded
+        )
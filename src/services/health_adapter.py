@@ -0,0 +1,233 @@
+import logging
+import math
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from src.constants import DEFAULT_COUNTDOWN_INTERVAL
+from src.models.delta import DeltaCoalescer, HealthDelta
+from src.services.codec import FORMAT_AUTO
+from src.services.event_log import EventLogWriter
+from src.services.health_service import HealthService
+from src.services.ingest import PayloadProcessor
+from src.utils.latency import STAGE_WAIT, LatencyTracker
+from src.utils.topics import TOPIC_CACHE_SIZE, topic_matches
+
+if TYPE_CHECKING:
+    from src.services.metrics import MetricsBuilder
+
+logger = logging.getLogger(__name__)
+
+
+class HealthAdapter(QObject):
+    """
+    Qt adapter around the pure-python HealthService, drives heartbeats.
+    Payloads are decoded and evaluated on the calling (MQTT) thread, the GUI
+    thread only receives frame_signal and takes the folded delta when it draws.
+    Heartbeats wake the GUI thread only when a deadline is due, the elapsed
+    time countdown is a separate, throttled tick that can be turned off.
+    """
+
+    tick_signal = pyqtSignal(str, float)
+    timeout_signal = pyqtSignal(str)
+    frame_signal = pyqtSignal()
+
+    def __init__(
+        self,
+        health_service: HealthService,
+        formats: Optional[Dict[str, str]] = None,
+        parent: Optional[QObject] = None,
+        countdown_interval: int = DEFAULT_COUNTDOWN_INTERVAL,
+        event_log: Optional[EventLogWriter] = None,
+        latency: Optional[LatencyTracker] = None,
+    ) -> None:
+        super().__init__(parent)
+        self._health_service = health_service
+        self._event_log = event_log
+        self._latency = latency or LatencyTracker()
+
+        # Subscription pattern -> payload format, resolved once per topic and
+        # cached like TopicRouter, cleared when per-device topics fill it
+        self._formats: Dict[str, str] = formats or {}
+        self._topic_formats: Dict[str, str] = {}
+
+        # Engine and pending frame are shared between the MQTT and GUI threads
+        self._lock = threading.Lock()
+        self._coalescer = DeltaCoalescer()
+        self._frame_started = 0.0
+        self._processor = PayloadProcessor(
+            self._lock,
+            lambda device_id: self._health_service,
+            self._latency,
+            event_log,
+            self._fold,
+        )
+
+        # Single-shot timer armed for the earliest heartbeat deadline
+        self._deadline_timer = QTimer(self)
+        self._deadline_timer.setSingleShot(True)
+        self._deadline_timer.timeout.connect(self._update_heartbeats)
+
+        # Elapsed time countdown is only a view, off when the interval is 0
+        self._countdown_timer = QTimer(self)
+        self._countdown_timer.timeout.connect(self._update_countdown)
+        self.set_countdown_interval(countdown_interval)
+
+    @property
+    def health_service(self) -> HealthService:
+        return self._health_service
+
+    @property
+    def latency(self) -> LatencyTracker:
+        """Pipeline stage latencies, shared with MqttService and the window"""
+        return self._latency
+
+    @property
+    def decode_errors(self) -> int:
+        """Payloads dropped because they were not a JSON object"""
+        return self._processor.decode_errors
+
+    @property
+    def process_errors(self) -> int:
+        """Messages dropped because the engine rejected them"""
+        return self._processor.process_errors
+
+    def handle_payload(self, topic: str, payload: bytes) -> None:
+        """
+        Decode and evaluate a raw payload, safe to call from any thread.
+        Only routed health topics should reach here, see MqttService.router.
+        """
+        self._processor.process(
+            self._health_service.codec, self._payload_format(topic), topic, payload
+        )
+
+    def _fold(self, delta: HealthDelta, messages: int) -> None:
+        """Fold into the pending frame, called under the engine lock"""
+        # Only wake the GUI for the first message of a frame, the signal is
+        # queued to the GUI thread and schedule_frame never takes the lock
+        if self._coalescer.messages == 0:
+            self._frame_started = time.perf_counter()
+            self.frame_signal.emit()
+        self._coalescer.add(delta, messages)
+
+    def collect_metrics(self, builder: "MetricsBuilder") -> None:
+        """Engine, error and latency metrics, safe to call from any thread"""
+        # the exporter pulls in http.server, only load it when metrics are on
+        from src.services.metrics import (
+            collect_health,
+            collect_latency,
+            snapshot_health,
+        )
+
+        with self._lock:
+            snapshot = snapshot_health(self._health_service)
+        collect_health(builder, snapshot)
+        builder.add(
+            "decode_errors_total",
+            "counter",
+            "Payloads dropped because they could not be decoded",
+            self._processor.decode_errors,
+        )
+        builder.add(
+            "process_errors_total",
+            "counter",
+            "Commands rejected by the engine",
+            self._processor.process_errors,
+        )
+        collect_latency(builder, self._latency)
+
+    def _payload_format(self, topic: str) -> str:
+        """Format negotiated for a topic, json and binary both pass on auto"""
+        fmt = self._topic_formats.get(topic)
+        if fmt is None:
+            fmt = next(
+                (f for p, f in self._formats.items() if topic_matches(p, topic)),
+                FORMAT_AUTO,
+            )
+            if len(self._topic_formats) >= TOPIC_CACHE_SIZE:
+                self._topic_formats.clear()
+            self._topic_formats[topic] = fmt
+        return fmt
+
+    def process_message(self, msg: Dict) -> HealthDelta:
+        """Process a decoded health message, returns what changed"""
+        with self._lock:
+            return self._health_service.process_message(msg)
+
+    def take_delta(self) -> Tuple[HealthDelta, int]:
+        """Take everything folded since the last frame and its message count"""
+        with self._lock:
+            delta, messages = self._coalescer.take()
+            started = self._frame_started
+
+        if messages:
+            self._latency.record(STAGE_WAIT, time.perf_counter() - started)
+
+        # a ping may have started a heartbeat, timers only run on this thread
+        if delta.heartbeats:
+            self._arm_deadline()
+        return delta, messages
+
+    def reset_heartbeat(self, key: str) -> None:
+        """Reset a single heartbeat and show the cleared countdown"""
+        with self._lock:
+            self._health_service.heartbeats[key].reset()
+        self.tick_signal.emit(key, 0.0)
+
+    def heartbeat_stats(self, key: str) -> Dict[str, Optional[float]]:
+        """Snapshot of a heartbeat's inter-arrival statistics"""
+        with self._lock:
+            return self._health_service.heartbeats[key].stats.snapshot()
+
+    def set_countdown_interval(self, interval: int) -> None:
+        """Milliseconds between elapsed time ticks, 0 stops the countdown"""
+        if interval > 0:
+            self._countdown_timer.start(interval)
+        else:
+            self._countdown_timer.stop()
+
+    def _arm_deadline(self) -> None:
+        """Wake up exactly when the earliest heartbeat deadline is due"""
+        with self._lock:
+            deadline = self._health_service.next_deadline()
+            now = self._health_service.clock()
+
+        if deadline is None:
+            self._deadline_timer.stop()
+            return
+        self._deadline_timer.start(max(0, math.ceil((deadline - now) * 1000)))
+
+    def next_deadline(self) -> Optional[float]:
+        """Earliest heartbeat deadline, safe to call from any thread"""
+        with self._lock:
+            return self._health_service.next_deadline()
+
+    def poll_heartbeats(self) -> None:
+        """Advance heartbeats that are due and emit timeouts, any thread"""
+        with self._lock:
+            timed_out = self._health_service.poll()
+
+        for key in timed_out:
+            if self._event_log is not None:
+                self._event_log.record_timeout(key)
+            self.timeout_signal.emit(key)
+
+    def _update_heartbeats(self) -> None:
+        """Deadline timer fired, poll and wait for the next deadline"""
+        self.poll_heartbeats()
+        self._arm_deadline()
+
+    def _update_countdown(self) -> None:
+        """Emit elapsed time of every running heartbeat for the countdown view"""
+        with self._lock:
+            now = self._health_service.clock()
+            ticks = [
+                (key, heartbeat.elapsed(now))
+                for key, heartbeat in self._health_service.heartbeats.items()
+                if heartbeat.active
+            ]
+
+        for key, elapsed in ticks:
+            self.tick_signal.emit(key, elapsed)
@@ -1,107 +1,250 @@
 import json
-from typing import Dict, Set
-
-from PyQt6.QtCore import QObject
-
-from src.constants import HEALTH_CONFIG
+import time
+from functools import partial
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from src.constants import HEALTH_CACHE_VERSION, HEALTH_CONFIG, WDLM_COMMAND
+from src.models.delta import EMPTY_DELTA, HealthDelta
 from src.models.heartbeat import Heartbeat
-from src.models.monitor import Monitor
+from src.models.monitor import CompiledMonitor, Monitor
+from src.models.phi_accrual import PhiAccrualDetector
 from src.models.state import State
 from src.models.wdlms import Wdlms
+from src.services.codec import HealthCodec, unpack_batch
+from src.utils.cache import load_compiled
+from src.utils.scheduler import DeadlineScheduler
 
+# Distinct unknown command names counted individually, the rest only in total
+UNKNOWN_COMMANDS_TRACKED = 64
 
-class HealthService(QObject):
-    def __init__(self):
-        super().__init__()
-        self._monitors: Dict[str, Monitor] = {}
-        self._heartbeats: Dict[str, Heartbeat] = {}
-        self._version: int = 0
+Parser = Callable[[Any], Any]
+# Folds a parsed value into the delta being built: monitors, wdlms, heartbeats
+CommandHandler = Callable[
+    [Any, Dict[str, Dict[str, FrozenSet[State]]], Dict[int, State], Set[str]], None
+]
+# Value parsers of a command, each with the handlers sharing its parsed value
+Dispatch = Tuple[Tuple[Parser, Tuple[CommandHandler, ...]], ...]
+
+
+class BatchError(ValueError):
+    """Some commands of a batch were rejected, the rest were applied"""
+
+    def __init__(self, delta: HealthDelta, errors: List[Exception]) -> None:
+        super().__init__(
+            f"{len(errors)} command(s) rejected: " + "; ".join(map(str, errors))
+        )
+        self.delta = delta
+        self.errors = errors
+
+
+def load_health_config() -> dict:
+    """Read the raw health configuration from the JSON file."""
+    with open(HEALTH_CONFIG, "r") as f:
+        return json.load(f)
+
+
+# name, retry limit, time limit, phi threshold or None
+HeartbeatParams = Tuple[str, int, int, Optional[float]]
+# name, color, dock, seats
+WdlmsParams = Tuple[str, str, str, int]
+
+
+class CompiledHealthConfig(NamedTuple):
+    """A validated health config, builds a HealthService without parsing"""
+
+    version: int
+    # commands in binary command id order
+    commands: Tuple[str, ...]
+    monitors: Dict[str, CompiledMonitor]
+    heartbeats: Dict[str, HeartbeatParams]
+    wdlms: WdlmsParams
+
+
+def compile_health_config(cfg: dict) -> CompiledHealthConfig:
+    """Validate a raw health config and compile its monitors."""
+    _validate_config_structure(cfg)
+    return CompiledHealthConfig(
+        cfg["version"],
+        tuple(HealthCodec(cfg).ids),
+        _compile_monitors(cfg["monitors"]),
+        _compile_heartbeats(cfg["heartbeats"]),
+        _compile_wdlms(cfg["wdlms"]),
+    )
+
+
+def load_compiled_health_config() -> CompiledHealthConfig:
+    """Compiled health config, read from the cache while the file is unchanged."""
+    return load_compiled(
+        HEALTH_CONFIG,
+        lambda raw: compile_health_config(json.loads(raw)),
+        HEALTH_CACHE_VERSION,
+    )
+
+
+def _validate_config_structure(cfg: dict) -> None:
+    """Validate the basic structure of the configuration."""
+    if not isinstance(cfg, dict):
+        raise TypeError(f"{__name__}: config must be a dict, got {type(cfg)}")
+
+    if "version" not in cfg or not isinstance(cfg["version"], int):
+        raise TypeError(f"{__name__}: 'version' must be an int")
 
-        self._load_config()
+    if "monitors" not in cfg or not isinstance(cfg["monitors"], dict):
+        raise TypeError(f"{__name__}: 'monitors' must be a dict")
 
-    def _load_config(self):
-        """Load and parse health configuration from JSON file."""
-        with open(HEALTH_CONFIG, "r") as f:
-            data = json.load(f)
+    if "heartbeats" not in cfg or not isinstance(cfg["heartbeats"], dict):
+        raise TypeError(f"{__name__}: 'heartbeats' must be a dict")
 
-        self._validate_config_structure(data)
-        self._version = data["version"]
-        self._load_monitors(data["monitors"])
-        self._load_heartbeats(data["heartbeats"])
-        self._load_wdlms(data["wdlms"])
+    if "wdlms" not in cfg or not isinstance(cfg["wdlms"], dict):
+        raise TypeError(f"{__name__}: 'wdlms' msut be a dict")
 
-    def _validate_config_structure(self, cfg: dict) -> None:
-        """Validate the basic structure of the configuration."""
+
+def _compile_monitors(monitors_cfg: dict) -> Dict[str, CompiledMonitor]:
+    """Validate monitor configurations into compiled monitors."""
+    monitors = {}
+    for key, cfg in monitors_cfg.items():
         if not isinstance(cfg, dict):
-            raise TypeError(f"{__name__}: config must be a dict, got {type(cfg)}")
-
-        if "version" not in cfg or not isinstance(cfg["version"], int):
-            raise TypeError(f"{__name__}: 'version' must be an int")
-
-        if "monitors" not in cfg or not isinstance(cfg["monitors"], dict):
-            raise TypeError(f"{__name__}: 'monitors' must be a dict")
-
-        if "heartbeats" not in cfg or not isinstance(cfg["heartbeats"], dict):
-            raise TypeError(f"{__name__}: 'heartbeats' must be a dict")
-
-        if "wdlms" not in cfg or not isinstance(cfg["wdlms"], dict):
-            raise TypeError(f"{__name__}: 'wdlms' msut be a dict")
-
-    def _load_monitors(self, monitors_cfg: dict) -> None:
-        """Load monitor configurations."""
-        for key, cfg in monitors_cfg.items():
-            if not isinstance(cfg, dict):
-                raise TypeError(
-                    f"{__name__}: monitor '{key}' must be a dict, got {type(cfg)}"
-                )
-
-            name = cfg["name"]
-            if not isinstance(name, str):
-                name = key
-
-            self._monitors[key] = Monitor(name, cfg)
-
-    def _load_heartbeats(self, heartbeats_cfg: dict) -> None:
-        """Load heartbeat configurations."""
-        for key, cfg in heartbeats_cfg.items():
-            if not isinstance(cfg, dict):
-                raise TypeError(
-                    f"{__name__}: heartbeat '{key}' must be a dict, got {type(cfg)}"
-                )
-
-            name = cfg["name"]
-            if not isinstance(name, str):
-                name = key
-
-            retry_limit = cfg["retry_limit"]
-            if not isinstance(retry_limit, int):
-                raise TypeError(
-                    f"{__name__}: retries_max must be an int, got {type(retry_limit)}"
-                )
-
-            time_limit = cfg["time_limit"]
-            if not isinstance(time_limit, int):
-                raise TypeError(
-                    f"{__name__}: time_max must be an int, got {type(time_limit)}"
-                )
-
-            heartbeat = Heartbeat(name, retry_limit, time_limit)
-            self._heartbeats[key] = heartbeat
-
-    def _load_wdlms(self, wdlms_cfg: dict):
-        name = wdlms_cfg.get("name")
+            raise TypeError(
+                f"{__name__}: monitor '{key}' must be a dict, got {type(cfg)}"
+            )
+
+        name = cfg["name"]
         if not isinstance(name, str):
-            name = "WDLMs Status"
+            name = key
 
-        color = wdlms_cfg.get("color")
-        if not isinstance(color, str):
-            color = "white"
+        monitors[key] = Monitor(name, cfg).compiled()
+    return monitors
 
-        dock = wdlms_cfg.get("dock")
-        if not isinstance(color, str):
-            dock = "left"
 
-        self._wdlms = Wdlms(name, color, dock)
+def _compile_heartbeats(heartbeats_cfg: dict) -> Dict[str, HeartbeatParams]:
+    """Validate heartbeat configurations."""
+    heartbeats = {}
+    for key, cfg in heartbeats_cfg.items():
+        if not isinstance(cfg, dict):
+            raise TypeError(
+                f"{__name__}: heartbeat '{key}' must be a dict, got {type(cfg)}"
+            )
+
+        name = cfg["name"]
+        if not isinstance(name, str):
+            name = key
+
+        retry_limit = cfg["retry_limit"]
+        if not isinstance(retry_limit, int):
+            raise TypeError(
+                f"{__name__}: retries_max must be an int, got {type(retry_limit)}"
+            )
+
+        time_limit = cfg["time_limit"]
+        if not isinstance(time_limit, int):
+            raise TypeError(
+                f"{__name__}: time_max must be an int, got {type(time_limit)}"
+            )
+
+        # optional adaptive detection on top of the fixed time limit
+        phi_threshold = cfg.get("phi_threshold")
+        if phi_threshold is not None and not isinstance(phi_threshold, (int, float)):
+            raise TypeError(
+                f"{__name__}: phi_threshold must be a number, "
+                f"got {type(phi_threshold)}"
+            )
+
+        heartbeats[key] = (name, retry_limit, time_limit, phi_threshold)
+    return heartbeats
+
+
+def _compile_wdlms(wdlms_cfg: dict) -> WdlmsParams:
+    name = wdlms_cfg.get("name")
+    if not isinstance(name, str):
+        name = "WDLMs Status"
+
+    color = wdlms_cfg.get("color")
+    if not isinstance(color, str):
+        color = "white"
+
+    dock = wdlms_cfg.get("dock")
+    if not isinstance(dock, str):
+        dock = "left"
+
+    seats = wdlms_cfg.get("seats", 0)
+    if not isinstance(seats, int):
+        raise TypeError(f"{__name__}: 'seats' must be an int, got {type(seats)}")
+
+    return name, color, dock, seats
+
+
+class HealthService:
+    def __init__(
+        self,
+        clock: Callable[[], float] = time.monotonic,
+        cfg: Optional[Union[dict, CompiledHealthConfig]] = None,
+        scheduler: Optional[DeadlineScheduler] = None,
+        rearm_heartbeats: bool = False,
+    ):
+        self._clock = clock
+        # Heartbeat deadlines, shared when a fleet of services is polled as one
+        self._scheduler = scheduler if scheduler is not None else DeadlineScheduler()
+        # Unattended, a ping restarts a timed out heartbeat instead of being
+        # ignored until someone resets it
+        self._rearm_heartbeats = rearm_heartbeats
+        self._monitors: Dict[str, Monitor] = {}
+        self._heartbeats: Dict[str, Heartbeat] = {}
+        self._version: int = 0
+        self._unknown_commands = 0
+        self._unknown_counts: Dict[str, int] = {}
+        self._command_counts: Dict[str, int] = {}
+
+        self._load_config(cfg)
+
+    def _load_config(
+        self, data: Optional[Union[dict, CompiledHealthConfig]] = None
+    ) -> None:
+        """
+        Build monitors, heartbeats and wdlms from a compiled config.
+        A raw dict is compiled first, without a config the cached compile of
+        the JSON file is used.
+        """
+        if data is None:
+            data = load_compiled_health_config()
+        elif not isinstance(data, CompiledHealthConfig):
+            data = compile_health_config(data)
+
+        self._codec = HealthCodec.from_commands(data.commands)
+        self._version = data.version
+        self._monitors = {
+            key: Monitor.from_compiled(compiled)
+            for key, compiled in data.monitors.items()
+        }
+        self._heartbeats = {
+            key: self._build_heartbeat(*params)
+            for key, params in data.heartbeats.items()
+        }
+        self._wdlms = Wdlms(*data.wdlms)
+        self._compile_dispatch()
+
+    def _build_heartbeat(
+        self,
+        name: str,
+        retry_limit: int,
+        time_limit: int,
+        phi_threshold: Optional[float],
+    ) -> Heartbeat:
+        detector = None
+        if phi_threshold is not None:
+            detector = PhiAccrualDetector(phi_threshold)
+        return Heartbeat(name, retry_limit, time_limit, self._clock, detector)
 
     @property
     def version(self) -> int:
@@ -122,56 +265,248 @@ class HealthService(QObject):
     def wdlms(self) -> Wdlms:
         return self._wdlms
 
-    def process_message(self, msg: Dict):
-        cmd = msg["cmd"]
+    @property
+    def codec(self) -> HealthCodec:
+        """Get the payload codec with command ids from the configuration."""
+        return self._codec
+
+    @property
+    def clock(self) -> Callable[[], float]:
+        """Get the monotonic clock heartbeats are measured against."""
+        return self._clock
+
+    @property
+    def scheduler(self) -> DeadlineScheduler:
+        """Get the scheduler heartbeat deadlines are queued on."""
+        return self._scheduler
+
+    def poll(self, now: Optional[float] = None) -> List[str]:
+        """
+        Advance heartbeats that are due, returns the keys of those that timed out.
+        With a shared scheduler poll the scheduler itself, tags are (service, key).
+        """
+        if now is None:
+            now = self._clock()
+        return [key for _, key in self._scheduler.poll(now)]
+
+    def next_deadline(self) -> Optional[float]:
+        """Earliest queued heartbeat deadline, the time poll next has work."""
+        return self._scheduler.next_deadline()
+
+    @property
+    def degraded(self) -> bool:
+        """True if a heartbeat is missing, an entry faulted or an alarm is active."""
+        for heartbeat in self._heartbeats.values():
+            if heartbeat.timed_out or heartbeat.retry_attempt > 0:
+                return True
+
+        for monitor in self._monitors.values():
+            for entry in monitor.entries.values():
+                if State.FAULTED in entry.states:
+                    return True
+                if monitor.alarm and State.ON in entry.states:
+                    return True
+
+        return False
+
+    def heartbeat_stats(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Inter-arrival statistics of every heartbeat, keyed like heartbeats."""
+        return {key: hb.stats.snapshot() for key, hb in self._heartbeats.items()}
+
+    def reset_heartbeats(self) -> None:
+        """Reset every heartbeat, clearing time and retries."""
+        for heartbeat in self._heartbeats.values():
+            heartbeat.reset()
+
+    def process_message(self, msg: Union[Dict, List[Dict]]) -> HealthDelta:
+        """
+        Process a decoded message, returns exactly what changed state.
+        A message is {"cmd": ..., "value": ...}, a list of those, or a batch
+        dict of cmd -> value. Batches are evaluated as one pass and one delta.
+        """
+        if isinstance(msg, dict) and "cmd" in msg:
+            monitors: Dict[str, Dict[str, FrozenSet[State]]] = {}
+            wdlms: Dict[int, State] = {}
+            heartbeats: Set[str] = set()
+            self._process_command(
+                msg["cmd"], msg["value"], monitors, wdlms, heartbeats
+            )
+            return self._delta(monitors, wdlms, heartbeats)
+
+        return self.process_batch(unpack_batch(msg))
+
+    def process_batch(self, batch: Iterable[Tuple[str, Any]]) -> HealthDelta:
+        """
+        Process (cmd, value) pairs in one pass, returns a single delta.
+        Rejected commands do not stop the batch, they are raised together in
+        a BatchError carrying the delta of everything that was applied.
+        """
+        monitors: Dict[str, Dict[str, FrozenSet[State]]] = {}
+        wdlms: Dict[int, State] = {}
+        heartbeats: Set[str] = set()
+        errors: List[Exception] = []
+
+        for cmd, value in batch:
+            try:
+                self._process_command(cmd, value, monitors, wdlms, heartbeats)
+            except (KeyError, TypeError, ValueError) as e:
+                errors.append(e)
+
+        delta = self._delta(monitors, wdlms, heartbeats)
+        if errors:
+            raise BatchError(delta, errors)
+        return delta
+
+    @staticmethod
+    def _delta(
+        monitors: Dict[str, Dict[str, FrozenSet[State]]],
+        wdlms: Dict[int, State],
+        heartbeats: Set[str],
+    ) -> HealthDelta:
+        if not (monitors or wdlms or heartbeats):
+            return EMPTY_DELTA
+        return HealthDelta(monitors, wdlms, frozenset(heartbeats))
+
+    # ==================================================
+    # Dispatch
+    # ==================================================
+
+    def _compile_dispatch(self) -> None:
+        """Build the command -> (parser, handlers) table from the loaded config."""
+        table: Dict[str, Dict[Parser, List[CommandHandler]]] = {}
+
+        def register(cmd: str, parser: Parser, handler: CommandHandler) -> None:
+            table.setdefault(cmd, {}).setdefault(parser, []).append(handler)
+
+        for key, monitor in self._monitors.items():
+            register(key, _parse_int, partial(self._process_monitor, key, monitor))
+        for key, heartbeat in self._heartbeats.items():
+            register(
+                key,
+                _parse_int,
+                partial(self._process_heartbeat, (self, key), heartbeat),
+            )
+        register(WDLM_COMMAND, _parse_wdlm, self._process_wdlms)
+
+        self._dispatch: Dict[str, Dispatch] = {
+            cmd: tuple((parser, tuple(group)) for parser, group in parsers.items())
+            for cmd, parsers in table.items()
+        }
+        # wdlm is matched case-insensitively, spellings are added as seen
+        self._wdlm_dispatch: Dispatch = ((_parse_wdlm, (self._process_wdlms,)),)
+
+    @property
+    def unknown_commands(self) -> int:
+        """Number of commands received that no monitor, heartbeat or wdlm handles."""
+        return self._unknown_commands
+
+    @property
+    def unknown_command_counts(self) -> Dict[str, int]:
+        """Unknown commands by name, the first UNKNOWN_COMMANDS_TRACKED seen."""
+        return self._unknown_counts
+
+    @property
+    def command_counts(self) -> Dict[str, int]:
+        """Handled commands by name as received, rejected values included."""
+        return self._command_counts
+
+    def _process_command(
+        self,
+        cmd: str,
+        value: Any,
+        monitors: Dict[str, Dict[str, FrozenSet[State]]],
+        wdlms: Dict[int, State],
+        heartbeats: Set[str],
+    ) -> None:
+        """Process a single command, folding its changes into the given delta."""
+        dispatch = self._dispatch.get(cmd)
+        if dispatch is None:
+            dispatch = self._resolve(cmd)
+            if dispatch is None:
+                return
+
+        counts = self._command_counts
+        counts[cmd] = counts.get(cmd, 0) + 1
+        for parser, handlers in dispatch:
+            parsed = parser(value)
+            for handler in handlers:
+                handler(parsed, monitors, wdlms, heartbeats)
+
+    def _resolve(self, cmd: str) -> Optional[Dispatch]:
+        """Slow path for commands missing from the table, counts unknown ones."""
         if not isinstance(cmd, str):
             raise TypeError(f"unable to parse command, must be str, got {type(cmd)}")
 
-        # look for cmd as key in all monitors
-        if cmd in self._monitors:
-            # if invalid int try parsing as string
-            value = msg["value"]
-            if not isinstance(value, int):
-                try:
-                    value = int(value, 0)
-                except Exception:
-                    raise TypeError(
-                        f"unable to parse value, must be int, got {type(value)}"
-                    )
-            self._process_monitor(cmd, value)
-
-        # look for cmd as key in all heartbeats
-        if cmd in self._heartbeats:
-            # if invalid int try parsing as string
-            value = msg["value"]
-            if not isinstance(value, int):
-                try:
-                    value = int(value, 0)
-                except Exception:
-                    raise TypeError(
-                        f"unable to parse value, must be int, got {type(value)}"
-                    )
-            self._process_heartbeat(cmd, value)
-
-        # check if cmd is wdlm
-        if cmd.lower() == "wdlm":
-            # must be parsed as string to get seat data
-            value = msg["value"]
-            if not isinstance(value, str):
-                raise TypeError(f"unable to parse value, must be str, go {type(value)}")
-            self._process_wdlms(value)
-
-    def _process_monitor(self, monitor_id: str, value: int) -> Dict[str, Set[State]]:
+        if cmd.lower() == WDLM_COMMAND:
+            self._dispatch[cmd] = self._wdlm_dispatch
+            return self._wdlm_dispatch
+
+        self._unknown_commands += 1
+        if cmd in self._unknown_counts:
+            self._unknown_counts[cmd] += 1
+        elif len(self._unknown_counts) < UNKNOWN_COMMANDS_TRACKED:
+            self._unknown_counts[cmd] = 1
+        return None
+
+    def _process_monitor(
+        self,
+        key: str,
+        monitor: Monitor,
+        value: int,
+        monitors: Dict[str, Dict[str, FrozenSet[State]]],
+        wdlms: Dict[int, State],
+        heartbeats: Set[str],
+    ) -> None:
         """Process a monitor command with the given value."""
-        if monitor_id not in self._monitors:
-            raise KeyError(f"unknown monitor id: '{monitor_id}'")
-        return self._monitors[monitor_id].process(value)
-
-    def _process_heartbeat(self, heartbeat_id: str, value: int) -> None:
-        """Process a heartbeat signal."""
-        if heartbeat_id not in self._heartbeats:
-            raise KeyError(f"Unknown heartbeat id: '{heartbeat_id}'")
-        self._heartbeats[heartbeat_id].process(value)
-
-    def _process_wdlms(self, value: str) -> None:
-        self.wdlms.process(value)
\ No newline at end of file
+        changes = monitor.process(value, self._clock())
+        if changes:
+            monitors.setdefault(key, {}).update(changes)
+
+    def _process_heartbeat(
+        self,
+        tag: Tuple["HealthService", str],
+        heartbeat: Heartbeat,
+        value: int,
+        monitors: Dict[str, Dict[str, FrozenSet[State]]],
+        wdlms: Dict[int, State],
+        heartbeats: Set[str],
+    ) -> None:
+        """Process a heartbeat signal, the ping only moves its deadline."""
+        if heartbeat.timed_out and self._rearm_heartbeats:
+            heartbeat.reset()
+        if heartbeat.process(value):
+            self._scheduler.schedule(tag, heartbeat)
+            heartbeats.add(tag[1])
+
+    def _process_wdlms(
+        self,
+        value: Union[int, str],
+        monitors: Dict[str, Dict[str, FrozenSet[State]]],
+        wdlms: Dict[int, State],
+        heartbeats: Set[str],
+    ) -> None:
+        """Process a bitstring, hex string or int bitfield of seat data."""
+        try:
+            wdlms.update(self._wdlms.process(value, self._clock()))
+        except ValueError as e:
+            # the error names the problem, the value itself may be huge
+            raise TypeError(f"unable to parse wdlm value: {str(e)}")
+
+
+def _parse_int(value: Any) -> int:
+    """Monitor and heartbeat values are ints or int strings in any base."""
+    if isinstance(value, int):
+        return value
+    try:
+        return int(value, 0)
+    except Exception:
+        raise TypeError(f"unable to parse value, must be int, got {type(value)}")
+
+
+def _parse_wdlm(value: Any) -> Union[int, str]:
+    """Wdlm values are parsed by Wdlms itself, only the type is checked here."""
+    if not isinstance(value, (int, str)):
+        raise TypeError(
+            f"unable to parse value, must be str or int, got {type(value)}"
+        )
+    return value
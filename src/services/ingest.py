@@ -0,0 +1,178 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from src.constants import TOPICS_TRACKED
+from src.models.delta import HealthDelta
+from src.services.capture import CaptureWriter
+from src.services.codec import HealthCodec
+from src.services.event_log import EventLogWriter
+from src.services.health_service import BatchError, HealthService
+from src.utils.latency import (
+    STAGE_DECODE,
+    STAGE_EVALUATE,
+    STAGE_RECEIVE,
+    LatencyTracker,
+)
+from src.utils.log import MessageRateLog
+from src.utils.topics import TopicRouter
+
+logger = logging.getLogger(__name__)
+
+# device id -> engine, None is the single health service
+Engine = Callable[[Optional[str]], HealthService]
+# delta and message count, called while holding the engine lock
+Fold = Callable[[HealthDelta, int], None]
+
+
+class MessageIntake:
+    """
+    Receive side shared by the GUI and headless, called on the MQTT thread.
+    Counts messages by topic, summarizes them in the log, samples receive
+    latency, records the capture and routes the payload to its handlers.
+    """
+
+    def __init__(
+        self,
+        router: TopicRouter,
+        log: logging.Logger,
+        latency: Optional[LatencyTracker] = None,
+        capture: Optional[CaptureWriter] = None,
+    ) -> None:
+        self._router = router
+        self._latency = latency
+        self._capture = capture
+        self._received = 0
+        self._topic_counts: Dict[str, int] = {}
+        # a line per topic every MESSAGE_LOG_INTERVAL, not one per message
+        self._message_log = MessageRateLog(log)
+
+    @property
+    def router(self) -> TopicRouter:
+        return self._router
+
+    @property
+    def received(self) -> int:
+        """Messages received since start"""
+        return self._received
+
+    @property
+    def topic_counts(self) -> Dict[str, int]:
+        """Messages by topic, the first TOPICS_TRACKED topics only"""
+        return self._topic_counts
+
+    def set_capture(self, capture: Optional[CaptureWriter]) -> None:
+        self._capture = capture
+
+    def set_latency(self, latency: Optional[LatencyTracker]) -> None:
+        self._latency = latency
+
+    def receive(self, topic: str, payload: bytes, timestamp: float) -> bool:
+        """
+        Take in a message stamped with time.monotonic when paho read it.
+        Returns False if no handler was routed to, it was not decoded.
+        """
+        self._received += 1
+        counts = self._topic_counts
+        if topic in counts:
+            counts[topic] += 1
+        elif len(counts) < TOPICS_TRACKED:
+            counts[topic] = 1
+        self._message_log.update(counts, self._received)
+
+        latency = self._latency
+        if latency is not None and self._received % latency.sample_every == 0:
+            latency.record(STAGE_RECEIVE, time.monotonic() - timestamp)
+        if self._capture is not None:
+            self._capture.write(topic, payload)
+        return self._router.route(topic, payload)
+
+    def update_log(self) -> None:
+        """Log a due summary, from a timer or poll loop while traffic stops"""
+        self._message_log.update(self._topic_counts, self._received)
+
+    def flush_log(self) -> None:
+        """Log what was received since the last summary, on stop"""
+        self._message_log.flush(self._topic_counts, self._received)
+
+
+class PayloadProcessor:
+    """
+    Decode and evaluate side shared by the GUI and headless, any thread.
+    Payloads are decoded before taking the engine lock and evaluated under
+    it, sampled stage latencies and the event log are fed after releasing it.
+    """
+
+    def __init__(
+        self,
+        lock: threading.Lock,
+        engine: Engine,
+        latency: LatencyTracker,
+        event_log: Optional[EventLogWriter] = None,
+        fold: Optional[Fold] = None,
+    ) -> None:
+        self._lock = lock
+        self._engine = engine
+        self._latency = latency
+        self._event_log = event_log
+        self._fold = fold
+        self._decode_errors = 0
+        self._process_errors = 0
+
+    @property
+    def decode_errors(self) -> int:
+        """Payloads dropped because they could not be decoded"""
+        return self._decode_errors
+
+    @property
+    def process_errors(self) -> int:
+        """Commands rejected by the engine"""
+        return self._process_errors
+
+    def process(
+        self,
+        codec: HealthCodec,
+        fmt: str,
+        topic: str,
+        payload: bytes,
+        device_id: Optional[str] = None,
+    ) -> Optional[HealthDelta]:
+        """Decode and evaluate a payload, None if it could not be decoded"""
+        timed = self._latency.sample()
+        if timed:
+            start = time.perf_counter()
+
+        try:
+            batch = codec.decode(payload, fmt)
+        except ValueError as e:
+            self._decode_errors += 1
+            logger.warning(f"failed decoding message on {topic}: {str(e)}")
+            return None
+
+        if timed:
+            decoded = time.perf_counter()
+
+        with self._lock:
+            # resolved under the lock, a new fleet device joins the fleet dict
+            # and the shared scheduler read by the poll loop and the metrics
+            health_service = self._engine(device_id)
+            try:
+                delta = health_service.process_batch(batch)
+            except BatchError as e:
+                self._process_errors += len(e.errors)
+                logger.warning(f"failed processing message on {topic}: {str(e)}")
+                delta = e.delta
+            if self._fold is not None:
+                self._fold(delta, len(batch))
+
+        if timed:
+            evaluated = time.perf_counter() - decoded
+            self._latency.record(STAGE_DECODE, decoded - start)
+            self._latency.record(STAGE_EVALUATE, evaluated)
+            if len(batch) == 1 and isinstance(batch[0][0], str):
+                self._latency.record_command(batch[0][0], evaluated)
+
+        if self._event_log is not None:
+            self._event_log.record(batch, delta, device_id)
+        return delta
@@ -0,0 +1,305 @@
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from src.constants import DEFAULT_METRICS_HOST, METRICS_INTERVAL
+from src.models.state import State
+from src.services.health_service import HealthService
+from src.utils.latency import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+PREFIX = "wdrc_"
+
+Labels = Dict[str, str]
+# metric name suffix such as _count, labels, value
+Sample = Tuple[str, Labels, float]
+Collector = Callable[["MetricsBuilder"], None]
+
+
+class MetricsBuilder:
+    """Collects samples by metric family and renders the text format"""
+
+    def __init__(self) -> None:
+        # name -> type, help and samples, rendered in insertion order
+        self._families: Dict[str, Tuple[str, str, List[Sample]]] = {}
+
+    def add(
+        self,
+        name: str,
+        kind: str,
+        help: str,
+        value: Optional[float],
+        labels: Optional[Labels] = None,
+        suffix: str = "",
+    ) -> None:
+        """Add a sample, a None value only declares the family"""
+        family = self._families.get(name)
+        if family is None:
+            family = (kind, help, [])
+            self._families[name] = family
+        if value is not None:
+            family[2].append((suffix, labels or {}, value))
+
+    def text(self) -> str:
+        lines = []
+        for name, (kind, help, samples) in self._families.items():
+            name = PREFIX + name
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in samples:
+                # repr keeps every digit, %g would round large counters
+                lines.append(f"{name}{suffix}{_format_labels(labels)} {value!r}")
+        lines.append("")
+        return "\n".join(lines)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items())
+    return "{" + pairs + "}"
+
+
+# ==================================================
+# Collectors
+# ==================================================
+
+
+class HealthSnapshot(NamedTuple):
+    """Raw counters and state codes of one engine, formatted without its lock"""
+
+    command_counts: Dict[str, int]
+    unknown_commands: int
+    # key, seconds since the last accepted ping or None, retries, timed out, missed
+    heartbeats: List[Tuple[str, Optional[float], int, bool, int]]
+    # monitor, entry, state code
+    entries: List[Tuple[str, str, int]]
+    # seat, state code
+    wdlms: List[Tuple[str, int]]
+
+
+def snapshot_health(health_service: HealthService) -> HealthSnapshot:
+    """Copy what collect_health reports, hold the engine's lock"""
+    now = health_service.clock()
+    wdlms = health_service.wdlms
+    return HealthSnapshot(
+        dict(health_service.command_counts),
+        health_service.unknown_commands,
+        [
+            (
+                key,
+                heartbeat.age(now),
+                heartbeat.retry_attempt,
+                heartbeat.timed_out,
+                heartbeat.stats.missed,
+            )
+            for key, heartbeat in health_service.heartbeats.items()
+        ],
+        [
+            (key, entry_key, entry.code)
+            for key, monitor in health_service.monitors.items()
+            for entry_key, entry in monitor.entries.items()
+        ],
+        [(wdlms.row_name(row), wdlms.state(row).code) for row in range(wdlms.count)],
+    )
+
+
+def collect_health(
+    builder: MetricsBuilder,
+    snapshot: HealthSnapshot,
+    labels: Optional[Labels] = None,
+) -> None:
+    """Commands, heartbeats and entry states of one engine's snapshot"""
+    labels = labels or {}
+
+    for cmd, count in snapshot.command_counts.items():
+        builder.add(
+            "commands_total",
+            "counter",
+            "Commands processed by command",
+            count,
+            {**labels, "cmd": cmd},
+        )
+    builder.add(
+        "unknown_commands_total",
+        "counter",
+        "Commands dropped because no monitor, heartbeat or wdlm handles them",
+        snapshot.unknown_commands,
+        labels,
+    )
+
+    for key, age, retries, timed_out, missed in snapshot.heartbeats:
+        hb_labels = {**labels, "heartbeat": key}
+        builder.add(
+            "heartbeat_age_seconds",
+            "gauge",
+            "Seconds since the last accepted ping, also while timed out",
+            age,
+            hb_labels,
+        )
+        builder.add(
+            "heartbeat_retries",
+            "gauge",
+            "Intervals missed in a row",
+            retries,
+            hb_labels,
+        )
+        builder.add(
+            "heartbeat_timed_out",
+            "gauge",
+            "1 while the heartbeat is timed out",
+            int(timed_out),
+            hb_labels,
+        )
+        builder.add(
+            "heartbeat_missed_total",
+            "counter",
+            "Pings skipped according to the ping sequence",
+            missed,
+            hb_labels,
+        )
+
+    # one gauge per state so absent series never hide a cleared state
+    for key, entry_key, code in snapshot.entries:
+        for state in State:
+            builder.add(
+                "monitor_entry_state",
+                "gauge",
+                "1 while a monitor entry is in a state",
+                int(bool(code & state.code)),
+                {**labels, "monitor": key, "entry": entry_key, "state": str(state)},
+            )
+
+    for seat, code in snapshot.wdlms:
+        builder.add(
+            "wdlm_state",
+            "gauge",
+            "State code of a wdlm seat, see State",
+            code,
+            {**labels, "seat": seat},
+        )
+
+
+def collect_latency(builder: MetricsBuilder, latency: LatencyTracker) -> None:
+    """Pipeline latencies as summaries over the rolling window"""
+    snapshot = latency.snapshot()
+    for group, label in (("stages", "stage"), ("commands", "cmd")):
+        name = f"pipeline_{label}_latency_seconds"
+        help = f"Sampled pipeline latency by {label}"
+        builder.add(name, "summary", help, None)
+        for key, stats in snapshot[group].items():
+            for quantile, field in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+                builder.add(
+                    name,
+                    "summary",
+                    help,
+                    stats[field],
+                    {label: key, "quantile": quantile},
+                )
+            builder.add(name, "summary", help, stats["count"], {label: key}, "_count")
+
+
+def collect_counts(
+    builder: MetricsBuilder,
+    name: str,
+    help: str,
+    label: str,
+    counts: Dict[str, int],
+) -> None:
+    """A counter family from a dict such as messages by topic"""
+    builder.add(name, "counter", help, None)
+    for key, count in list(counts.items()):
+        builder.add(name, "counter", help, count, {label: key})
+
+
+# ==================================================
+# Exporter
+# ==================================================
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.payload
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        # scrapes are routine, keep them out of the logs
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    payload = b""
+
+
+class MetricsExporter:
+    """
+    Serves /metrics in the Prometheus text format from background threads.
+    A refresh thread runs the collectors every interval seconds and keeps
+    the rendered text, scrapes only return those bytes, so how often the
+    endpoint is scraped never touches the engine or its lock.
+    Binds to localhost unless told otherwise.
+    """
+
+    def __init__(
+        self,
+        port: int,
+        collectors: Iterable[Collector],
+        host: str = DEFAULT_METRICS_HOST,
+        interval: float = METRICS_INTERVAL,
+    ) -> None:
+        self._collectors = list(collectors)
+        self._interval = interval
+        self._stop = threading.Event()
+
+        self._server = _Server((host, port), _Handler)
+        self.refresh()
+
+        self._threads = [
+            threading.Thread(
+                target=self._server.serve_forever, name="metrics-http", daemon=True
+            ),
+            threading.Thread(target=self._run, name="metrics-refresh", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """Host and port bound, the port is picked by the OS when given 0"""
+        return self._server.server_address[:2]
+
+    def refresh(self) -> None:
+        """Run the collectors now and publish the result"""
+        builder = MetricsBuilder()
+        for collect in self._collectors:
+            try:
+                collect(builder)
+            except Exception as e:
+                logger.warning(f"failed collecting metrics: {str(e)}")
+        self._server.payload = builder.text().encode()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            self.refresh()
+
+    def close(self) -> None:
+        self._stop.set()
+        self._server.shutdown()
+        self._server.server_close()
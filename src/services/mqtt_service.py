@@ -1,19 +1,21 @@
 import logging
-from typing import Set
+from typing import TYPE_CHECKING, Iterable, Optional, Set
 
-import paho.mqtt.client as mqtt
-from PyQt6.QtCore import QThread, pyqtSignal
+from PyQt6.QtCore import QThread, QTimer, pyqtSignal
 
 from src.config import MqttConfig
-from src.constants import MQTT_LOG
+from src.constants import MESSAGE_LOG_POLL
+from src.services.capture import CaptureWriter
+from src.services.ingest import MessageIntake
+from src.utils.latency import LatencyTracker
+from src.utils.topics import Handler, TopicRouter
+
+if TYPE_CHECKING:
+    import paho.mqtt.client as mqtt
+
+    from src.services.metrics import MetricsBuilder
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
 logger = logging.getLogger(__name__)
-fh = logging.FileHandler(MQTT_LOG)
-logger.addHandler(fh)
 
 
 class MqttService(QThread):
@@ -32,18 +34,40 @@ class MqttService(QThread):
         # config
         self.config = MqttConfig()
 
-        # mqtt client
-        self.client = mqtt.Client()
-        self.client.on_connect = self._on_connect
-        self.client.on_message = self._on_message
-        self.client.on_disconnect = self._on_disconnect
-        self.client.on_connect_fail = self._on_connect_fail
+        # mqtt client, created with paho's import on first use, see client
+        self._client: Optional["mqtt.Client"] = None
+
+        # counts, logs, records and routes every message on the mqtt thread,
+        # handlers are called with (topic, payload), see set_capture and
+        # set_latency for the raw traffic recorder and receive latency
+        self._intake = MessageIntake(TopicRouter(), logger)
+        self._reconnects = 0
+        self._message_log_timer = QTimer(self)
+        self._message_log_timer.timeout.connect(self._intake.update_log)
+        self._message_log_timer.start(int(MESSAGE_LOG_POLL * 1000))
+
+        # connection state, set from the paho callbacks
+        self.connected = False
 
         # retries
         self._retry_attempt = 0
         self._should_retry = False
         self._attempt_retry_signal.connect(self._retry)
 
+    @property
+    def client(self) -> "mqtt.Client":
+        """The paho client, paho is only imported once something connects."""
+        if self._client is None:
+            import paho.mqtt.client as mqtt
+
+            client = mqtt.Client()
+            client.on_connect = self._on_connect
+            client.on_message = self._on_message
+            client.on_disconnect = self._on_disconnect
+            client.on_connect_fail = self._on_connect_fail
+            self._client = client
+        return self._client
+
     @property
     def retry_attempt(self) -> int:
         """Current number of connection retry attempts."""
@@ -54,6 +78,67 @@ class MqttService(QThread):
         """Maximum number of retry attempts from config."""
         return self.config.retry_limit
 
+    @property
+    def received(self) -> int:
+        """Messages received since start."""
+        return self._intake.received
+
+    @property
+    def reconnects(self) -> int:
+        """Reconnection attempts made since start."""
+        return self._reconnects
+
+    @property
+    def router(self) -> TopicRouter:
+        """Topic router dispatching raw messages to handlers."""
+        return self._intake.router
+
+    def set_capture(self, capture: Optional[CaptureWriter]) -> None:
+        """Record every received message to a capture file, None to stop."""
+        self._intake.set_capture(capture)
+
+    def set_latency(self, latency: Optional[LatencyTracker]) -> None:
+        """Record paho's receive latency into a tracker, None to stop."""
+        self._intake.set_latency(latency)
+
+    def collect_metrics(self, builder: "MetricsBuilder") -> None:
+        """Message and connection metrics, safe to call from any thread."""
+        from src.services.metrics import collect_counts
+
+        collect_counts(
+            builder,
+            "messages_received_total",
+            "Messages received by topic",
+            "topic",
+            self._intake.topic_counts,
+        )
+        builder.add(
+            "mqtt_reconnects_total",
+            "counter",
+            "Reconnection attempts after a failed or lost connection",
+            self._reconnects,
+        )
+        builder.add(
+            "mqtt_connected",
+            "gauge",
+            "1 while connected to the broker",
+            int(self.connected),
+        )
+
+    def add_message_handler(
+        self,
+        handler: Handler,
+        patterns: Optional[Iterable[str]] = None,
+    ) -> None:
+        """
+        Handle raw messages on the mqtt thread, handler must be thread safe.
+        Registered on the configured subscriptions unless patterns are given.
+        """
+        if patterns is None:
+            patterns = self.config.subscriptions
+        for pattern in patterns:
+            self._intake.router.add(pattern, handler)
+
     def run(self):
         """Start MQTT connection and event loop."""
         self._should_retry = True
@@ -61,8 +146,10 @@ class MqttService(QThread):
 
     def stop(self):
         """Stop loop, disconnect from broker, and quit thread"""
-        self.client.loop_stop()
-        self.client.disconnect()
+        if self._client is not None:
+            self._client.loop_stop()
+            self._client.disconnect()
+        self._intake.flush_log()
         self.quit()
 
     def cancel(self):
@@ -96,6 +183,7 @@ class MqttService(QThread):
 
         # Increment num retries
         self._retry_attempt += 1
+        self._reconnects += 1
         logger.info(f"retries left: {self._retry_attempt} / {self.config.retry_limit}")
         self.retries_signal.emit(self._retry_attempt)
 
@@ -119,9 +207,9 @@ class MqttService(QThread):
 
     def _on_connect(
         self,
-        client: mqtt.Client,
+        client: "mqtt.Client",
         userdata: Set,
-        flags: mqtt.ConnectFlags,
+        flags: "mqtt.ConnectFlags",
         rc: int,
     ):
         self.connected = True
@@ -137,7 +225,7 @@ class MqttService(QThread):
 
     def _on_connect_fail(
         self,
-        client: mqtt.Client,
+        client: "mqtt.Client",
         userdata: Set,
         rc: int,
     ):
@@ -152,7 +240,7 @@ class MqttService(QThread):
 
     def _on_disconnect(
         self,
-        client: mqtt.Client,
+        client: "mqtt.Client",
         userdata: Set,
         rc: int,
     ):
@@ -169,9 +257,12 @@ class MqttService(QThread):
 
     def _on_message(
         self,
-        client: mqtt.Client,
+        client: "mqtt.Client",
         userdata: Set,
-        msg: mqtt.MQTTMessage,
+        msg: "mqtt.MQTTMessage",
     ):
-        logger.info(f"received message on {msg.topic} from {self.config.host}")
-        self.message_signal.emit(client, userdata, msg)
+        self._intake.receive(msg.topic, msg.payload, msg.timestamp)
+
+        # Only bounce the raw message to the GUI thread if someone listens
+        if self.receivers(self.message_signal) > 0:
+            self.message_signal.emit(client, userdata, msg)
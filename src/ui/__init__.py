@@ -1,5 +1,13 @@
-from .main_window import MainWindow
-
 __all__ = [
-    MainWindow,
+    "MainWindow",
 ]
+
+
+def __getattr__(name: str):
+    # the window pulls in every widget, import it on demand so importing a
+    # single widget module stays cheap
+    if name == "MainWindow":
+        from .main_window import MainWindow
+
+        return MainWindow
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
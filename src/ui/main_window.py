@@ -1,12 +1,14 @@
-import json
-from typing import List, Optional, Set
+import time
+from functools import partial
+from typing import TYPE_CHECKING, Dict, Optional, Set
 
-import paho.mqtt.client as mqtt
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtGui import QAction
 from PyQt6.QtWidgets import (
     QDockWidget,
+    QFileDialog,
     QFrame,
+    QLabel,
     QMainWindow,
     QMessageBox,
     QStatusBar,
@@ -15,40 +17,61 @@ from PyQt6.QtWidgets import (
     QWidget,
 )
 
-from src.services.health_service import HealthService
+from src.constants import DEFAULT_REFRESH_RATE
+from src.models.delta import HealthDelta
+from src.models.monitor import Monitor
+from src.services.health_adapter import HealthAdapter
 from src.services.mqtt_service import MqttService
-from src.ui.widgets.heartbeat_widget import HeartbeatWidget
-from src.ui.widgets.monitor_widget import MonitorWidget
+from src.ui.widgets.lazy_widget import LazyWidget
 from src.ui.widgets.mqtt_widget import MqttWidget
-from src.ui.widgets.scroll_widget import ScrollWidget
-from src.ui.widgets.wdlms_widget import WdlmsWidget
+from src.utils.latency import STAGE_RENDER, STAGES
+
+if TYPE_CHECKING:
+    import paho.mqtt.client as mqtt
+
+    from src.ui.widgets.heartbeat_widget import HeartbeatWidget
+    from src.ui.widgets.monitor_widget import MonitorWidget
+    from src.ui.widgets.wdlms_widget import WdlmsWidget
 
 
 class MainWindow(QMainWindow):
     def __init__(
         self,
         mqtt_service: MqttService,
-        health_service: HealthService,
+        health_adapter: HealthAdapter,
         parent: Optional[QWidget] = None,
         flags: Qt.WindowType = Qt.WindowType.Window,
+        refresh_rate: int = DEFAULT_REFRESH_RATE,
     ) -> None:
         super().__init__(parent, flags)
         self.setMinimumSize(800, 600)
 
         self._mqtt_service = mqtt_service
-        self.health_service = health_service
+        self.health_adapter = health_adapter
+        self.health_service = health_adapter.health_service
+
+        # Messages are absorbed as they arrive, the UI renders at most once a frame
+        self._frame_timer = QTimer(self)
+        self._frame_timer.setSingleShot(True)
+        self._frame_timer.setInterval(max(1, 1000 // max(1, refresh_rate)))
+        self._frame_timer.timeout.connect(self.render_frame)
 
         self.init_menu()
         self.init_status()
         self.init_tool()
         self.init_ui()
 
-        self._mqtt_service.message_signal.connect(self.handle_message)
+        # Decoding and evaluation run on the mqtt thread, the GUI draws frames
+        self._mqtt_service.add_message_handler(self.health_adapter.handle_payload)
+        self._mqtt_service.set_latency(self.health_adapter.latency)
+        self.health_adapter.frame_signal.connect(self.schedule_frame)
 
     def init_menu(self):
         self.menu = self.menuBar()
 
         self.file_menu = self.menu.addMenu("File")
+        latency_action = self.file_menu.addAction("Save Latency Stats...")
+        latency_action.triggered.connect(self.save_latency)
         exit_action = self.file_menu.addAction("Exit")
         exit_action.triggered.connect(self.close)
 
@@ -59,6 +82,15 @@ class MainWindow(QMainWindow):
         self.status = QStatusBar()
         self.setStatusBar(self.status)
 
+        # Messages folded into the last rendered frame
+        self._frame_label = QLabel("0 msgs/frame")
+        self.status.addPermanentWidget(self._frame_label)
+
+        # Pipeline latencies in the frame label tooltip, refreshed once a second
+        self._diagnostics_timer = QTimer(self)
+        self._diagnostics_timer.timeout.connect(self.update_diagnostics)
+        self._diagnostics_timer.start(1000)
+
     def init_tool(self):
         self.tool = QToolBar()
         self.tool.setObjectName("mqttToolBar")
@@ -67,10 +99,13 @@ class MainWindow(QMainWindow):
     def init_ui(self):
         self._init_document_area()
 
+        # Only the shell is built here, dock and tab contents are built when
+        # first shown and the heartbeat bar right after the first paint
         self._init_monitors()
-        self._init_heartbeats()
         self._init_wdlms()
         self._init_mqtt()
+        self._heartbeat_widgets: Dict[str, "HeartbeatWidget"] = {}
+        QTimer.singleShot(0, self._init_heartbeats)
 
         self.setCentralWidget(self.document_tabs)
 
@@ -108,10 +143,12 @@ class MainWindow(QMainWindow):
                 action.setChecked(False)
                 action.blockSignals(False)
 
-    def create_tab_toggle_action(self, name: str, widget: QWidget) -> QAction:
+    def create_tab_toggle_action(
+        self, name: str, widget: QWidget, checked: bool = True
+    ) -> QAction:
         action = QAction(name, self)
         action.setCheckable(True)
-        action.setChecked(True)  # initially visible
+        action.setChecked(checked)  # initially visible unless hidden
 
         def toggled(checked: bool):
             if checked:
@@ -133,18 +170,18 @@ class MainWindow(QMainWindow):
     # ========================
 
     def _init_monitors(self):
-        # Create dock widgets for each monitor
-        self.monitor_widgets: List[MonitorWidget] = []
+        # Create dock widgets for each monitor, filled in when first shown
+        self.monitor_widgets: Dict[str, "MonitorWidget"] = {}
         for key, monitor in self.health_service.monitors.items():
-            monitor_widget = MonitorWidget(monitor)
-            self.monitor_widgets.append(monitor_widget)
-            monitor_scroll = ScrollWidget()
-            monitor_scroll.addWidget(monitor_widget)
+            monitor_scroll = LazyWidget(partial(self._build_monitor, key, monitor))
 
             position = monitor.dock.lower()
             if position == "center":
-                self.add_document(monitor_scroll, monitor.name)
-                action = self.create_tab_toggle_action(monitor.name, monitor_scroll)
+                if not monitor.hidden:
+                    self.add_document(monitor_scroll, monitor.name)
+                action = self.create_tab_toggle_action(
+                    monitor.name, monitor_scroll, not monitor.hidden
+                )
                 self.view_menu.addAction(action)
                 self._view_actions[key] = action
                 continue
@@ -171,20 +208,34 @@ class MainWindow(QMainWindow):
             elif position == "bottom":
                 self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, dock)
 
+            if monitor.hidden:
+                dock.hide()
+
+    def _build_monitor(self, key: str, monitor: Monitor) -> QWidget:
+        from src.ui.widgets.monitor_widget import MonitorWidget
+        from src.ui.widgets.scroll_widget import ScrollWidget
+
+        monitor_widget = MonitorWidget(monitor)
+        self.monitor_widgets[key] = monitor_widget
+        monitor_scroll = ScrollWidget()
+        monitor_scroll.addWidget(monitor_widget)
+        return monitor_scroll
+
     def _init_heartbeats(self):
-        self._heartbeat_widgets: List[HeartbeatWidget] = []
+        from src.ui.widgets.heartbeat_widget import HeartbeatWidget
+
         hb_items = list(self.health_service.heartbeats.items())
         separator = QFrame()
 
         for idx, (key, heartbeat) in enumerate(hb_items):
-            heartbeat_widget = HeartbeatWidget(heartbeat)
+            heartbeat_widget = HeartbeatWidget(key, heartbeat, self.health_adapter)
             self._mqtt_service.connect_fail_signal.connect(
                 lambda: heartbeat_widget.reset()
             )
             self._mqtt_service.disconnect_signal.connect(
                 lambda: heartbeat_widget.reset()
             )
-            self._heartbeat_widgets.append(heartbeat_widget)
+            self._heartbeat_widgets[key] = heartbeat_widget
             self.status.addWidget(heartbeat_widget)
 
             # Separator, only between widgets
@@ -195,12 +246,10 @@ class MainWindow(QMainWindow):
                 self.status.addWidget(separator)
 
     def _init_wdlms(self):
-        self._wdlms_widget = WdlmsWidget(self.health_service.wdlms)
+        self._wdlms_widget: Optional["WdlmsWidget"] = None
         position = self.health_service.wdlms.dock.lower()
-        wdlm_scroll = ScrollWidget()
-        wdlm_scroll.addWidget(self._wdlms_widget)
         dock = QDockWidget(self.health_service.wdlms.name, self)
-        dock.setWidget(wdlm_scroll)
+        dock.setWidget(LazyWidget(self._build_wdlms))
         dock.setObjectName("wdlmDockWidget")
         dock.setFeatures(
             QDockWidget.DockWidgetFeature.DockWidgetMovable
@@ -220,6 +269,12 @@ class MainWindow(QMainWindow):
         elif position == "bottom":
             self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, dock)
 
+    def _build_wdlms(self) -> QWidget:
+        from src.ui.widgets.wdlms_widget import WdlmsWidget
+
+        self._wdlms_widget = WdlmsWidget(self.health_service.wdlms)
+        return self._wdlms_widget
+
     # ========================
     # MQTT Service Widgets
     # ========================
@@ -239,18 +294,67 @@ class MainWindow(QMainWindow):
 
     def handle_message(
         self,
-        client: mqtt.Client,
+        client: "mqtt.Client",
         userdata: Set,
-        mqtt_msg: mqtt.MQTTMessage,
+        mqtt_msg: "mqtt.MQTTMessage",
     ):
-        msg: dict = json.loads(mqtt_msg.payload.decode("utf-8"))
-        if "ppss/health" in mqtt_msg.topic.lower():
-            try:
-                self.health_service.process_message(msg)
-            except Exception as e:
-                print(str(e))
-
-        for widget in self.monitor_widgets:
-            widget.update_all()
+        """Route a message on the GUI thread, it renders with the next frame"""
+        self._mqtt_service.router.route(mqtt_msg.topic, mqtt_msg.payload)
+
+    def schedule_frame(self) -> None:
+        """Render the pending changes once the current frame interval passes"""
+        if not self._frame_timer.isActive():
+            self._frame_timer.start()
+
+    def render_frame(self) -> None:
+        """Render everything folded since the last frame at once"""
+        start = time.perf_counter()
+        delta, messages = self.health_adapter.take_delta()
+        self._frame_label.setText(f"{messages} msgs/frame")
+        self.render_delta(delta)
+        self.health_adapter.latency.record(STAGE_RENDER, time.perf_counter() - start)
+
+    def update_diagnostics(self) -> None:
+        """Show p50/p99 of every pipeline stage in the frame label tooltip"""
+        snapshot = self.health_adapter.latency.snapshot()
+        lines = [f"Latency, 1 in {snapshot['sample_every']} messages timed"]
+        for stage in STAGES:
+            stats = snapshot["stages"][stage]
+            if stats["count"]:
+                lines.append(
+                    f"{stage}: p50 {stats['p50'] * 1e6:.0f}us "
+                    f"p99 {stats['p99'] * 1e6:.0f}us ({stats['count']})"
+                )
+            else:
+                lines.append(f"{stage}: -")
+        self._frame_label.setToolTip("\n".join(lines))
 
-        self._wdlms_widget.update_all()
+    def save_latency(self) -> None:
+        """Dump the pipeline latency snapshot to a JSON file"""
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Save Latency Stats", "latency.json", "JSON (*.json)"
+        )
+        if not path:
+            return
+        try:
+            self.health_adapter.latency.dump(path)
+        except OSError as e:
+            QMessageBox.warning(self, "Save Latency Stats", str(e))
+
+    def render_delta(self, delta: HealthDelta) -> None:
+        """
+        Repaint only the monitor entries and wdlm rows that changed.
+        Widgets not built yet are skipped, they read the current state once built.
+        """
+        for key, changes in delta.monitors.items():
+            monitor_widget = self.monitor_widgets.get(key)
+            if monitor_widget is not None:
+                monitor_widget.update_entries(changes)
+
+        if delta.wdlms and self._wdlms_widget is not None:
+            self._wdlms_widget.update_rows(delta.wdlms)
+
+        for key in delta.heartbeats:
+            heartbeat_widget = self._heartbeat_widgets.get(key)
+            if heartbeat_widget is not None:
+                heartbeat_widget.refresh(0.0)
@@ -2,51 +2,97 @@ from PyQt6.QtCore import Qt
 from PyQt6.QtWidgets import QHBoxLayout, QLabel, QWidget
 
 from src.models.heartbeat import Heartbeat
+from src.services.health_adapter import HealthAdapter
 
 
 class HeartbeatWidget(QWidget):
-    def __init__(self, heartbeat: Heartbeat, parent: QWidget | None = None):
+    def __init__(
+        self,
+        key: str,
+        heartbeat: Heartbeat,
+        health_adapter: HealthAdapter,
+        parent: QWidget | None = None,
+    ):
         super().__init__(parent)
 
+        self._key = key
         self._hb = heartbeat
+        self._health_adapter = health_adapter
 
         # Status label showing num retries or timeout
         self._status_label = QLabel()
         self._status_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
+        # Stats label showing the average interval, full statistics on hover
+        self._stats_label = QLabel()
+        self._stats_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+
         # Layout
         layout = QHBoxLayout()
         layout.setContentsMargins(4, 4, 4, 4)
         layout.setSpacing(8)
         layout.addWidget(QLabel(heartbeat.name))
         layout.addWidget(self._status_label)
+        layout.addWidget(self._stats_label)
         self.setLayout(layout)
 
         # Connect signals
-        heartbeat.tick_signal.connect(self._on_tick)
-        heartbeat.timeout_signal.connect(self._on_timeout)
+        health_adapter.tick_signal.connect(self._on_tick)
+        health_adapter.timeout_signal.connect(self._on_timeout)
 
         # Show initial state
         self._update_status_label(0)
+        self._update_stats_label()
 
     def reset(self):
         """Reset the timer"""
-        self._hb.reset()
+        self._health_adapter.reset_heartbeat(self._key)
 
-    def _on_tick(self, elapsed):
-        """Updates status label with elapsed time. Connect to on_tick."""
+    def refresh(self, elapsed: float) -> None:
+        """Show a new elapsed time, such as 0 after a ping"""
         self._update_status_label(elapsed)
+        self._update_stats_label()
+
+    def _on_tick(self, key: str, elapsed: float):
+        """Updates status label with elapsed time. Connect to tick_signal."""
+        if key == self._key:
+            self._update_status_label(elapsed)
 
-    def _on_timeout(self):
-        """Updates status label to timeout message. Connect to on_timeout."""
-        self._status_label.setText("❌ Heartbeat timed out")
+    def _on_timeout(self, key: str):
+        """Updates status label to timeout message. Connect to timeout_signal."""
+        if key == self._key:
+            if self._hb.suspected:
+                self._status_label.setText("❌ Heartbeat overdue, suspected down")
+            else:
+                self._status_label.setText("❌ Heartbeat timed out")
 
     def _update_status_label(self, elapsed):
         """Updates the status label with new time and number of retries left."""
-        time_max = self._hb._time_max
-        retries = self._hb._retry_attempt
-        retries_max = self._hb._retry_limit
+        time_max = self._hb.time_limit
+        retries = self._hb.retry_attempt
+        retries_max = self._hb.retry_limit
 
         self._status_label.setText(
-            f"{elapsed}s / {time_max}s     {retries}/{retries_max} retries"
+            f"{elapsed:.1f}s / {time_max}s     {retries}/{retries_max} retries"
+        )
+
+    def _update_stats_label(self):
+        """Updates the average interval and the statistics tooltip."""
+        stats = self._health_adapter.heartbeat_stats(self._key)
+        if stats["ewma"] is None:
+            self._stats_label.setText("avg -")
+        else:
+            self._stats_label.setText(f"avg {stats['ewma']:.1f}s")
+
+        def seconds(value):
+            return "-" if value is None else f"{value:.3f}s"
+
+        self._stats_label.setToolTip(
+            f"Intervals: {stats['count']}\n"
+            f"Average: {seconds(stats['ewma'])}\n"
+            f"Min / max: {seconds(stats['min'])} / {seconds(stats['max'])}\n"
+            f"p50 / p95 / p99: {seconds(stats['p50'])} / {seconds(stats['p95'])}"
+            f" / {seconds(stats['p99'])}\n"
+            f"Missed: {stats['missed']}\n"
+            f"Out of order: {stats['out_of_order']}"
         )
@@ -0,0 +1,46 @@
+from typing import Callable, Optional
+
+from PyQt6.QtCore import QTimer
+from PyQt6.QtGui import QShowEvent
+from PyQt6.QtWidgets import QVBoxLayout, QWidget
+
+
+class LazyWidget(QWidget):
+    """
+    Placeholder that builds its content the first time it is shown.
+    Docks and tabs that start hidden or behind another tab cost nothing until
+    opened, visible ones are filled in right after the window's first paint.
+    """
+
+    def __init__(
+        self,
+        build: Callable[[], QWidget],
+        parent: Optional[QWidget] = None,
+    ) -> None:
+        super().__init__(parent)
+        self._build = build
+        self._widget: Optional[QWidget] = None
+        self._scheduled = False
+
+        self._layout = QVBoxLayout()
+        self._layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(self._layout)
+
+    @property
+    def widget(self) -> Optional[QWidget]:
+        """The built content, None until first shown"""
+        return self._widget
+
+    def showEvent(self, event: QShowEvent) -> None:
+        super().showEvent(event)
+        if self._widget is None and not self._scheduled:
+            # queued behind the pending paint, the empty shell draws first
+            self._scheduled = True
+            QTimer.singleShot(0, self.ensure_built)
+
+    def ensure_built(self) -> QWidget:
+        """Build the content now if it was not built yet"""
+        if self._widget is None:
+            self._widget = self._build()
+            self._layout.addWidget(self._widget)
+        return self._widget
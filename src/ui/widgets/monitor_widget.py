@@ -1,9 +1,10 @@
-from typing import Dict, Optional
+from typing import Dict, FrozenSet, Mapping, Optional
 
 from PyQt6.QtCore import Qt
 from PyQt6.QtWidgets import QHBoxLayout, QLabel, QVBoxLayout, QWidget
 
 from src.models.monitor import Monitor, MonitorEntry
+from src.models.state import State
 from src.utils.ui import clear_layout
 
 
@@ -48,10 +49,13 @@ class MonitorEntryWidget(QWidget):
         self._entry = value
         self._entry_label.setText(value.name)
 
-    def update_states(self) -> None:
-        """Update states layout from self._entries"""
+    def update_states(self, states: Optional[FrozenSet[State]] = None) -> None:
+        """Update states layout from the given states or self._entry"""
+        if states is None:
+            states = self._entry.states
+
         clear_layout(self._states_layout)
-        for state in self._entry.states:
+        for state in states:
             state_label = QLabel(state.value)
             state_label.setStyleSheet(f"color: {state.color()};")
             self._states_layout.addWidget(state_label)
@@ -85,3 +89,10 @@ class MonitorWidget(QWidget):
         """Update states on all entries"""
         for entry_widget in self._entry_lookup.values():
             entry_widget.update_states()
+
+    def update_entries(self, changes: Mapping[str, FrozenSet[State]]) -> None:
+        """Update states only on the entries that changed"""
+        for key, states in changes.items():
+            entry_widget = self._entry_lookup.get(key)
+            if entry_widget is not None:
+                entry_widget.update_states(states)
@@ -1,10 +1,12 @@
-from typing import Optional, Set
+from typing import TYPE_CHECKING, Optional, Set
 
-import paho.mqtt.client as mqtt
 from PyQt6.QtWidgets import QHBoxLayout, QLabel, QPushButton, QWidget
 
 from src.services.mqtt_service import MqttService
 
+if TYPE_CHECKING:
+    import paho.mqtt.client as mqtt
+
 
 class MqttWidget(QWidget):
     def __init__(self, mqtt_service: MqttService, parent: Optional[QWidget] = None):
@@ -85,17 +87,17 @@ class MqttWidget(QWidget):
 
     def handle_connect(
         self,
-        client: mqtt.Client,
+        client: "mqtt.Client",
         userdata: Set,
-        flags: mqtt.ConnectFlags,
-        rc: mqtt.ReasonCode,
+        flags: "mqtt.ConnectFlags",
+        rc: "mqtt.ReasonCode",
     ):
         """Handle successful connection."""
         self._status_connected()
 
     def handle_connect_fail(
         self,
-        client: mqtt.Client,
+        client: "mqtt.Client",
         userdata: Set,
         rc: int,
     ):
@@ -108,7 +110,7 @@ class MqttWidget(QWidget):
 
     def handle_disconnect(
         self,
-        client: mqtt.Client,
+        client: "mqtt.Client",
         userdata: Set,
         rc: int,
     ):
@@ -1,39 +1,106 @@
-from typing import Optional
+from typing import Any, Mapping, Optional
 
-from PyQt6.QtCore import Qt
-from PyQt6.QtWidgets import QHBoxLayout, QLabel, QVBoxLayout, QWidget
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, QObject, Qt
+from PyQt6.QtGui import QColor
+from PyQt6.QtWidgets import (
+    QAbstractItemView,
+    QHeaderView,
+    QTableView,
+    QVBoxLayout,
+    QWidget,
+)
 
-from src.models.wdlms import WdlmEntry, Wdlms
-from src.utils.ui import clear_layout
+from src.models.state import State
+from src.models.wdlms import Wdlms
 
 
-class WdlmEntryWidget(QWidget):
-    def __init__(
-        self,
-        wdlm_entry: WdlmEntry,
-        color: str,
-        parent: Optional[QWidget] = None,
-    ):
+class WdlmsModel(QAbstractTableModel):
+    NAME_COLUMN = 0
+    STATE_COLUMN = 1
+    HEADERS = ("WDLM", "State")
+
+    def __init__(self, wdlms: Wdlms, parent: Optional[QObject] = None):
         super().__init__(parent)
-        self._wdlm_entry = wdlm_entry
-        self._color = color
+        self._wdlms = wdlms
+        self._color = QColor(wdlms.color)
+        self._state_colors = {state: QColor(state.color()) for state in State}
 
-        # Name
-        self._name_label = QLabel(wdlm_entry.name)
-        self._name_label.setStyleSheet(f"color: {color};")
-        self._name_label.setAlignment(Qt.AlignmentFlag.AlignLeft)
+        # Rows are mirrored from deltas, the engine may be ahead on another thread
+        self._count = wdlms.count
+        self._bits = wdlms.bits
 
-        # State
-        self._state_label = QLabel(wdlm_entry.state.value)
-        self._state_label.setStyleSheet(f"color: {wdlm_entry.state.color()};")
-        self._state_label.setAlignment(Qt.AlignmentFlag.AlignRight)
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return self._count
 
-        # Layout
-        self._main_layout = QHBoxLayout()
-        self._main_layout.setContentsMargins(0, 0, 0, 0)
-        self._main_layout.addWidget(self._name_label)
-        self._main_layout.addWidget(self._state_label)
-        self.setLayout(self._main_layout)
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self.HEADERS)
+
+    def headerData(
+        self,
+        section: int,
+        orientation: Qt.Orientation,
+        role: int = Qt.ItemDataRole.DisplayRole,
+    ) -> Any:
+        if (
+            role == Qt.ItemDataRole.DisplayRole
+            and orientation == Qt.Orientation.Horizontal
+        ):
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+
+        row = index.row()
+        column = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == self.NAME_COLUMN:
+                return self._wdlms.row_name(row)
+            return self._state(row).value
+        if role == Qt.ItemDataRole.ForegroundRole:
+            if column == self.NAME_COLUMN:
+                return self._color
+            return self._state_colors[self._state(row)]
+        if role == Qt.ItemDataRole.TextAlignmentRole and column == self.STATE_COLUMN:
+            return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        return None
+
+    def _state(self, row: int) -> State:
+        return State.TALKING if (self._bits >> row) & 1 else State.NOT_TALKING
+
+    def reset(self) -> None:
+        """Reload every row from the wdlms"""
+        self.beginResetModel()
+        self._count = self._wdlms.count
+        self._bits = self._wdlms.bits
+        self.endResetModel()
+
+    def update_rows(self, changes: Mapping[int, State]) -> None:
+        """Insert rows for new seats and emit one dataChanged for the changed span"""
+        if not changes:
+            return
+
+        for row, state in changes.items():
+            if state == State.TALKING:
+                self._bits |= 1 << row
+            else:
+                self._bits &= ~(1 << row)
+
+        # New seats are always part of the changes
+        count = max(changes) + 1
+        if count > self._count:
+            self.beginInsertRows(QModelIndex(), self._count, count - 1)
+            self._count = count
+            self.endInsertRows()
+
+        top = self.index(min(changes), self.STATE_COLUMN)
+        bottom = self.index(max(changes), self.STATE_COLUMN)
+        self.dataChanged.emit(top, bottom)
 
 
 class WdlmsWidget(QWidget):
@@ -44,21 +111,36 @@ class WdlmsWidget(QWidget):
     ):
         super().__init__(parent)
         self._wdlms = wdlms
+        self._model = WdlmsModel(wdlms, self)
+
+        # Table view, fixed row heights keep thousands of seats cheap to lay out
+        self._view = QTableView()
+        self._view.setModel(self._model)
+        self._view.setShowGrid(False)
+        self._view.setWordWrap(False)
+        self._view.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self._view.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self._view.verticalHeader().setVisible(False)
+        self._view.verticalHeader().setSectionResizeMode(
+            QHeaderView.ResizeMode.Fixed
+        )
+        self._view.horizontalHeader().setSectionResizeMode(
+            QHeaderView.ResizeMode.Stretch
+        )
 
         # Layout
         self._main_layout = QVBoxLayout()
         self._main_layout.setContentsMargins(8, 8, 8, 8)
-        self._main_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
-        self._main_layout.setSpacing(8)
-
-        for key, entry in wdlms.entries.items():
-            entry_widget = WdlmEntryWidget(entry, wdlms.color)
-            self._main_layout.addWidget(entry_widget)
-
+        self._main_layout.addWidget(self._view)
         self.setLayout(self._main_layout)
 
+    @property
+    def model(self) -> WdlmsModel:
+        return self._model
+
     def update_all(self):
-        clear_layout(self._main_layout)
-        for key, entry in self._wdlms.entries.items():
-            entry_widget = WdlmEntryWidget(entry, self._wdlms.color)
-            self._main_layout.addWidget(entry_widget)
+        self._model.reset()
+
+    def update_rows(self, changes: Mapping[int, State]) -> None:
+        """Update only the rows that changed, adding rows for new seats"""
+        self._model.update_rows(changes)
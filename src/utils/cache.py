@@ -0,0 +1,94 @@
+import hashlib
+import io
+import logging
+import os
+import pickle
+from pathlib import Path
+from typing import Callable, Optional, Tuple, TypeVar, Union
+
+from src.constants import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# version, source mtime in ns, source size, source sha256
+CacheKey = Tuple[int, int, int, str]
+
+
+def _cache_path(source: Path, cache_dir: Path) -> Path:
+    """One cache file per source path, named after the source"""
+    tag = hashlib.sha1(str(source.resolve()).encode()).hexdigest()[:8]
+    return cache_dir / f"{source.stem}-{tag}.pickle"
+
+
+def _read(path: Path) -> Optional[Tuple[CacheKey, bytes]]:
+    """Key and the still pickled value of a cache file, None if unusable"""
+    try:
+        data = path.read_bytes()
+        stream = io.BytesIO(data)
+        key = pickle.load(stream)
+        return key, data[stream.tell() :]
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"ignoring unreadable cache {path}: {str(e)}")
+        return None
+
+
+def _write(path: Path, key: CacheKey, value: bytes) -> None:
+    """Replace the cache file in one step, a reader never sees half of it"""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(key, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.write(value)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning(f"failed writing cache {path}: {str(e)}")
+
+
+def load_compiled(
+    source: Union[str, Path],
+    compile: Callable[[bytes], T],
+    version: int,
+    cache_dir: Union[str, Path] = CACHE_DIR,
+) -> T:
+    """
+    compile(source bytes), cached on disk in cache_dir.
+    A cache whose mtime and size match the source is loaded with one read
+    and never looks at the source. Otherwise the source is hashed, a touched
+    but unchanged file still hits and only refreshes the key. Bump version
+    whenever the compiled form changes shape, older caches are rebuilt.
+    """
+    source = Path(source)
+    path = _cache_path(source, Path(cache_dir))
+    stat = source.stat()
+
+    cached = _read(path)
+    if cached is not None:
+        key, value = cached
+        if key[:3] == (version, stat.st_mtime_ns, stat.st_size):
+            try:
+                return pickle.loads(value)
+            except Exception as e:
+                logger.warning(f"ignoring unreadable cache {path}: {str(e)}")
+                cached = None
+
+    raw = source.read_bytes()
+    digest = hashlib.sha256(raw).hexdigest()
+    key = (version, stat.st_mtime_ns, stat.st_size, digest)
+
+    if cached is not None and cached[0][0] == version and cached[0][3] == digest:
+        try:
+            compiled = pickle.loads(cached[1])
+        except Exception:
+            pass
+        else:
+            _write(path, key, cached[1])
+            return compiled
+
+    compiled = compile(raw)
+    _write(path, key, pickle.dumps(compiled, protocol=pickle.HIGHEST_PROTOCOL))
+    return compiled
@@ -0,0 +1,16 @@
+class VirtualClock:
+    """Monotonic clock that only moves when told to, for replay and simulation"""
+
+    def __init__(self, start: float = 0.0) -> None:
+        self._now = start
+
+    def __call__(self) -> float:
+        return self._now
+
+    def set(self, now: float) -> None:
+        """Move to now, never backwards"""
+        if now > self._now:
+            self._now = now
+
+    def advance(self, seconds: float) -> None:
+        self.set(self._now + seconds)
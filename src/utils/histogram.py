@@ -0,0 +1,88 @@
+import math
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+
+
+@lru_cache(maxsize=None)
+def _edges(lowest: float, size: int, growth: float) -> Tuple[float, ...]:
+    """Upper bucket edges but the last, shared by histograms of one shape"""
+    return tuple(lowest * growth**idx for idx in range(size - 1))
+
+
+class Histogram:
+    """
+    Fixed-memory histogram with log-spaced buckets, HDR style.
+    Every bucket is growth times wider than the one before, so quantiles are
+    within (growth - 1) relative error anywhere between lowest and highest.
+    Values outside the range are clamped into the first or last bucket.
+    """
+
+    def __init__(self, lowest: float, highest: float, growth: float = 1.05) -> None:
+        if not 0 < lowest < highest:
+            raise ValueError(f"{__name__}: need 0 < lowest < highest")
+        if growth <= 1:
+            raise ValueError(f"{__name__}: growth must be above 1, got {growth}")
+
+        self._lowest = lowest
+        self._log_growth = math.log(growth)
+        self._size = math.ceil(math.log(highest / lowest) / self._log_growth) + 1
+        # recording is a binary search, cheaper than a log per value
+        self._edges = _edges(lowest, self._size, growth)
+        self._counts = array("Q", bytes(8 * self._size))
+        self._total = 0
+
+    @property
+    def total(self) -> int:
+        """Number of values recorded"""
+        return self._total
+
+    def record(self, value: float) -> None:
+        self._counts[bisect_left(self._edges, value)] += 1
+        self._total += 1
+
+    def _upper(self, idx: int) -> float:
+        """Upper edge of a bucket, what quantiles report"""
+        return self._lowest * math.exp(idx * self._log_growth)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value at quantile q in [0, 1], None while empty"""
+        if self._total == 0:
+            return None
+        rank = max(1, math.ceil(q * self._total))
+        seen = 0
+        for idx, count in enumerate(self._counts):
+            seen += count
+            if seen >= rank:
+                return self._upper(idx)
+        return self._upper(self._size - 1)
+
+    def quantiles(self, qs: Iterable[float]) -> List[Optional[float]]:
+        """Several quantiles in one pass over the buckets, qs ascending"""
+        qs = list(qs)
+        if self._total == 0:
+            return [None] * len(qs)
+
+        ranks = [max(1, math.ceil(q * self._total)) for q in qs]
+        values: List[Optional[float]] = []
+        seen = 0
+        for idx, count in enumerate(self._counts):
+            seen += count
+            while len(values) < len(ranks) and seen >= ranks[len(values)]:
+                values.append(self._upper(idx))
+            if len(values) == len(ranks):
+                break
+        return values
+
+    def merge(self, other: "Histogram") -> None:
+        """Add the counts of a histogram built with the same range and growth"""
+        if len(other._counts) != self._size or other._lowest != self._lowest:
+            raise ValueError(f"{__name__}: histograms have different buckets")
+        for idx, count in enumerate(other._counts):
+            self._counts[idx] += count
+        self._total += other._total
+
+    def clear(self) -> None:
+        self._counts = array("Q", bytes(8 * self._size))
+        self._total = 0
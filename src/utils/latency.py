@@ -0,0 +1,141 @@
+import itertools
+import json
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Union
+
+from src.constants import DEFAULT_LATENCY_SAMPLE_EVERY, LATENCY_WINDOW
+from src.utils.histogram import Histogram
+
+# Pipeline stages, in the order a message goes through them
+STAGE_RECEIVE = "receive"  # paho read the packet -> our on_message callback
+STAGE_DECODE = "decode"  # payload -> (cmd, value) pairs
+STAGE_EVALUATE = "evaluate"  # engine lock taken, batch processed and folded
+STAGE_WAIT = "wait"  # first message of a frame folded -> frame taken
+STAGE_RENDER = "render"  # frame taken -> widgets updated
+STAGES = (STAGE_RECEIVE, STAGE_DECODE, STAGE_EVALUATE, STAGE_WAIT, STAGE_RENDER)
+
+# Distinct commands with their own evaluate histogram, the rest are not kept
+COMMANDS_TRACKED = 64
+
+# 1 us to 60 s within 10%, about 190 buckets
+_LOWEST = 1e-6
+_HIGHEST = 60.0
+_GROWTH = 1.1
+
+
+class RollingHistogram:
+    """
+    Latency histogram over roughly the last window seconds.
+    Values go into the current histogram, which becomes the previous one
+    once it is a window old. Reads merge both, so they cover between one and
+    two windows and never drop to empty right after a rotation.
+    """
+
+    def __init__(
+        self,
+        window: float = LATENCY_WINDOW,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._window = window
+        self._clock = clock
+        self._current = Histogram(_LOWEST, _HIGHEST, _GROWTH)
+        self._previous = Histogram(_LOWEST, _HIGHEST, _GROWTH)
+        self._started = clock()
+        self._max = 0.0
+
+    def record(self, seconds: float) -> None:
+        now = self._clock()
+        if now - self._started >= self._window:
+            self._current, self._previous = self._previous, self._current
+            self._current.clear()
+            self._started = now
+        self._current.record(seconds)
+        if seconds > self._max:
+            self._max = seconds
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        """Count and percentiles in seconds over the window, max since start"""
+        merged = Histogram(_LOWEST, _HIGHEST, _GROWTH)
+        merged.merge(self._previous)
+        merged.merge(self._current)
+        if merged.total == 0:
+            return {"count": 0, "p50": None, "p95": None, "p99": None, "max": None}
+
+        # bucket edges can overshoot the largest value actually seen
+        p50, p95, p99 = (
+            min(q, self._max) for q in merged.quantiles((0.5, 0.95, 0.99))
+        )
+        return {
+            "count": merged.total,
+            "p50": p50,
+            "p95": p95,
+            "p99": p99,
+            "max": self._max,
+        }
+
+
+class LatencyTracker:
+    """
+    Always-on latency of the message pipeline, per stage and per command.
+    Timing every message would cost more than the stages it measures, so the
+    ingest path asks sample() and only times every sample_every-th payload.
+    Frames are rare and always timed. Each stage is recorded from a single
+    thread, so no lock is taken, reads from other threads are approximate.
+    """
+
+    def __init__(
+        self,
+        sample_every: int = DEFAULT_LATENCY_SAMPLE_EVERY,
+        window: float = LATENCY_WINDOW,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if sample_every <= 0:
+            raise ValueError(f"{__name__}: sample_every must be positive")
+        self._sample_every = sample_every
+        self._window = window
+        self._clock = clock
+        # sample() tells whether the payload being handled should be timed,
+        # a bound C iterator is cheaper than a python call on every message
+        ticks = itertools.cycle((False,) * (sample_every - 1) + (True,))
+        self.sample: Callable[[], bool] = ticks.__next__
+        self._stages: Dict[str, RollingHistogram] = {
+            stage: RollingHistogram(window, clock) for stage in STAGES
+        }
+        self._commands: Dict[str, RollingHistogram] = {}
+
+    @property
+    def sample_every(self) -> int:
+        return self._sample_every
+
+    def record(self, stage: str, seconds: float) -> None:
+        self._stages[stage].record(seconds)
+
+    def record_command(self, cmd: str, seconds: float) -> None:
+        """Evaluate time of a payload carrying the single command cmd"""
+        histogram = self._commands.get(cmd)
+        if histogram is None:
+            if len(self._commands) >= COMMANDS_TRACKED:
+                return
+            histogram = RollingHistogram(self._window, self._clock)
+            self._commands[cmd] = histogram
+        histogram.record(seconds)
+
+    def snapshot(self) -> Dict:
+        """Plain values for display and export, latencies in seconds"""
+        return {
+            "sample_every": self._sample_every,
+            "window": self._window,
+            "stages": {
+                stage: histogram.snapshot() for stage, histogram in self._stages.items()
+            },
+            "commands": {
+                cmd: histogram.snapshot()
+                for cmd, histogram in list(self._commands.items())
+            },
+        }
+
+    def dump(self, path: Union[str, Path]) -> None:
+        """Write a snapshot to a JSON file"""
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=4)
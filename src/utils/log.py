@@ -0,0 +1,147 @@
+import atexit
+import logging
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Callable, Dict, Optional
+
+from src.constants import (
+    APP_LOG,
+    LOG_BACKUPS,
+    LOG_FORMAT,
+    LOG_MAX_BYTES,
+    LOGS_DIR,
+    MESSAGE_LOG_INTERVAL,
+    MQTT_LOG,
+)
+
+_listener: Optional[QueueListener] = None
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # the queue never leaves the process, so the record is handed over
+        # as is and formatted on the writer thread instead of the caller's
+        return record
+
+
+def setup_logging(level: int = logging.INFO, console: bool = True) -> None:
+    """
+    Send every logger through a queue to one background writer thread.
+    Loggers only enqueue the record, the writer formats it and writes the
+    rotating app log, the mqtt log for the mqtt loggers, and stderr.
+    Calling it again does nothing, the writer is flushed at exit.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    LOGS_DIR.mkdir(parents=True, exist_ok=True)
+    formatter = logging.Formatter(LOG_FORMAT)
+
+    app_handler = RotatingFileHandler(
+        APP_LOG, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8"
+    )
+    mqtt_handler = RotatingFileHandler(
+        MQTT_LOG, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8"
+    )
+    # the mqtt log only gets what the mqtt service logs
+    mqtt_handler.addFilter(logging.Filter("src.services.mqtt_service"))
+    handlers = [app_handler, mqtt_handler]
+    if console:
+        handlers.append(logging.StreamHandler(sys.stderr))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level)
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(_QueueHandler(records))
+
+    _listener = QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Write out queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class MessageRateLog:
+    """
+    Logs how many messages each topic got over an interval, one line per
+    topic, instead of a line per message. Reads the cumulative counts the
+    caller keeps anyway, so between summaries a message costs a clock read.
+    Topics the caller stopped tracking are summed into one extra line.
+    Safe to call from the message thread and a timer or poll loop at once.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        interval: float = MESSAGE_LOG_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._logger = logger
+        self._interval = interval
+        self._clock = clock
+        self._next = clock() + interval
+        self._started = clock()
+        self._logged: Dict[str, int] = {}
+        self._logged_untracked = 0
+        # one summary at a time, counters are only touched while holding it
+        self._lock = threading.Lock()
+
+    def update(self, counts: Dict[str, int], total: int) -> None:
+        """
+        Log the counts since the last summary once the interval passed.
+        Call it per message and from a timer or poll loop, so the last
+        window before traffic stops is logged too.
+        """
+        if self._clock() < self._next:
+            return
+        with self._lock:
+            # another thread may have logged this window while we waited
+            now = self._clock()
+            if now >= self._next:
+                self._flush(counts, total, now)
+
+    def flush(
+        self, counts: Dict[str, int], total: int, now: Optional[float] = None
+    ) -> None:
+        """Log the counts since the last summary right away, such as on stop"""
+        with self._lock:
+            self._flush(counts, total, self._clock() if now is None else now)
+
+    def _flush(self, counts: Dict[str, int], total: int, now: float) -> None:
+        elapsed = now - self._started
+
+        counts = dict(counts)
+        for topic, count in counts.items():
+            new = count - self._logged.get(topic, 0)
+            if new:
+                self._logger.info(
+                    "%d messages on %s in the last %.0f s", new, topic, elapsed
+                )
+                self._logged[topic] = count
+
+        # total is read before the counts, a message counted in between
+        # only shows up in the next summary
+        untracked = total - sum(counts.values()) - self._logged_untracked
+        if untracked > 0:
+            self._logger.info(
+                "%d messages on untracked topics in the last %.0f s",
+                untracked,
+                elapsed,
+            )
+            self._logged_untracked += untracked
+        self._started = now
+        self._next = now + self._interval
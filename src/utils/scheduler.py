@@ -0,0 +1,67 @@
+import heapq
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from src.models.heartbeat import Heartbeat
+
+
+class DeadlineScheduler:
+    """
+    One heap of heartbeat deadlines shared by every heartbeat it is given.
+    Pings only move Heartbeat.deadline forward, the heap entry is left in
+    place and re-queued at the new deadline when it surfaces, so a ping never
+    touches the heap and a poll only looks at deadlines that are due.
+    """
+
+    def __init__(self) -> None:
+        # (deadline, sequence, tag, heartbeat), sequence keeps ties ordered
+        self._heap: List[Tuple[float, int, Hashable, Heartbeat]] = []
+        # tag -> deadline of its live heap entry, other entries are stale
+        self._queued: Dict[Hashable, float] = {}
+        self._sequence = 0
+
+    def __len__(self) -> int:
+        """Heartbeats with a live heap entry"""
+        return len(self._queued)
+
+    def schedule(self, tag: Hashable, heartbeat: Heartbeat) -> None:
+        """Make sure a running heartbeat is queued, call after it was armed"""
+        deadline = heartbeat.deadline
+        if deadline is None:
+            return
+
+        # a queued entry at or before the deadline catches up when it surfaces
+        queued = self._queued.get(tag)
+        if queued is not None and queued <= deadline:
+            return
+        self._push(tag, heartbeat, deadline)
+
+    def _push(self, tag: Hashable, heartbeat: Heartbeat, deadline: float) -> None:
+        self._sequence += 1
+        self._queued[tag] = deadline
+        heapq.heappush(self._heap, (deadline, self._sequence, tag, heartbeat))
+
+    def next_deadline(self) -> Optional[float]:
+        """Earliest queued deadline, may be early if the heartbeat was pinged"""
+        return self._heap[0][0] if self._heap else None
+
+    def poll(self, now: float) -> List[Hashable]:
+        """Advance every heartbeat that is due, returns the tags that timed out"""
+        timed_out = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            deadline, _, tag, heartbeat = heapq.heappop(heap)
+            if self._queued.get(tag) != deadline:
+                continue
+            del self._queued[tag]
+
+            if heartbeat.poll(now):
+                timed_out.append(tag)
+            elif heartbeat.deadline is not None:
+                self._push(tag, heartbeat, heartbeat.deadline)
+
+        return timed_out
+
+    def clear(self) -> None:
+        """Forget every queued deadline"""
+        self._heap.clear()
+        self._queued.clear()
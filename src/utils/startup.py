@@ -0,0 +1,46 @@
+import sys
+import time
+from typing import List, Optional, TextIO, Tuple
+
+
+class StartupProfile:
+    """
+    Wall time of each startup phase, from the first mark or the given start.
+    Disabled profiles ignore marks, so call sites need no checks.
+    """
+
+    def __init__(self, enabled: bool = True, start: Optional[float] = None) -> None:
+        self._enabled = enabled
+        self._start = time.perf_counter() if start is None else start
+        self._last = self._start
+        self._phases: List[Tuple[str, float]] = []
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    @property
+    def phases(self) -> List[Tuple[str, float]]:
+        """(phase, seconds) in the order marked"""
+        return self._phases
+
+    @property
+    def total(self) -> float:
+        return self._last - self._start
+
+    def mark(self, phase: str) -> None:
+        """End a phase, it covers the time since the previous mark"""
+        if not self._enabled:
+            return
+        now = time.perf_counter()
+        self._phases.append((phase, now - self._last))
+        self._last = now
+
+    def report(self, stream: TextIO = sys.stderr) -> None:
+        """Print the breakdown, once per profile"""
+        if not self._enabled:
+            return
+        self._enabled = False
+        for phase, seconds in self._phases:
+            print(f"{phase:<16} {seconds * 1e3:>8.1f}ms", file=stream)
+        print(f"{'total':<16} {self.total * 1e3:>8.1f}ms", file=stream)
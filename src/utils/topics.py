@@ -0,0 +1,102 @@
+from typing import Callable, Dict, List, Tuple
+
+# Concrete topics whose handlers are remembered before the cache is cleared
+TOPIC_CACHE_SIZE = 4096
+
+Handler = Callable[[str, bytes], None]
+
+
+def topic_matches(pattern: str, topic: str) -> bool:
+    """Match a topic against a subscription pattern with '+' and '#' wildcards"""
+    pattern_levels = pattern.split("/")
+    topic_levels = topic.split("/")
+
+    for idx, level in enumerate(pattern_levels):
+        if level == "#":
+            return True
+        if idx >= len(topic_levels):
+            return False
+        if level != "+" and level != topic_levels[idx]:
+            return False
+
+    return len(topic_levels) == len(pattern_levels)
+
+
+class _TopicNode:
+    __slots__ = ("children", "handlers", "multi_handlers")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_TopicNode"] = {}
+        # handlers of patterns ending at this node, and of patterns ending in '#'
+        self.handlers: List[Handler] = []
+        self.multi_handlers: List[Handler] = []
+
+
+class TopicRouter:
+    """
+    Routes topics to handlers registered on subscription patterns.
+    Patterns are stored in a trie by level with '+' and '#' children, and
+    the handlers resolved for each concrete topic are cached, so routing a
+    known topic is one dict lookup no matter how many patterns exist.
+    """
+
+    def __init__(self, cache_size: int = TOPIC_CACHE_SIZE) -> None:
+        self._root = _TopicNode()
+        self._cache: Dict[str, Tuple[Handler, ...]] = {}
+        self._cache_size = cache_size
+
+    def add(self, pattern: str, handler: Handler) -> None:
+        """Register a handler for every topic matching pattern"""
+        node = self._root
+        levels = pattern.split("/")
+        for idx, level in enumerate(levels):
+            if level == "#":
+                if idx != len(levels) - 1:
+                    raise ValueError(f"{__name__}: '#' must be last in '{pattern}'")
+                node.multi_handlers.append(handler)
+                break
+            node = node.children.setdefault(level, _TopicNode())
+        else:
+            node.handlers.append(handler)
+
+        self._cache.clear()
+
+    def match(self, topic: str) -> Tuple[Handler, ...]:
+        """Handlers for a topic, each handler at most once"""
+        handlers = self._cache.get(topic)
+        if handlers is None:
+            found: List[Handler] = []
+            self._collect(self._root, topic.split("/"), 0, found)
+            handlers = tuple(dict.fromkeys(found))
+
+            if len(self._cache) >= self._cache_size:
+                self._cache.clear()
+            self._cache[topic] = handlers
+        return handlers
+
+    def _collect(
+        self,
+        node: _TopicNode,
+        levels: List[str],
+        idx: int,
+        found: List[Handler],
+    ) -> None:
+        # '#' also matches the parent level, "a/#" matches "a"
+        found.extend(node.multi_handlers)
+        if idx == len(levels):
+            found.extend(node.handlers)
+            return
+
+        child = node.children.get(levels[idx])
+        if child is not None:
+            self._collect(child, levels, idx + 1, found)
+        child = node.children.get("+")
+        if child is not None:
+            self._collect(child, levels, idx + 1, found)
+
+    def route(self, topic: str, payload: bytes) -> bool:
+        """Call every handler for the topic, returns False if nothing matched"""
+        handlers = self.match(topic)
+        for handler in handlers:
+            handler(topic, payload)
+        return bool(handlers)
@@ -0,0 +1,54 @@
+import threading
+
+from src.models.delta import HealthDelta
+from src.models.state import State
+from src.services.event_log import (
+    KIND_TRANSITION,
+    EventLogReader,
+    EventLogWriter,
+)
+
+# a writer stuck on a full segment never drains, close would block forever
+CLOSE_TIMEOUT = 10.0
+
+
+def close(writer: EventLogWriter) -> None:
+    thread = threading.Thread(target=writer.close, daemon=True)
+    thread.start()
+    thread.join(CLOSE_TIMEOUT)
+    assert not thread.is_alive(), "event log writer did not drain"
+
+
+def wdlm_delta(rows: int) -> HealthDelta:
+    return HealthDelta(wdlms={row: State.ON for row in range(rows)})
+
+
+def test_segment_fills_at_a_single_timestamp(tmp_path):
+    writer = EventLogWriter(
+        tmp_path, segment_records=5, clock=lambda: 100.0, commands=["wdlm"]
+    )
+    # 1 message and 12 transitions at one timestamp fill two segments
+    writer.record([("wdlm", (1 << 12) - 1)], wdlm_delta(12))
+    close(writer)
+
+    assert writer.written == 13
+    reader = EventLogReader(tmp_path)
+    assert len(reader.segments()) == 3
+    events = list(reader.query())
+    assert len(events) == 13
+    assert {event.time for event in events} == {100.0}
+    transitions = [event.subject for event in events if event.kind == KIND_TRANSITION]
+    assert transitions == [f"wdlm/{row}" for row in range(12)]
+
+
+def test_restart_at_the_same_timestamp_keeps_rolling(tmp_path):
+    for _ in range(2):
+        writer = EventLogWriter(
+            tmp_path, segment_records=5, clock=lambda: 100.0, commands=["wdlm"]
+        )
+        writer.record([], wdlm_delta(7))
+        close(writer)
+
+    reader = EventLogReader(tmp_path)
+    assert len(reader.segments()) == 3
+    assert len(list(reader.query(start=100.0, end=100.0))) == 14
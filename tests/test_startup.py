@@ -0,0 +1,124 @@
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+pytest.importorskip("PyQt6.QtWidgets")
+
+from PyQt6.QtGui import QAction  # noqa: E402
+from PyQt6.QtWidgets import QApplication, QDockWidget, QLabel  # noqa: E402
+
+from benchmarks.startup import run_child  # noqa: E402
+from src.constants import HEALTH_CONFIG  # noqa: E402
+from src.models.state import State  # noqa: E402
+from src.services.health_adapter import HealthAdapter  # noqa: E402
+from src.services.health_service import (  # noqa: E402
+    HealthService,
+    load_health_config,
+)
+from src.services.mqtt_service import MqttService  # noqa: E402
+from src.ui.main_window import MainWindow  # noqa: E402
+from src.ui.widgets.lazy_widget import LazyWidget  # noqa: E402
+from src.ui.widgets.monitor_widget import MonitorEntryWidget  # noqa: E402
+
+# Generous for a loaded CI box, a cold start paints well under it
+FIRST_PAINT_TARGET = 1.0
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def settle(app: QApplication, rounds: int = 5) -> None:
+    for _ in range(rounds):
+        app.processEvents()
+
+
+@pytest.fixture
+def window(app):
+    # hw is a center tab, error a dock, both start hidden
+    cfg = load_health_config()
+    cfg["monitors"]["hw"]["hidden"] = True
+    cfg["monitors"]["error"]["hidden"] = True
+    health_adapter = HealthAdapter(HealthService(cfg=cfg), countdown_interval=0)
+    window = MainWindow(MqttService(), health_adapter)
+    window.show()
+    settle(app)
+    yield window
+    window.close()
+    window.deleteLater()
+    settle(app)
+
+
+def dock(window: MainWindow, key: str) -> QDockWidget:
+    return window.findChild(QDockWidget, f"{key}DockWidget")
+
+
+def view_action(window: MainWindow, key: str) -> QAction:
+    name = window.health_service.monitors[key].name
+    return next(a for a in window.view_menu.actions() if a.text() == name)
+
+
+def state_texts(window: MainWindow, key: str, entry: str) -> list[str]:
+    """State labels shown on the row of a monitor entry"""
+    row = next(
+        widget
+        for widget in window.monitor_widgets[key].findChildren(MonitorEntryWidget)
+        if widget.entry.name == entry
+    )
+    return [label.text() for label in row.findChildren(QLabel)][1:]
+
+
+def set_on(window: MainWindow, key: str) -> str:
+    """Turn the first entry of a monitor on, returns the entry"""
+    entry = next(iter(window.health_service.monitors[key].entries))
+    delta = window.health_adapter.process_message({"cmd": key, "value": 0x80000000})
+    window.render_delta(delta)
+    return entry
+
+
+def test_first_paint_under_target(tmp_path):
+    # a fresh interpreter each run, eager imports count against first paint,
+    # the first run compiles the health.json cache like a first launch
+    run_child(str(HEALTH_CONFIG), str(tmp_path))
+    result = run_child(str(HEALTH_CONFIG), str(tmp_path))
+    assert result["first_paint"] < FIRST_PAINT_TARGET
+    assert result["deferred"] > 0
+
+
+def test_visible_contents_built_after_show(window):
+    assert "warning" in window.monitor_widgets
+    assert "info" in window.monitor_widgets
+    assert dock(window, "wdlm").widget().widget is not None
+
+
+def test_hidden_dock_builds_on_first_show(app, window):
+    assert "error" not in window.monitor_widgets
+    assert dock(window, "error").widget().widget is None
+
+    # state changed while hidden is picked up when the widget is built
+    entry = set_on(window, "error")
+    dock(window, "error").show()
+    settle(app)
+
+    assert state_texts(window, "error", entry) == [State.ON.value]
+
+    # and later deltas render into it
+    delta = window.health_adapter.process_message({"cmd": "error", "value": 0})
+    window.render_delta(delta)
+    assert state_texts(window, "error", entry) == [State.OFF.value]
+
+
+def test_hidden_tab_builds_when_toggled_on(app, window):
+    assert "hw" not in window.monitor_widgets
+    set_on(window, "hw")
+
+    view_action(window, "hw").setChecked(True)
+    settle(app)
+
+    assert "hw" in window.monitor_widgets
+    tabs = window.document_tabs
+    page = tabs.widget(tabs.currentIndex())
+    assert isinstance(page, LazyWidget) and page.widget is not None